@@ -0,0 +1,66 @@
+import io
+import threading
+import anyio
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+from app.auth import hashing, importer
+from app.auth.models import User
+from app.auth.utils import get_current_user
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.logging import logger
+from app.core.pool_metrics import pool_snapshot
+from app.utils import rows
+from app.utils.handlers import UnauthorizedAction
+
+router = APIRouter()
+
+@router.get("/pool")
+def get_pool_status(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise UnauthorizedAction()
+
+    return pool_snapshot()
+
+# one import at a time per worker, each runs its own pool of IMPORT_HASH_WORKERS bcrypt processes
+user_import_lock = threading.Lock()
+# rejected rows listed in the response, the rest are only counted (the CLI writes them all)
+MAX_REPORTED_ERRORS = 1000
+
+@router.post("/users/import")
+async def import_users(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # same as `python -m app.cli import-users`, which is the better fit for very large files
+    if current_user.role != "admin":
+        raise UnauthorizedAction()
+    if not user_import_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A user import is already running, retry when it is done")
+
+    def run_import():
+        stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        return importer.import_users(
+            db,
+            rows.read_rows(stream, rows.detect_format(file.filename or "")),
+            # the cost the lifespan calibrated, new users hash like signups
+            rounds=hashing.pool.rounds,
+            workers=settings.IMPORT_HASH_WORKERS,
+            batch_size=settings.IMPORT_BATCH_SIZE,
+            on_error=report_error,
+        )
+
+    errors = []
+    omitted = 0
+
+    def report_error(error):
+        nonlocal omitted
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(error)
+        else:
+            omitted += 1
+
+    try:
+        report = await anyio.to_thread.run_sync(run_import)
+    finally:
+        user_import_lock.release()
+    logger.info(f"{current_user.email} imported {report.inserted} users from {file.filename}, {len(errors) + omitted} rows rejected"
+                + (f", stopped at row {report.stopped_at_row}: {report.error}" if report.error else ""))
+    return {**report.as_dict(), "errors": errors, "errors_omitted": omitted}
@@ -0,0 +1,43 @@
+"""add products search vector
+
+Revision ID: 3f9a6c2e7b14
+Revises: 8e4b7d1c3a60
+Create Date: 2026-10-18 13:41:27.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c2e7b14'
+down_revision: Union[str, None] = '8e4b7d1c3a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # postgres only, search falls back to LIKE elsewhere.
+    # Adding a stored generated column rewrites products under an exclusive lock, the index is built concurrently.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+        ") STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
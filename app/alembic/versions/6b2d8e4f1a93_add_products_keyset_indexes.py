@@ -0,0 +1,31 @@
+"""add products keyset indexes
+
+Revision ID: 6b2d8e4f1a93
+Revises: 3f9a6c2e7b14
+Create Date: 2026-10-18 15:02:44.190381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2d8e4f1a93'
+down_revision: Union[str, None] = '3f9a6c2e7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently on postgres, products stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_name_id', 'products', ['name', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_name_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
@@ -0,0 +1,47 @@
+"""add cart, order and product indexes
+
+Revision ID: 9d3c5a7e2f18
+Revises: 6b2d8e4f1a93
+Create Date: 2026-10-18 16:20:05.664712
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3c5a7e2f18'
+down_revision: Union[str, None] = '6b2d8e4f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # concurrent add_to_cart calls could insert the same product twice, merge those rows into the oldest one
+    # before the unique index goes on
+    op.execute(
+        "UPDATE cart SET quantity = ("
+        "SELECT SUM(duplicate.quantity) FROM cart duplicate "
+        "WHERE duplicate.user_id = cart.user_id AND duplicate.product_id = cart.product_id"
+        ") WHERE id IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id HAVING COUNT(*) > 1)"
+    )
+    op.execute("DELETE FROM cart WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id)")
+
+    # built concurrently on postgres, the tables stay writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_cart_user_id_product_id', 'cart', ['user_id', 'product_id'], unique=True, postgresql_concurrently=True)
+        op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_category_price_id', 'products', ['category', 'price', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_created_by_id', 'products', ['created_by', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_created_by_id', table_name='products')
+    op.drop_index('ix_products_category_price_id', table_name='products')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+    op.drop_index('ix_cart_user_id_product_id', table_name='cart')
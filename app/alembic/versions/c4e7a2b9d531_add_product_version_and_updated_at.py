@@ -0,0 +1,31 @@
+"""add product version and updated_at
+
+Revision ID: c4e7a2b9d531
+Revises: 9d3c5a7e2f18
+Create Date: 2026-10-18 18:05:41.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a2b9d531'
+down_revision: Union[str, None] = '9d3c5a7e2f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # constant defaults, postgres fills existing rows without rewriting the table
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'updated_at')
+    op.drop_column('products', 'version')
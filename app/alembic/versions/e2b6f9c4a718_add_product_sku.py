@@ -0,0 +1,33 @@
+"""add product sku
+
+Revision ID: e2b6f9c4a718
+Revises: c4e7a2b9d531
+Create Date: 2026-10-18 19:12:09.530184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6f9c4a718'
+down_revision: Union[str, None] = 'c4e7a2b9d531'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable, existing products have no sku until a feed or an admin sets one
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    with op.get_context().autocommit_block():
+        # unique, the ON CONFLICT (sku) target of the bulk import
+        op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+    op.drop_column('products', 'sku')
@@ -0,0 +1,29 @@
+"""add users tokens_valid_after
+
+Revision ID: f3a8c1d6b205
+Revises: e2b6f9c4a718
+Create Date: 2026-10-18 21:40:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c1d6b205'
+down_revision: Union[str, None] = 'e2b6f9c4a718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable, no user has ended their sessions yet
+    op.add_column('users', sa.Column('tokens_valid_after', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tokens_valid_after')
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from app.auth import passwords
+from app.core.config import Settings, settings
+from app.core.logging import logger
+from app.core.metrics import Counter, Gauge, Histogram, register
+from app.utils.handlers import ServiceOverloaded
+
+hash_jobs_pending = register(Gauge(
+    "password_hash_jobs_pending", "Password hash/verify calls running or queued on the hashing pool"
+))
+hash_jobs_rejected = register(Counter(
+    "password_hash_rejected_total", "Password hash/verify calls shed because the hashing pool queue was full", ("op",)
+))
+hash_duration = register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time per password hash/verify call, queueing excluded", ("op",)
+))
+hash_rounds = register(Gauge(
+    "password_hash_rounds", "bcrypt cost (log2 rounds) used for new password hashes"
+))
+
+
+class HashingPool:
+    # bcrypt is pure CPU, in worker processes it can't starve the event loop or hold the GIL
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.resize(workers, max_queue, retry_after)
+        self.pending = 0
+        self.executor = None
+        # bcrypt cost picked by configure(), the workers apply it when they start
+        self.rounds = None
+
+    def resize(self, workers: int, max_queue: int, retry_after: int):
+        # before start(), a running executor keeps its workers
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.retry_after = retry_after
+
+    def start(self):
+        if self.workers == 0 or self.executor is not None:
+            return
+        # spawn, forking a process that already runs threads (log listener, pool warmup) isn't safe
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=passwords.configure if self.rounds else None,
+            initargs=(self.rounds,) if self.rounds else (),
+        )
+        # workers start lazily, get them all up now instead of on the first signins
+        wait([self.executor.submit(passwords.ready) for _ in range(self.workers)])
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def run(self, op: str, fn, *args):
+        if self.workers and self.executor is None:
+            # spawning the workers takes seconds, that belongs in the lifespan and not in someone's signup
+            raise RuntimeError("Password hashing pool is not started, create_app's lifespan starts it")
+        # only touched from the event loop thread, no lock needed
+        if self.pending >= self.max_pending:
+            hash_jobs_rejected.inc(op)
+            raise ServiceOverloaded(self.retry_after)
+        self.pending += 1
+        hash_jobs_pending.set(value=self.pending)
+        try:
+            result, elapsed = await asyncio.get_running_loop().run_in_executor(
+                self.executor, passwords.timed, fn, *args
+            )
+            hash_duration.observe(elapsed, op)
+            return result
+        finally:
+            self.pending -= 1
+            hash_jobs_pending.set(value=self.pending)
+
+
+pool = HashingPool(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_QUEUE,
+    settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+
+
+def configure(settings: Settings):
+    # call before pool.start(), running workers keep the size and cost they started with
+    pool.resize(
+        settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE, settings.PASSWORD_HASH_RETRY_AFTER_SECONDS
+    )
+    rounds = settings.PASSWORD_HASH_ROUNDS
+    if rounds is None:
+        rounds = passwords.calibrate(
+            settings.PASSWORD_HASH_TARGET_MS, settings.PASSWORD_HASH_MIN_ROUNDS, settings.PASSWORD_HASH_MAX_ROUNDS
+        )
+        logger.info(f"bcrypt cost calibrated to {rounds} rounds for a {settings.PASSWORD_HASH_TARGET_MS}ms target")
+    passwords.configure(rounds)
+    pool.rounds = rounds
+    hash_rounds.set(value=rounds)
+    return rounds
+
+
+async def hash_password(password: str) -> str:
+    return await pool.run("hash", passwords.hash_password, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await pool.run("verify", passwords.verify_password, plain_password, hashed_password)
@@ -0,0 +1,25 @@
+from pydantic import ValidationError
+
+from app.auth.passwords import hash_password
+from app.auth.schemas import SignupRequest
+
+# runs in the bulk import's worker processes, only imports what validating and hashing a row needs
+
+
+def prepare_user(row):
+    # -> (error, email, users row), exactly one of error / users row is set
+    if isinstance(row, str):
+        return row, None, None
+    try:
+        user = SignupRequest(**row)
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ), row.get("email"), None
+    values = {
+        "name": user.name,
+        "email": user.email,
+        "hashed_password": hash_password(user.password),
+        "role": user.role.value,
+    }
+    return None, user.email, values
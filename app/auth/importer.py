@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.auth import import_worker, passwords
+from app.auth.models import User
+from app.core.logging import logger
+
+# multi-row INSERT ... ON CONFLICT (email) DO NOTHING RETURNING email
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    existing: int = 0
+    invalid: int = 0
+    worker_wait_seconds: float = 0  # time spent waiting on validation + bcrypt in the pool
+    insert_seconds: float = 0
+    elapsed_seconds: float = 0
+    # set when a batch failed to insert: the import stopped there, the batches before are committed and
+    # nothing from row `stopped_at_row` on was inserted
+    error: Optional[str] = None
+    stopped_at_row: Optional[int] = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def import_users(db: Session, rows, rounds: int, workers: int = None, batch_size: int = 1000, on_error=None) -> ImportReport:
+    """Validate rows with the signup rules and insert them in batches, existing emails are skipped.
+
+    Validation and bcrypt (at cost `rounds`) run on a process pool of `workers` (cpu count by
+    default), the next batch is prepared there while the previous one is inserted. Every row
+    that isn't inserted is passed to `on_error` as {"row", "email", "error"}. A database error rolls
+    the failing batch back and ends the import, the report says where (error, stopped_at_row).
+    """
+    insert = INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        raise ValueError(f"bulk user import supports {', '.join(INSERTS)}, not {db.get_bind().dialect.name}")
+    # executemany of one compiled statement, sent as multi-row VALUES batches (insertmanyvalues)
+    stmt = insert(User).on_conflict_do_nothing(index_elements=["email"]).returning(User.email)
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport()
+    seen = set()
+    start = time.perf_counter()
+
+    def report_error(number, email, error):
+        if on_error is not None:
+            on_error({"row": number, "email": email, "error": error})
+
+    def batches():
+        batch = []
+        for item in rows:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert_batch(numbers, prepared):
+        wait_start = time.perf_counter()
+        prepared = list(prepared)
+        insert_start = time.perf_counter()
+        report.worker_wait_seconds += insert_start - wait_start
+        values, value_rows = [], []
+        for number, (error, email, user) in zip(numbers, prepared):
+            if error is None and email in seen:
+                error = "duplicate email in file"
+            if error is not None:
+                report.invalid += 1
+                report_error(number, email, error)
+                continue
+            seen.add(email)
+            values.append(user)
+            value_rows.append(number)
+        if not values:
+            return True
+        try:
+            inserted = set(db.execute(stmt, values).scalars())
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"user import stopped at row {numbers[0]}: {e}")
+            # the first line, without the statement and the batch's parameters
+            report.error = f"database error, batch rolled back: {str(e).splitlines()[0]}"
+            report.stopped_at_row = numbers[0]
+            return False
+        report.insert_seconds += time.perf_counter() - insert_start
+        report.inserted += len(inserted)
+        for number, user in zip(value_rows, values):
+            if user["email"] not in inserted:
+                report.existing += 1
+                report_error(number, user["email"], "email already registered")
+        return True
+
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=passwords.configure,
+        initargs=(rounds,),
+    ) as executor:
+        chunksize = max(1, batch_size // (workers * 4))
+        pending = None
+        for batch in batches():
+            # map submits the whole batch now, results are collected when the batch is inserted
+            prepared = executor.map(import_worker.prepare_user, [row for _, row in batch], chunksize=chunksize)
+            if pending is not None and not insert_batch(*pending):
+                # the batch prepared meanwhile is dropped, no use hashing what won't be inserted
+                executor.shutdown(cancel_futures=True)
+                break
+            pending = ([number for number, _ in batch], prepared)
+        else:
+            if pending is not None:
+                insert_batch(*pending)
+
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
@@ -1,7 +1,11 @@
+import hashlib
+import time
+import uuid
 import jwt
 from datetime import datetime, timedelta, timezone
-from fastapi import HTTPException, Depends, status
-from passlib.context import CryptContext
+from types import MappingProxyType
+from fastapi import HTTPException, status
+from app.core.cache import LRUCache
 from app.core.config import settings
 
 SECRET_KEY = settings.SECRET_KEY
@@ -10,29 +14,59 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 REFRESH_SECRET_KEY = settings.REFRESH_SECRET_KEY
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict):
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    now = datetime.now(timezone.utc)
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
+    to_encode.update({"iat": now, "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(data: dict):
-    expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+def create_refresh_token(data: dict, expires_at: datetime = None):
+    # A signin starts a session: a new family id (fid) and an expiry REFRESH_TOKEN_EXPIRE_DAYS out. Rotation
+    # passes both on (fid in data, expires_at), so refreshing never extends a session past its first expiry
+    now = datetime.now(timezone.utc)
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
+    to_encode.setdefault("fid", uuid.uuid4().hex)
+    # jti identifies the token in the revocation store, each one can be used for a single refresh
+    to_encode.update({
+        "iat": now,
+        "exp": expires_at or now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "jti": uuid.uuid4().hex,
+    })
     return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
 
+class TokenVerifier:
+    # the one place tokens get verified. Decoded claims are cached under a digest of the token until
+    # its exp, so a client resending the same access token skips the signature check and the parsing
+    def __init__(self, secret_key: str, algorithm: str, cache: LRUCache = None):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.cache = cache
+
+    def verify(self, token: str):
+        # raises jwt.InvalidTokenError (ExpiredSignatureError for expired tokens), the claims are read-only
+        if self.cache is None:
+            return MappingProxyType(jwt.decode(token, self.secret_key, algorithms=[self.algorithm]))
+        key = hashlib.sha256(token.encode()).digest()
+        claims = self.cache.get(key)
+        if claims is not None:
+            return claims
+        claims = MappingProxyType(jwt.decode(token, self.secret_key, algorithms=[self.algorithm]))
+        exp = claims.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+        if ttl is None or ttl > 0:
+            self.cache.set(key, claims, ttl=ttl)
+        return claims
+
+
+access_tokens = TokenVerifier(
+    SECRET_KEY, ALGORITHM, LRUCache("tokens", maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+)
+# refresh tokens are sent once per access token lifetime, caching them buys nothing
+refresh_tokens = TokenVerifier(REFRESH_SECRET_KEY, ALGORITHM)
+
 def decode_token(token: str):
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return access_tokens.verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -1,4 +1,5 @@
-from sqlalchemy import Integer , Column , String , Enum
+from datetime import datetime, timezone
+from sqlalchemy import Integer , Column , String , Enum, Text, DateTime, Index
 import enum
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -16,8 +17,41 @@ class User(Base):
   email = Column(String,unique=True,nullable=False,index=True)
   hashed_password = Column(String,nullable=False)
   role = Column(Enum(UserRole),nullable=False,default=UserRole.user)
+  # tokens issued before this are refused, password resets and role changes move it (app.auth.utils.end_sessions)
+  tokens_valid_after = Column(DateTime(timezone=True),nullable=True)
 
   
   products = relationship("Product", back_populates="creator")
   cart_items = relationship("Cart", back_populates="user")
   orders = relationship("Order", back_populates="user", cascade="all, delete")
+
+
+class EmailStatus(str,enum.Enum):
+  pending = "pending"
+  sent = "sent"
+  failed = "failed"
+
+class OutboxEmail(Base):
+  # mail waiting for the outbox dispatcher, a row is written in the same request that wants the mail sent
+  __tablename__ = "email_outbox"
+  __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+  id = Column(Integer,primary_key=True,index=True)
+  recipient = Column(String,nullable=False)
+  subject = Column(String,nullable=False)
+  body = Column(Text,nullable=False)
+  status = Column(Enum(EmailStatus),nullable=False,default=EmailStatus.pending)
+  attempts = Column(Integer,nullable=False,default=0)
+  # due time for pending mail, pushed out while a dispatcher holds the row and after each failure
+  next_attempt_at = Column(DateTime(timezone=True),nullable=False,default=lambda: datetime.now(timezone.utc))
+  last_error = Column(Text,nullable=True)
+  created_at = Column(DateTime(timezone=True),nullable=False,default=lambda: datetime.now(timezone.utc))
+  sent_at = Column(DateTime(timezone=True),nullable=True)
+
+
+class RevokedToken(Base):
+  # refresh token ids that were already used, kept until the token would have expired anyway
+  __tablename__ = "revoked_tokens"
+
+  jti = Column(String(32),primary_key=True)
+  expires_at = Column(DateTime(timezone=True),nullable=False,index=True)
@@ -0,0 +1,210 @@
+import asyncio
+import queue
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.auth.models import EmailStatus, OutboxEmail
+from app.core.config import Settings, settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.core.metrics import Counter, Histogram, register
+
+outbox_deliveries = register(Counter(
+    "outbox_deliveries_total", "Outbox send attempts by outcome (sent, retry, failed)", ("outcome",)
+))
+outbox_send_duration = register(Histogram(
+    "outbox_send_duration_seconds", "SMTP time per outbox message, connection setup included"
+))
+
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str):
+    # commits, the dispatcher picks the row up right away or on its next poll
+    db.add(OutboxEmail(recipient=recipient, subject=subject, body=body))
+    db.commit()
+    dispatcher.notify()
+
+
+class SMTPPool:
+    # logged-in connections kept between batches, so a burst of mail pays for STARTTLS + login once
+    # per connection instead of once per message
+    def __init__(self, settings: Settings, idle_check_seconds: float = 10):
+        self.settings = settings
+        self.idle_check_seconds = idle_check_seconds
+        self.idle = queue.LifoQueue()
+
+    def connect(self):
+        smtp = smtplib.SMTP(self.settings.SMTP_HOST, self.settings.SMTP_PORT, timeout=self.settings.SMTP_TIMEOUT_SECONDS)
+        if self.settings.SMTP_STARTTLS:
+            smtp.starttls()
+        if self.settings.SMTP_USERNAME and self.settings.SMTP_PASSWORD:
+            smtp.login(self.settings.SMTP_USERNAME, self.settings.SMTP_PASSWORD)
+        return smtp
+
+    def acquire(self):
+        while True:
+            try:
+                smtp, released_at = self.idle.get_nowait()
+            except queue.Empty:
+                return self.connect()
+            # servers drop idle clients, only probe connections that sat around for a while
+            if time.monotonic() - released_at < self.idle_check_seconds:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.discard(smtp)
+
+    def release(self, smtp):
+        if self.idle.qsize() < self.settings.SMTP_POOL_SIZE:
+            self.idle.put((smtp, time.monotonic()))
+        else:
+            self.discard(smtp)
+
+    def discard(self, smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def close(self):
+        while True:
+            try:
+                smtp, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(smtp)
+
+
+class OutboxDispatcher:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.smtp = SMTPPool(settings)
+        self.executor = None
+        self.task = None
+        self.loop = None
+        self.wake = None
+
+    def claim(self):
+        # takes a batch of due rows and leases them, SKIP LOCKED keeps dispatchers in other workers off them.
+        # Postgres only: on sqlite with_for_update is dropped, two dispatchers may claim the same rows and send
+        # them twice, run the dispatcher in a single process there (OUTBOX_DISPATCHER=false elsewhere)
+        now = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(OutboxEmail)
+                .where(OutboxEmail.status == EmailStatus.pending, OutboxEmail.next_attempt_at <= now)
+                .order_by(OutboxEmail.next_attempt_at)
+                .limit(self.settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            claimed = [(row.id, row.recipient, row.subject, row.body, row.attempts + 1) for row in rows]
+            for row in rows:
+                row.attempts += 1
+                row.next_attempt_at = now + timedelta(seconds=self.settings.OUTBOX_LEASE_SECONDS)
+            db.commit()
+        return claimed
+
+    def deliver(self, email):
+        _, recipient, subject, body, _ = email
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.settings.SMTP_FROM
+        msg["To"] = recipient
+        msg.set_content(body)
+        start = time.perf_counter()
+        try:
+            smtp = self.smtp.acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            return str(e) or type(e).__name__
+        try:
+            smtp.send_message(msg)
+        except (smtplib.SMTPException, OSError) as e:
+            self.smtp.discard(smtp)
+            return str(e) or type(e).__name__
+        self.smtp.release(smtp)
+        outbox_send_duration.observe(time.perf_counter() - start)
+        return None
+
+    def dispatch_batch(self) -> int:
+        claimed = self.claim()
+        if not claimed:
+            return 0
+        errors = list(self.executor.map(self.deliver, claimed))
+        now = datetime.now(timezone.utc)
+        sent_ids = [email[0] for email, error in zip(claimed, errors) if error is None]
+        with SessionLocal() as db:
+            if sent_ids:
+                db.execute(
+                    update(OutboxEmail)
+                    .where(OutboxEmail.id.in_(sent_ids))
+                    .values(status=EmailStatus.sent, sent_at=now, last_error=None)
+                )
+            for (email_id, recipient, _, _, attempts), error in zip(claimed, errors):
+                if error is None:
+                    continue
+                if attempts >= self.settings.OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": EmailStatus.failed}
+                    outbox_deliveries.inc("failed")
+                    logger.error(f"giving up on email {email_id} to {recipient} after {attempts} attempts: {error}")
+                else:
+                    backoff = min(
+                        self.settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                        self.settings.OUTBOX_MAX_BACKOFF_SECONDS,
+                    )
+                    values = {"next_attempt_at": now + timedelta(seconds=backoff)}
+                    outbox_deliveries.inc("retry")
+                    logger.warning(f"email {email_id} to {recipient} failed, retrying in {backoff:.0f}s: {error}")
+                db.execute(update(OutboxEmail).where(OutboxEmail.id == email_id).values(last_error=error[:500], **values))
+            db.commit()
+        outbox_deliveries.inc("sent", amount=len(sent_ids))
+        return len(claimed)
+
+    async def run(self):
+        while True:
+            self.wake.clear()
+            try:
+                claimed = await asyncio.to_thread(self.dispatch_batch)
+            except Exception:
+                logger.exception("outbox dispatch failed")
+                claimed = 0
+            if claimed == self.settings.OUTBOX_BATCH_SIZE:
+                continue  # likely more waiting
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.settings.OUTBOX_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def notify(self):
+        # safe from the threadpool, a no-op in processes that don't run the dispatcher
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        # one thread per pooled SMTP connection
+        self.executor = ThreadPoolExecutor(self.settings.SMTP_POOL_SIZE, thread_name_prefix="outbox")
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.loop = self.task = None
+        self.executor.shutdown(wait=True)
+        self.smtp.close()
+
+
+dispatcher = OutboxDispatcher(settings)
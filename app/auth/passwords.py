@@ -0,0 +1,40 @@
+import time
+
+from passlib.context import CryptContext
+
+# kept free of app imports, the hashing pool workers import this module on their own
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def needs_update(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+def ready() -> bool:
+    return True
+
+def timed(fn, *args):
+    # runs in the pool workers, the duration is bcrypt time only, no queueing
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def configure(rounds: int):
+    # new hashes use `rounds`, cheaper hashes report needs_update. Costlier ones are left alone: the calibrated
+    # cost varies a little between workers and restarts, pinning both ends would rehash users back and forth
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+def calibrate(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    # each extra round doubles the cost, time the cheapest one and extrapolate
+    sample = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=min_rounds)
+    sample.hash("calibrate")  # first call loads the backend
+    elapsed = min(timed(sample.hash, "calibrate")[1] for _ in range(3)) * 1000
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= target_ms:
+        elapsed *= 2
+        rounds += 1
+    return rounds
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.auth.models import RevokedToken
+from app.core.config import Settings, settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.core.metrics import Counter, register
+
+revocation_checks = register(Counter(
+    "refresh_token_revocation_checks_total",
+    "Refresh token reuse checks by where they were answered (bloom_miss, recent_hit, db_hit, db_miss, family_db_hit, family_db_miss)",
+    ("result",),
+))
+
+
+class BloomFilter:
+    # no false negatives, so "not in the filter" means never revoked and needs no db lookup
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+class RevocationStore:
+    # Refresh tokens are single use: refreshing revokes the presented jti. The revoked_tokens primary key
+    # is what enforces it, across workers too. The bloom filter and the recent set in front of it only
+    # spare the lookup, a filter miss (nearly every legitimate refresh) goes straight to the insert.
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.bloom = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
+        self.recent = OrderedDict()
+        self.lock = threading.Lock()
+        self.task = None
+
+    def remember(self, jti: str):
+        with self.lock:
+            self.bloom.add(jti)
+            self.recent[jti] = None
+            self.recent.move_to_end(jti)
+            while len(self.recent) > self.settings.REVOCATION_RECENT_SIZE:
+                self.recent.popitem(last=False)
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        if jti not in self.bloom:
+            revocation_checks.inc("bloom_miss")
+            return False
+        if jti in self.recent:
+            revocation_checks.inc("recent_hit")
+            return True
+        # revoked before the recent set's horizon, or a filter false positive
+        revoked = self.in_table(db, jti)
+        revocation_checks.inc("db_hit" if revoked else "db_miss")
+        return revoked
+
+    def is_family_revoked(self, db: Session, family: str) -> bool:
+        # A session revoked after reuse was detected in any worker. Unlike a jti, nothing else stops a
+        # family another worker revoked since this one's last load(), so a filter miss proves nothing:
+        # only a known revocation skips the table, which answers every other refresh (a primary key lookup)
+        if family in self.recent:
+            revocation_checks.inc("recent_hit")
+            return True
+        revoked = self.in_table(db, family)
+        revocation_checks.inc("family_db_hit" if revoked else "family_db_miss")
+        if revoked:
+            self.remember(family)
+        return revoked
+
+    def in_table(self, db: Session, key: str) -> bool:
+        return db.execute(select(RevokedToken.jti).where(RevokedToken.jti == key)).first() is not None
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> bool:
+        # False when the jti was revoked already, e.g. by a concurrent refresh in another worker
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            self.remember(jti)
+            return False
+        self.remember(jti)
+        return True
+
+    def load(self):
+        # rebuilds the filter from the table, picks up what other workers revoked since the last load
+        bloom = BloomFilter(self.settings.REVOCATION_BLOOM_CAPACITY, self.settings.REVOCATION_BLOOM_ERROR_RATE)
+        with SessionLocal() as db:
+            for jti in db.execute(select(RevokedToken.jti)).scalars():
+                bloom.add(jti)
+        with self.lock:
+            for jti in self.recent:
+                bloom.add(jti)
+            self.bloom = bloom
+
+    def purge(self) -> int:
+        with SessionLocal() as db:
+            purged = db.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.now(timezone.utc))).rowcount
+            db.commit()
+        self.load()
+        return purged
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.settings.REVOCATION_PURGE_INTERVAL_SECONDS)
+            try:
+                purged = await asyncio.to_thread(self.purge)
+                logger.info(f"purged {purged} expired revoked refresh tokens")
+            except SQLAlchemyError as e:
+                logger.warning(f"revoked token purge failed: {e}")
+
+    async def start(self):
+        try:
+            await asyncio.to_thread(self.load)
+        except SQLAlchemyError as e:
+            logger.warning(f"could not load revoked refresh tokens, is the schema migrated? ({e})")
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+
+store = RevocationStore(settings)
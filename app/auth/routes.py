@@ -1,30 +1,41 @@
-from fastapi import APIRouter, Form, HTTPException, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Form, HTTPException, Depends, status
 from fastapi.responses import HTMLResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from app.auth.jwt_handler import create_access_token, create_refresh_token
-from app.auth.services import send_reset_email
-from app.auth.utils import generate_reset_token, hash_password, verify_password, verify_reset_token
+from app.auth.passwords import needs_update
+from app.auth.services import queue_reset_email, upgrade_password_hash
+from app.auth import revocation
+from app.auth.hashing import hash_password, verify_password
+from app.auth.utils import end_sessions, generate_reset_token, invalidate_user, load_principal, verify_reset_token
 from app.auth.models import User
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from enum import Enum
+from datetime import datetime, timezone
 from app.auth.schemas import ForgotPasswordRequest, ResetPasswordRequest, SignupRequest, SigninRequest, TokenResponse
 from app.core.logging import logger
+from app.core.ratelimit import rate_limit
 from app.auth.utils import verify_jwt_token
 
 
 router = APIRouter()
 
-@router.post("/signup") #decorator
-def signup(request: SignupRequest, db: Session = Depends(get_db)):
+@router.post("/signup", dependencies=[Depends(rate_limit("signup"))]) #decorator
+async def signup(request: SignupRequest, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"Attempt to signup using email {request.email}")
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    existing_user = result.scalars().first()
     if existing_user:
         logger.warning(f"Registration failed - email already exists {request.email}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Email already registered."
         )
+    # hand the connection back to the pool while bcrypt runs
+    await db.close()
 
-    hashed_password = hash_password(request.password)  
+    hashed_password = await hash_password(request.password)
     new_user = User(
         name=request.name,
         email=request.email,
@@ -32,17 +43,26 @@ def signup(request: SignupRequest, db: Session = Depends(get_db)):
         role=request.role.value 
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # the same email signed up while this one was hashing, the unique index on users.email catches it
+        await db.rollback()
+        logger.warning(f"Registration failed - email already exists {request.email}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered.")
+    await db.refresh(new_user)
 
     logger.info(f"user created successfully with the email - {request.email} and role: {new_user.role}")
     return {"message": "User created successfully. Please sign in."}
 
-@router.post("/signin", response_model=TokenResponse)
-def signin(request: SigninRequest, db: Session = Depends(get_db)):
+@router.post("/signin", response_model=TokenResponse, dependencies=[Depends(rate_limit("signin"))])
+async def signin(request: SigninRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"Attempt to signin using the email - {request.email}")
 
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
+    # hand the connection back to the pool while bcrypt runs, the loaded user stays readable
+    await db.close()
     
     if not user:
         logger.warning(f"Signin failed: Email not found - {request.email}")
@@ -51,15 +71,19 @@ def signin(request: SigninRequest, db: Session = Depends(get_db)):
             detail="Email not found. Please enter correct email or correct email format"
         )
 
-    if not verify_password(request.password, user.hashed_password):
+    if not await verify_password(request.password, user.hashed_password):
         logger.warning(f"Signin failed: Incorrect password for - {request.email}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password."
         )
 
-    access_token = create_access_token({"sub": user.email, "role": user.role})
-    refresh_token = create_refresh_token({"sub": user.email})
+    # hashes cheaper than the current cost get redone once the response is out
+    if needs_update(user.hashed_password):
+        background_tasks.add_task(upgrade_password_hash, user.id, user.hashed_password, request.password)
+
+    access_token = create_access_token({"sub": user.email, "role": user.role, "uid": user.id})
+    refresh_token = create_refresh_token({"sub": user.email, "uid": user.id})
 
     logger.info(f"User with email - {request.email} successfully signed in")
 
@@ -70,7 +94,7 @@ def signin(request: SigninRequest, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(rate_limit("forgot_password"))])
 def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
     logger.info(f"attempt to reset the password using the free email service")
     user = db.query(User).filter(User.email == request.email).first()
@@ -78,21 +102,27 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="User not found")
 
     token = generate_reset_token(user.email)
-    send_reset_email(user.email, token)
+    queue_reset_email(db, user.email, token)
     return {"message": "Password reset email sent"}
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest , db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest , db: AsyncSession = Depends(get_async_db)):
     email = verify_reset_token(request.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == email).first()
+    # hash before the lookup so no pooled connection is held while bcrypt runs
+    hashed_password = await hash_password(request.new_password)
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.hashed_password = hash_password(request.new_password)
-    db.commit()
+    user.hashed_password = hashed_password
+    # whoever held the old password may hold tokens too
+    end_sessions(user)
+    await db.commit()
+    invalidate_user(user.email)
     logger.info(f"password updated succesfully {user.email}")
     return f"Password updated successfully of user {user.email}"
 
@@ -100,7 +130,7 @@ from app.auth.schemas import RefreshTokenRequest
 from fastapi import Request
 
 
-@router.post("/refresh-token", response_model=TokenResponse)
+@router.post("/refresh-token", response_model=TokenResponse, dependencies=[Depends(rate_limit("refresh_token"))])
 def refresh_token(
     request_data: RefreshTokenRequest,
     db: Session = Depends(get_db)
@@ -109,16 +139,33 @@ def refresh_token(
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
-    email = payload.get("sub")
-    if not email:
+    # tokens from before rotation (no jti) or before session families (no fid, iat) have to sign in again
+    email, uid, jti, family = payload.get("sub"), payload.get("uid"), payload.get("jti"), payload.get("fid")
+    if not (email and uid and jti and family and payload.get("iat")):
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    new_access_token = create_access_token({"sub": user.email, "role": user.role})
-    new_refresh_token = create_refresh_token({"sub": user.email})
+    # role and id come from the user as it is now (user cache, then the db), not from the token
+    principal = load_principal(db, email)
+    if principal is None or principal.id != uid:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    if not principal.issued_token(payload):
+        # password reset or role change since this session started
+        raise HTTPException(status_code=401, detail="Session ended, please sign in again")
+
+    # single use: the presented token is revoked by this refresh. A second use means it leaked or was replayed,
+    # then the whole session (family) is revoked, whichever of the thief and the owner holds its newest token.
+    # Family ids are random like jtis and share the revoked_tokens table, kept until the session would expire.
+    # The family is always checked against the table, another worker may have revoked it since our last load
+    session_expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    if revocation.store.is_family_revoked(db, family):
+        raise HTTPException(status_code=401, detail="Session ended, please sign in again")
+    if revocation.store.is_revoked(db, jti) or not revocation.store.revoke(db, jti, session_expires_at):
+        revocation.store.revoke(db, family, session_expires_at)
+        logger.warning(f"refresh token reuse for {email}, session revoked")
+        raise HTTPException(status_code=401, detail="Refresh token already used")
+
+    new_access_token = create_access_token({"sub": email, "role": principal.role, "uid": principal.id})
+    new_refresh_token = create_refresh_token({"sub": email, "uid": principal.id, "fid": family}, expires_at=session_expires_at)
 
     return {
         "access_token": new_access_token,
@@ -1,16 +1,35 @@
-import smtplib
-from email.message import EmailMessage
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.auth import hashing
+from app.auth.models import User
+from app.auth.outbox import enqueue_email
+from app.core.database import AsyncSessionLocal
 from app.core.logging import logger
+from app.utils.handlers import ServiceOverloaded
 
-def send_reset_email(email: str, token: str):
+def queue_reset_email(db: Session, email: str, token: str):
+    # only writes the outbox row, the dispatcher does the SMTP part after the response
     reset_link = f"http://localhost:8000/auth/reset-password-form?token={token}"
-    msg = EmailMessage()
-    msg['Subject'] = "Reset Your Password"
-    msg['From'] = "aayushp0822@gmail.com"
-    msg['To'] = email
-    msg.set_content(f"Click the link to reset your password: {reset_link}")
-    logger.info(f"password reset email sent to {email}")
-    with smtplib.SMTP('smtp.gmail.com', 587) as smtp:
-        smtp.starttls()
-        smtp.login("aayushp0822@gmail.com", "qjuxgeygpyhpqtqt")
-        smtp.send_message(msg)
+    enqueue_email(
+        db,
+        recipient=email,
+        subject="Reset Your Password",
+        body=f"Click the link to reset your password: {reset_link}",
+    )
+    logger.info(f"password reset email queued for {email}")
+
+async def upgrade_password_hash(user_id: int, old_hash: str, password: str):
+    # runs after the signin response went out, a busy pool just leaves it for the next login
+    try:
+        new_hash = await hashing.hash_password(password)
+    except ServiceOverloaded:
+        return
+    async with AsyncSessionLocal() as db:
+        # only replace the hash we verified, a password reset in between wins
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+    logger.info(f"password hash of user {user_id} upgraded to the current bcrypt cost")
@@ -1,20 +1,17 @@
-from passlib.context import CryptContext
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from itsdangerous import URLSafeTimedSerializer
 from app.core.config import settings
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+import jwt
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.auth.models import User
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+from app.core.cache import LRUCache
+from app.auth.jwt_handler import access_tokens, refresh_tokens
+from app.core.logging import logger
 
 serializer = URLSafeTimedSerializer(settings.SECRET_KEY)
 
@@ -29,7 +26,49 @@ def verify_reset_token(token: str, max_age: int = 3600) -> str | None:
     
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/signin")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # what the routes need from the authenticated user, cheap to cache and detached from any session
+    id: int
+    email: str
+    role: str
+    # User.tokens_valid_after as a timestamp, tokens with an older iat are refused
+    tokens_valid_after: float | None = None
+
+    def issued_token(self, payload: Mapping) -> bool:
+        # tokens without iat predate the claim and only age out
+        iat = payload.get("iat")
+        return self.tokens_valid_after is None or iat is None or iat >= self.tokens_valid_after
+
+# principals by email (the token subject), bounded so stale entries age out across workers
+user_cache = LRUCache("users", maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    # call whenever a user's password or role changes
+    user_cache.delete(email)
+
+def end_sessions(user: User):
+    # on a password reset or role change, before the commit: every token issued so far is refused from then on.
+    # iat has whole second resolution, a token issued earlier in the same second still passes
+    user.tokens_valid_after = datetime.now(timezone.utc).replace(microsecond=0)
+
+def load_principal(db: Session, email: str) -> Principal | None:
+    principal = user_cache.get(email)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(email == User.email).first()
+    if user is None:
+        return None
+    valid_after = user.tokens_valid_after
+    if valid_after is not None:
+        # sqlite hands back naive datetimes, they are utc
+        valid_after = (valid_after if valid_after.tzinfo else valid_after.replace(tzinfo=timezone.utc)).timestamp()
+    principal = Principal(id=user.id, email=user.email, role=user.role, tokens_valid_after=valid_after)
+    user_cache.set(email, principal)
+    return principal
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,25 +76,37 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = access_tokens.verify(token)
         user_email: str = payload.get("sub")
         if user_email is None:
          raise credentials_exception
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise credentials_exception
 
-    user = db.query(User).filter(user_email == User.email).first()
-    if user is None:
+    principal = load_principal(db, user_email)
+    if principal is None or not principal.issued_token(payload):
         raise credentials_exception
-    return user
+    return principal
+
+def get_current_user_from_claims(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    # for read-only endpoints: with AUTH_TRUST_ROLE_CLAIM on, the signed uid/role claims are taken as is,
+    # so a role change only applies once the access token expires
+    if settings.AUTH_TRUST_ROLE_CLAIM:
+        try:
+            payload = access_tokens.verify(token)
+        except jwt.InvalidTokenError:
+            payload = {}
+        if payload.get("sub") and payload.get("uid") and payload.get("role"):
+            return Principal(id=payload["uid"], email=payload["sub"], role=payload["role"])
+    return get_current_user(token, db)
 
-def verify_jwt_token(token: str, secret_key: str = settings.REFRESH_SECRET_KEY) -> dict | None:
+def verify_jwt_token(token: str) -> Mapping | None:
+    # refresh tokens only
     try:
-        payload = jwt.decode(token, secret_key, algorithms=[settings.ALGORITHM])
-        return payload
+        return refresh_tokens.verify(token)
     except jwt.ExpiredSignatureError:
-        print("Token expired")
+        logger.warning("Refresh token expired")
         return None
     except jwt.InvalidTokenError as e:
-        print(f"Invalid token: {e}")
+        logger.warning(f"Invalid refresh token: {e}")
         return None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Index, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.auth.models import User
@@ -6,6 +6,8 @@ from app.products.models import Product
 
 class Cart(Base):
     __tablename__ = "cart"
+    # one row per product in a user's cart, also the index for every cart lookup by user
+    __table_args__ = (Index("ix_cart_user_id_product_id", "user_id", "product_id", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,12 +1,13 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Path, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.cart import models, schemas
 from app.core.database import get_db
 from app.auth.utils import get_current_user
 from app.products.models import Product
 from app.auth.models import User
-from .utils import require_user_role
+from .utils import require_user_role, require_user_role_readonly
 from app.core.logging import logger
 
 router = APIRouter()
@@ -43,7 +44,7 @@ def add_to_cart(
         return cart_item
     else:
         if item.quantity > product.stock:
-            logger(f"{User.name} chose the items more than the product stock")
+            logger.warning(f"{current_user.email} chose the items more than the product stock")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Only {product.stock} item's in stock"
@@ -55,18 +56,21 @@ def add_to_cart(
             quantity=item.quantity
         )
         db.add(new_cart_item)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # a concurrent request added the same product first, (user_id, product_id) is unique
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Product is already in the cart, update its quantity instead")
         db.refresh(new_cart_item)
-        logger.info(f"new cart item added - {current_user.id,
-        item.product_id,
-        item.quantity} by {User.email}")
+        logger.info(f"new cart item added - {(current_user.id, item.product_id, item.quantity)} by {User.email}")
         return new_cart_item
   
 
 @router.get("", response_model=List[schemas.CartItemOut])
 def view_cart(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user_role),
+    current_user: User = Depends(require_user_role_readonly),
 ):
     logger.info(f"request to view the cart by {User.email}")
     cart_items = db.query(models.Cart).filter(models.Cart.user_id == current_user.id).all()
@@ -1,6 +1,6 @@
 from fastapi import Depends, HTTPException, status
 from app.auth.models import User
-from app.auth.utils import get_current_user  
+from app.auth.utils import get_current_user, get_current_user_from_claims
 
 def require_user_role(current_user: User = Depends(get_current_user)):
     if current_user.role != "user":
@@ -10,4 +10,6 @@ def require_user_role(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-
+def require_user_role_readonly(current_user: User = Depends(get_current_user_from_claims)):
+    # same check as require_user_role, for endpoints that only read the user's own data
+    return require_user_role(current_user)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.auth.models import User
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.cart.utils import require_user_role
 from app.orders import models, schemas
 from app.cart.models import Cart
-from app.products.models import Product
+from app.products import catalog_cache
 from app.core.logging import logger
 
 
@@ -13,40 +15,50 @@ from app.core.logging import logger
 router = APIRouter()
 
 @router.post("/checkout", response_model=schemas.OrderCreateResponse)
-def checkout(
-    db: Session = Depends(get_db),
+async def checkout(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_user_role)
 ):
     logger.info(f"attemp to purchase the cart by the user {current_user.email}")
-    cart_items = db.query(Cart).filter(Cart.user_id == current_user.id).all()
+    # products are loaded up front, lazy loading is not available on an async session
+    result = await db.execute(
+        select(Cart).options(selectinload(Cart.product)).where(Cart.user_id == current_user.id)
+    )
+    cart_items = result.scalars().all()
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
+    # products deleted since they were put in the cart, nothing is charged or taken from stock
+    missing = [item.product_id for item in cart_items if item.product is None]
+    if missing:
+        raise HTTPException(status_code=409, detail=f"Products no longer available: {', '.join(map(str, missing))}")
 
     total = sum(item.product.price * item.quantity for item in cart_items)
 
     order = models.Order(user_id=current_user.id,total_amount=total,status=models.OrderStatus.paid)
 
     db.add(order)
-    db.commit()
-    db.refresh(order)
-
-    for item in cart_items:
-        order_item = models.OrderItem(
-            order_id=order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price_at_purchase=item.product.price
-        )
-        db.add(order_item)
+    await db.commit()
+    await db.refresh(order)
 
+    # one executemany insert instead of an INSERT ... RETURNING per cart row
+    await db.execute(insert(models.OrderItem), [
+        {
+            "order_id": order.id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price_at_purchase": item.product.price,
+        }
+        for item in cart_items
+    ])
 
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if product:
-            product.stock -= item.quantity
+    for item in cart_items:
+        item.product.stock -= item.quantity
 
 
-    db.query(Cart).filter(Cart.user_id == current_user.id).delete() #empties the cart agian 
-    db.commit()
+    await db.execute(delete(Cart).where(Cart.user_id == current_user.id)) #empties the cart agian 
+    await db.commit()
+    # the stock on their cached detail pages changed
+    await catalog_cache.cache.forget_products([item.product_id for item in cart_items])
     logger.info(f"Cart checked out successfully by {current_user.email} and cart cleared ")
 
     return {
@@ -0,0 +1,129 @@
+"""Management commands.
+
+    python -m app.cli create-tables   # create missing tables from the models (dev / tests)
+    python -m app.cli drop-tables
+    python -m app.cli import-users partner.csv --errors errors.ndjson   # or .ndjson, one user object per line
+    python -m app.cli import-products feed.csv --admin admin@example.com --errors errors.ndjson
+    python -m app.cli set-role someone@example.com admin   # also ends the user's sessions
+
+Production schemas are managed with alembic (alembic upgrade head).
+"""
+import argparse
+import json
+import sys
+
+from app.core.config import settings
+from app.core.database import Base, Engine, SessionLocal
+# imported for their side effect of registering the tables on Base.metadata
+from app.auth import models as auth_models  # noqa: F401
+from app.products import models as product_models  # noqa: F401
+from app.cart import models as cart_models  # noqa: F401
+from app.orders import models as order_models  # noqa: F401
+
+
+def import_users(args):
+    from app.auth import hashing, importer
+    from app.utils import rows
+
+    errors = open(args.errors, "w") if args.errors else sys.stderr
+    rounds = hashing.configure(settings)
+    with open(args.path, newline="", encoding="utf-8") as stream, SessionLocal() as db:
+        report = importer.import_users(
+            db,
+            rows.read_rows(stream, args.format or rows.detect_format(args.path)),
+            rounds=rounds,
+            workers=args.workers or settings.IMPORT_HASH_WORKERS,
+            batch_size=args.batch_size or settings.IMPORT_BATCH_SIZE,
+            on_error=lambda error: print(json.dumps(error), file=errors),
+        )
+    if args.errors:
+        errors.close()
+    print(json.dumps(report.as_dict()))
+    if report.error:
+        sys.exit(1)
+
+
+def import_products(args):
+    import asyncio
+    from sqlalchemy import select
+    from app.auth.models import User
+    from app.products import catalog_cache, importer
+    from app.utils import rows
+
+    errors = open(args.errors, "w") if args.errors else sys.stderr
+    with open(args.path, newline="", encoding="utf-8") as stream, SessionLocal() as db:
+        admin_id = db.execute(select(User.id).where(User.email == args.admin, User.role == "admin")).scalar()
+        if admin_id is None:
+            sys.exit(f"no admin with the email {args.admin}")
+        report = importer.import_products(
+            db,
+            rows.read_rows(stream, args.format or rows.detect_format(args.path), keep_empty=True),
+            created_by=admin_id,
+            batch_size=args.batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE,
+            on_error=lambda error: print(json.dumps(error), file=errors),
+        )
+    if args.errors:
+        errors.close()
+    if report.inserted or report.updated:
+        # only reaches the workers with CATALOG_CACHE_BACKEND=redis, otherwise they catch up within the cache TTL
+        asyncio.run(catalog_cache.cache.invalidate())
+    print(json.dumps(report.as_dict()))
+    if report.error:
+        sys.exit(1)
+
+
+def set_role(args):
+    from sqlalchemy import select
+    from app.auth.models import User
+    from app.auth.utils import end_sessions
+
+    with SessionLocal() as db:
+        user = db.execute(select(User).where(User.email == args.email)).scalar()
+        if user is None:
+            sys.exit(f"no user with the email {args.email}")
+        user.role = args.role
+        # tokens carry the role they were issued with, the refresh tokens from before are refused.
+        # Workers that cached the user pick the change up within USER_CACHE_TTL_SECONDS
+        end_sessions(user)
+        db.commit()
+    print(f"{args.email} is now {args.role}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create-tables")
+    commands.add_parser("drop-tables")
+    users = commands.add_parser("import-users", help="bulk-create users from a CSV or NDJSON file")
+    users.add_argument("path")
+    users.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    users.add_argument("--errors", help="write the per-row error report (NDJSON) here instead of stderr")
+    users.add_argument("--workers", type=int, help="password hashing processes")
+    users.add_argument("--batch-size", type=int)
+    products = commands.add_parser("import-products", help="create or update (by sku) products from a CSV or NDJSON file")
+    products.add_argument("path")
+    products.add_argument("--admin", required=True, help="email of the admin the new products belong to")
+    products.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    products.add_argument("--errors", help="write the per-row error report (NDJSON) here instead of stderr")
+    products.add_argument("--batch-size", type=int)
+    role = commands.add_parser("set-role", help="change a user's role, their tokens stop refreshing")
+    role.add_argument("email")
+    role.add_argument("role", choices=["admin", "user"])
+    args = parser.parse_args()
+
+    if args.command == "create-tables":
+        Base.metadata.create_all(bind=Engine)
+        print(f"tables created on {Engine.url.render_as_string(hide_password=True)}")
+    elif args.command == "drop-tables":
+        Base.metadata.drop_all(bind=Engine)
+        print(f"tables dropped on {Engine.url.render_as_string(hide_password=True)}")
+    elif args.command == "import-users":
+        import_users(args)
+    elif args.command == "import-products":
+        import_products(args)
+    elif args.command == "set-role":
+        set_role(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from app.core.metrics import collectors
+
+# name -> cache, exported on /metrics
+caches = {}
+
+
+class LRUCache:
+    # bounded LRU with a per-entry TTL, safe to share between the threadpool and the event loop
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        caches[name] = self
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def collect_cache_metrics():
+    for field, kind, help in (
+        ("hits", "counter", "Cache lookups answered from memory"),
+        ("misses", "counter", "Cache lookups that fell through"),
+    ):
+        samples = [f'cache_{field}_total{{cache="{name}"}} {getattr(cache, field)}' for name, cache in caches.items()]
+        yield f"cache_{field}_total", kind, help, samples
+    samples = [f'cache_entries{{cache="{name}"}} {len(cache.entries)}' for name, cache in caches.items()]
+    yield "cache_entries", "gauge", "Entries currently held", samples
+
+
+collectors.append(collect_cache_metrics)
@@ -0,0 +1,57 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+
+from app.utils.handlers import NotModified
+
+
+def version_tag(*parts) -> str:
+    # short digest of whatever identifies a representation, e.g. the (id, version) pairs of a listing
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def utc(value: datetime) -> datetime:
+    # sqlite hands back naive datetimes, they are utc (CURRENT_TIMESTAMP)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(utc(value), usegmt=True)
+
+
+def validators(etag: str, last_modified: datetime = None, cache_control: str = "no-cache") -> dict:
+    # no-cache: clients and the CDN may keep the body but revalidate it on every use
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2), compared weakly as GET allows
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etag = headers["ETag"].removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # both sides at the one second resolution of an http date
+        return parsedate_to_datetime(headers["Last-Modified"]) <= utc(since)
+    return False
+
+
+def check(request: Request, headers: dict):
+    # raised as soon as the validators are known, before anything is serialized
+    if is_not_modified(request, headers):
+        raise NotModified(headers)
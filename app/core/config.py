@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -8,7 +9,129 @@ class Settings(BaseSettings):
     ALGORITHM: str
     REFRESH_SECRET_KEY: str
 
+    # async driver url, derived from DATABASE_URL when not set
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # connection pool, applied to both the sync and the async engine
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # connections opened per engine at startup, before the first request
+    DB_WARMUP_CONNECTIONS: int = 2
+
+    # optional read replica for read-only routes, reads go to the primary while it is unhealthy or lagging
+    REPLICA_DATABASE_URL: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5
+
+    # authenticated user cache, see app.auth.utils.get_current_user
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60
+    # read-only endpoints take the uid/role claims of the access token without a user lookup
+    AUTH_TRUST_ROLE_CLAIM: bool = False
+
+    # bcrypt runs on a process pool, calls beyond workers + queue get a 503 with Retry-After
+    # 0 workers runs it on the event loop's thread pool instead
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    # bcrypt cost is calibrated at startup to take about PASSWORD_HASH_TARGET_MS per hash on this machine,
+    # set PASSWORD_HASH_ROUNDS to pin it (e.g. when instances of different sizes share the users table)
+    PASSWORD_HASH_ROUNDS: Optional[int] = None
+    PASSWORD_HASH_TARGET_MS: float = 250
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    PASSWORD_HASH_MAX_ROUNDS: int = 15
+
+    # bulk user import (python -m app.cli import-users, POST /admin/users/import)
+    IMPORT_HASH_WORKERS: Optional[int] = None  # cpu count
+    IMPORT_BATCH_SIZE: int = 1000
+
+    # bulk product import (python -m app.cli import-products, POST /admin/products/import), rows per transaction
+    PRODUCT_IMPORT_BATCH_SIZE: int = 5000
+
+    # in-process product search index (app.products.search_index), /products/search is answered from memory once
+    # it is built. Each worker holds its own copy and rebuilds it every SEARCH_INDEX_REFRESH_SECONDS (0: never)
+    # to pick up product writes made by the other workers
+    SEARCH_INDEX_ENABLED: bool = False
+    SEARCH_INDEX_REFRESH_SECONDS: float = 300
+    SEARCH_INDEX_SCAN_BATCH_SIZE: int = 5000
+    # a query word matches at most this many indexed words starting with it
+    SEARCH_INDEX_MAX_EXPANSIONS: int = 50
+    SEARCH_INDEX_CACHE_SIZE: int = 1000
+    SEARCH_INDEX_CACHE_TTL_SECONDS: float = 60
+
+    # product detail and listing responses (app.products.catalog_cache), admin product writes invalidate them.
+    # Checkout only drops the detail of what it sold, listings can show stock up to the TTL old
+    CATALOG_CACHE_ENABLED: bool = True
+    CATALOG_CACHE_SIZE: int = 10000
+    CATALOG_CACHE_TTL_SECONDS: float = 30  # also how long another worker's write can go unseen without redis
+    CATALOG_CACHE_BACKEND: str = "memory"  # "memory" (per process) or "redis" (entries and version shared between workers)
+    CATALOG_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CATALOG_CACHE_REDIS_TIMEOUT_SECONDS: float = 0.05  # reads go to the database when the backend is slower or down
+    CATALOG_CACHE_VERSION_CHECK_SECONDS: float = 1  # redis backend, how often a worker re-reads the shared version
+
+    # verified access token claims, cached until the token's exp (TTL only applies to tokens without one)
+    TOKEN_CACHE_SIZE: int = 20000
+    TOKEN_CACHE_TTL_SECONDS: float = 300
+
+    # outgoing mail goes through the email_outbox table, a background dispatcher sends it over pooled SMTP connections
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 587
+    SMTP_STARTTLS: bool = True
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_FROM: str = "aayushp0822@gmail.com"
+    SMTP_TIMEOUT_SECONDS: float = 10
+    SMTP_POOL_SIZE: int = 2
+    OUTBOX_DISPATCHER: bool = True  # off for workers that should only queue mail
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 6
+    OUTBOX_BACKOFF_SECONDS: float = 30  # doubles after every failed attempt
+    OUTBOX_MAX_BACKOFF_SECONDS: float = 3600
+    OUTBOX_LEASE_SECONDS: float = 120  # a claimed row is retried by anyone after this if its dispatcher died
+
+    # auth endpoint throttling, limits are "count/second|minute|hour|day" per "route:key" where key is ip or email
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per process) or "redis" (shared, any server speaking the redis protocol)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.5  # the limiter lets requests through when the backend is down
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # key on the first X-Forwarded-For address, only behind a proxy
+    RATE_LIMIT_MAX_KEYS: int = 100000  # memory backend, least recently seen keys are dropped first
+    RATE_LIMITS: dict[str, str] = {
+        "signin:ip": "30/minute",
+        "signin:email": "10/minute",
+        "signup:ip": "10/minute",
+        "forgot_password:ip": "10/minute",
+        "forgot_password:email": "5/hour",
+        "refresh_token:ip": "60/minute",
+    }
+
+    # used refresh token ids, checked against a bloom filter + recent set before the revoked_tokens table
+    REVOCATION_BLOOM_CAPACITY: int = 1_000_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_RECENT_SIZE: int = 10000
+    REVOCATION_PURGE_INTERVAL_SECONDS: float = 3600  # also reloads the filter with other workers' revocations
+
+    # dev mode, turns on the N+1 query warnings
+    DEBUG: bool = False
+    # same statement running more often than this in one request is reported as a possible N+1
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # logging, records go through a queue and are written by a background listener
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "ecommerce.log"
+    LOG_JSON: bool = False
+    LOG_ROTATION: str = "size"  # "size" or "time"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = "midnight"
+    LOG_BACKUP_COUNT: int = 5
+    LOG_RATE_LIMIT_PER_SECOND: int = 10  # per high-volume event, 0 disables the limit
+
     class Config:
         env_file = ".env"  
 
+# read once, at import: the engines, caches and limits are built from it. create_app(settings) doesn't replace it
 settings = Settings()
@@ -1,28 +1,70 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 from app.core.logging import logger
+from app.core.pool_metrics import TimedAsyncQueuePool, TimedQueuePool, track_pool
+from app.core.query_stats import instrument_queries
+
+# sync driver -> async driver used by the async engine
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def pool_options(url: str, is_async: bool = False) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    parsed = make_url(url)
+    # in-memory sqlite gets a single shared connection, there is nothing to size
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
 
 DATABASE_URL = settings.DATABASE_URL
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
 
-Engine = create_engine(DATABASE_URL)
+Engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+track_pool(Engine, "primary")
+instrument_queries(Engine)
 
 SessionLocal = sessionmaker(autocommit = False, autoflush=True,bind=Engine)
 
+AsyncEngine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, is_async=True))
+track_pool(AsyncEngine.sync_engine, "primary_async")
+instrument_queries(AsyncEngine.sync_engine)
+
+# expire_on_commit is off so attributes can be read after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(bind=AsyncEngine, autoflush=True, expire_on_commit=False)
+
 Base = declarative_base()
 
 from sqlalchemy.exc import OperationalError
 from app.core.database import SessionLocal
-import logging
 from fastapi import HTTPException, status
 
-logger = logging.getLogger("ecommerce")
 
 def get_db():
     try:
         db = SessionLocal()
-        logger.info("Connected to the database")
+        logger.info("Connected to the database", extra={"rate_key": "db_session"})
         yield db
     except OperationalError as e:
         logger.critical(f"Database connection failed: {e}")
@@ -32,6 +74,21 @@ def get_db():
         )
     finally:
             db.close()
-            logger.info("Database connection closed")
-    
+            logger.info("Database connection closed", extra={"rate_key": "db_session"})
 
+
+async def get_async_db():
+    # async counterpart of get_db, routers move over to this one at a time
+    async with AsyncSessionLocal() as db:
+        try:
+            logger.info("Connected to the database (async)", extra={"rate_key": "db_session"})
+            yield db
+        except OperationalError as e:
+            logger.critical(f"Database connection failed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database connection error. Please try again later.",
+            )
+        finally:
+            logger.info("Database connection closed (async)", extra={"rate_key": "db_session"})
+    
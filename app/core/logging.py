@@ -1,12 +1,124 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+LOG_FORMAT = "[%(asctime)s] %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    # caps records tagged with extra={"rate_key": ...} to `per_second` per key, whatever their level (a warning
+    # logged on every request while a backend is down is the case it's for). Untagged records always pass,
+    # the next record let through carries the number that were dropped
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "rate_key", None)
+        if key is None or self.per_second <= 0:
+            return True
+
+        second = int(time.monotonic())
+        # request threads log concurrently, a window is read and updated as one step
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or window[0] != second:
+                suppressed = window[2] if window else 0
+                window = [second, 0, suppressed]
+                self.windows[key] = window
+
+            window[1] += 1
+            if window[1] > self.per_second:
+                window[2] += 1
+                return False
+
+            suppressed, window[2] = window[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} similar suppressed)"
+        return True
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    # the stock prepare() formats the record into its message and drops exc_info, the traceback would end up
+    # inside "message" of the JSON output. Only the args are merged here, the traceback travels as exc_text
+    # (rendered on the logging thread, the frames aren't kept alive in the queue) for the output formatter
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def file_handler(settings):
+    if settings.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            settings.LOG_FILE, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, delay=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, delay=True
+    )
+
+
+def output_handlers(settings):
+    formatter = JsonFormatter() if settings.LOG_JSON else logging.Formatter(LOG_FORMAT)
+    handlers = [file_handler(settings), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def queue_pipeline(handlers, rate_limit_per_second: int):
+    # request threads only enqueue, the listener thread does the formatting and the disk writes
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_limit_per_second))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    return queue_handler, listener
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("ecommerce.log"), # has a secoond argument mode = 'a' (default)
-        logging.StreamHandler()  
-    ]
-)
 
 logger = logging.getLogger("ecommerce")
+listener = None
+
+
+def setup_logging(settings):
+    # called by create_app, importing this module does not touch the log file
+    global listener
+    if listener is not None:
+        return listener
+
+    queue_handler, listener = queue_pipeline(output_handlers(settings), settings.LOG_RATE_LIMIT_PER_SECOND)
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        handlers=[queue_handler]
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,116 @@
+import threading
+from bisect import bisect_left
+
+# latency buckets (seconds) shared by the request histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        # snapshot first, a request adding a label set while the dict is iterated would break the scrape
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        with self.lock:
+            self.values[label_values] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                # per-bucket hits (last one is +Inf), sum, count
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        names = self.labels + ("le",)
+        # entries are updated in place, copied so buckets, sum and count of one series agree
+        with self.lock:
+            items = [(label_values, (list(hits), total, count)) for label_values, (hits, total, count) in sorted(self.values.items())]
+        for label_values, (hits, total, count) in items:
+            cumulative = 0
+            for bound, bucket_hits in zip(self.buckets + ("+Inf",), hits):
+                cumulative += bucket_hits
+                yield f"{self.name}_bucket{format_labels(names, label_values + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {count}"
+
+
+metrics = []
+# callables returning (name, kind, help, samples) for values read at scrape time
+collectors = []
+
+
+def register(metric):
+    metrics.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collect in collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+http_requests = register(Counter(
+    "http_requests_total", "HTTP responses by route prefix, method and status code", ("route", "method", "status")
+))
+http_request_duration = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route prefix and method", ("route", "method")
+))
+http_in_flight = register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served by route prefix", ("route",)
+))
@@ -0,0 +1,75 @@
+import time
+from app.core.logging import logger
+from app.core.metrics import http_in_flight, http_request_duration, http_requests
+from app.core.query_stats import QueryStats, current_query_stats
+
+
+def route_label(path: str, prefixes) -> str:
+    for prefix in prefixes:
+        if path == prefix or path.startswith(prefix + "/"):
+            return prefix
+    return "other"
+
+
+class TimingMiddleware:
+    # plain ASGI middleware, BaseHTTPMiddleware would add a task and a stream copy per request
+    def __init__(self, app, prefixes):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_label(scope["path"], self.prefixes)
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc(route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.observe(time.perf_counter() - start, route, method)
+            http_requests.inc(route, method, str(status_code))
+            http_in_flight.dec(route)
+
+
+class QueryStatsMiddleware:
+    # counts SQL statements and DB time per request, reported in a Server-Timing header.
+    # with warn_threshold set, statements repeated more often than that in one request are logged (N+1)
+    def __init__(self, app, warn_threshold=None):
+        self.app = app
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and stats.count:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            if self.warn_threshold is not None:
+                for statement, runs in stats.repeated(self.warn_threshold).items():
+                    logger.warning(
+                        f"Possible N+1: statement ran {runs} times in {scope['method']} {scope['path']}: {statement}"
+                    )
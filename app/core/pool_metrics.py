@@ -0,0 +1,136 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.metrics import collectors
+
+# upper bounds (ms) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def observe_wait(self, seconds):
+        wait_ms = seconds * 1000
+        index = len(WAIT_BUCKETS_MS)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                index = i
+                break
+        with self.lock:
+            self.wait_buckets[index] += 1
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self.lock:
+            cumulative = 0
+            buckets = {}
+            for bound, hits in zip(WAIT_BUCKETS_MS + ("+Inf",), self.wait_buckets):
+                cumulative += hits
+                buckets[str(bound)] = cumulative
+            stats = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "buckets": buckets,
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum_ms, 3),
+                },
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                # QueuePool counts overflow from -pool_size, only connections beyond pool_size matter here
+                overflow=max(pool.overflow(), 0),
+            )
+        return {"pool": pool.__class__.__name__, **stats}
+
+
+class TimedQueuePool(QueuePool):
+    # times how long a checkout waits for a free connection, no pool event covers the wait itself
+    metrics = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.count("timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+pools = {}
+
+
+def track_pool(engine, name):
+    metrics = PoolMetrics(name, engine)
+    engine.pool.metrics = metrics
+
+    event.listen(engine, "connect", lambda *args: metrics.count("connects"))
+    event.listen(engine, "checkout", lambda *args: metrics.count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.count("checkins"))
+    event.listen(engine, "invalidate", lambda *args: metrics.count("invalidations"))
+
+    pools[name] = metrics
+    return metrics
+
+
+def pool_snapshot():
+    return {name: metrics.snapshot() for name, metrics in pools.items()}
+
+
+def collect_pool_metrics():
+    snapshots = pool_snapshot()
+    for field, kind, help in (
+        ("checked_out", "gauge", "Connections currently checked out of the pool"),
+        ("idle", "gauge", "Idle connections held by the pool"),
+        ("overflow", "gauge", "Connections open beyond pool_size"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("timeouts", "counter", "Checkouts that timed out waiting for a connection"),
+    ):
+        samples = [
+            f'db_pool_{field}{{pool="{name}"}} {snapshot[field]}'
+            for name, snapshot in snapshots.items() if field in snapshot
+        ]
+        yield f"db_pool_{field}", kind, help, samples
+
+
+collectors.append(collect_pool_metrics)
@@ -0,0 +1,45 @@
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# set by QueryStatsMiddleware for the lifetime of a request, None outside of one
+current_query_stats = ContextVar("current_query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold):
+        return {statement: runs for statement, runs in self.statements.items() if runs > threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start_time")
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def instrument_queries(engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
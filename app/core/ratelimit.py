@@ -0,0 +1,125 @@
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+
+from app.core.config import Settings, settings
+from app.core.logging import logger
+from app.core.metrics import Counter, register
+from app.core.resp import RedisClient, RespError
+from app.utils.handlers import RateLimited
+
+rate_limit_rejected = register(Counter(
+    "rate_limit_rejected_total", "Requests rejected by the rate limiter by route and key (ip, email)", ("route", "key")
+))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(value: str) -> tuple[int, int]:
+    # "10/minute" -> (10, 60)
+    count, _, period = value.partition("/")
+    return int(count), PERIODS[period.strip()]
+
+
+# Both backends keep a sliding window counter: hits in the current fixed window plus the previous
+# window's hits weighted by how much of it still overlaps. Rejected requests count too, so a client
+# hammering the endpoint stays locked out until it backs off.
+
+class MemoryBackend:
+    # per process, only touched from the event loop thread so it needs no locking
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.windows = OrderedDict()
+
+    async def hit(self, key: str, window: int, now: float) -> tuple[int, int]:
+        # (hits in the previous window, hits in the current one including this one)
+        index = int(now // window)
+        entry = self.windows.get(key)
+        if entry is None or entry[0] < index - 1:
+            entry = [index, 0, 0]
+        elif entry[0] == index - 1:
+            entry = [index, entry[2], 0]
+        entry[2] += 1
+        self.windows[key] = entry
+        self.windows.move_to_end(key)
+        while len(self.windows) > self.max_keys:
+            self.windows.popitem(last=False)
+        return entry[1], entry[2]
+
+
+class RedisBackend(RedisClient):
+    # shared between workers
+    async def hit(self, key: str, window: int, now: float) -> tuple[int, int]:
+        index = int(now // window)
+        current = f"ratelimit:{key}:{index}"
+        hits, _, previous = await self.pipeline(
+            ("INCR", current),
+            ("PEXPIRE", current, str(window * 2000)),
+            ("GET", f"ratelimit:{key}:{index - 1}"),
+        )
+        return int(previous or 0), hits
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: dict[str, str]):
+        self.backend = backend
+        self.limits = {name: parse_limit(value) for name, value in limits.items()}
+
+    async def check(self, route: str, key: str, value: str):
+        limit = self.limits.get(f"{route}:{key}")
+        if limit is None or not value:
+            return
+        count, window = limit
+        now = time.time()
+        try:
+            previous, current = await self.backend.hit(f"{route}:{key}:{value}", window, now)
+        except (RespError, ValueError) as e:
+            # fail open, an unreachable limiter (or a garbled counter) shouldn't take the auth endpoints down with it
+            logger.warning("rate limit backend unavailable, not limiting: %r", e, extra={"rate_key": "rate_limit_backend"})
+            return
+        elapsed = now % window
+        if previous * (1 - elapsed / window) + current > count:
+            rate_limit_rejected.inc(route, key)
+            raise RateLimited(max(1, math.ceil(window - elapsed)))
+
+
+def make_limiter(settings: Settings):
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL, settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS)
+    else:
+        backend = MemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return RateLimiter(backend, settings.RATE_LIMITS)
+
+
+limiter = make_limiter(settings)
+
+
+def client_ip(request: Request) -> str | None:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def rate_limit(route: str):
+    # router dependency: dependencies=[Depends(rate_limit("signin"))]. Runs before the route body,
+    # so a rejected request costs no bcrypt or db work
+    async def dependency(request: Request):
+        if limiter is None:
+            return
+        await limiter.check(route, "ip", client_ip(request))
+        if f"{route}:email" in limiter.limits:
+            # the body is already read and cached on the request by the time dependencies run
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            email = body.get("email") if isinstance(body, dict) else None
+            if isinstance(email, str):
+                await limiter.check(route, "email", email.strip().lower())
+    return dependency
@@ -0,0 +1,146 @@
+import threading
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import InvalidRequestError, OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.database import AsyncEngine, Engine, pool_options, to_async_url
+from app.core.logging import logger
+from app.core.pool_metrics import track_pool
+from app.core.query_stats import instrument_queries
+
+
+class ReadOnlySession(Session):
+    pass
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def refuse_writes(session, flush_context, instances):
+    raise InvalidRequestError("Read-only session, use get_db for writes")
+
+
+class ReplicaHealth:
+    def __init__(self, interval: float, max_lag: float):
+        self.interval = interval
+        self.max_lag = max_lag
+        self.healthy = True
+        self.lag = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def claim_check(self) -> bool:
+        # one request per interval runs the check, the others reuse the last result
+        with self.lock:
+            now = time.monotonic()
+            if now - self.checked_at < self.interval:
+                return False
+            self.checked_at = now
+            return True
+
+    def record(self, lag, error=None):
+        healthy = error is None and (lag is None or lag <= self.max_lag)
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Read replica is healthy again, routing reads back to it")
+            else:
+                logger.warning(f"Read replica unhealthy (lag={lag}, error={error}), reads fall back to the primary")
+        self.lag = lag
+        self.healthy = healthy
+
+
+def lag_query(dialect_name: str):
+    if dialect_name == "postgresql":
+        # a standby that has replayed everything it received is not behind, however old the last commit is
+        return text(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )
+    return text("SELECT NULL")
+
+
+REPLICA_DATABASE_URL = settings.REPLICA_DATABASE_URL
+
+ReplicaEngine = None
+AsyncReplicaEngine = None
+if REPLICA_DATABASE_URL:
+    ReplicaEngine = create_engine(REPLICA_DATABASE_URL, **pool_options(REPLICA_DATABASE_URL))
+    track_pool(ReplicaEngine, "replica")
+    instrument_queries(ReplicaEngine)
+
+    ASYNC_REPLICA_URL = to_async_url(REPLICA_DATABASE_URL)
+    AsyncReplicaEngine = create_async_engine(ASYNC_REPLICA_URL, **pool_options(ASYNC_REPLICA_URL, is_async=True))
+    track_pool(AsyncReplicaEngine.sync_engine, "replica_async")
+    instrument_queries(AsyncReplicaEngine.sync_engine)
+
+replica_health = ReplicaHealth(settings.REPLICA_HEALTH_CHECK_INTERVAL, settings.REPLICA_MAX_LAG_SECONDS)
+
+ReadSessionLocal = sessionmaker(class_=ReadOnlySession, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(sync_session_class=ReadOnlySession, autoflush=False, expire_on_commit=False)
+
+
+def replica_in_use() -> bool:
+    # whether get_read_db / get_async_read_db hand out replica sessions right now
+    return ReplicaEngine is not None and replica_health.healthy
+
+
+def check_replica():
+    if not replica_health.claim_check():
+        return
+    try:
+        with ReplicaEngine.connect() as conn:
+            lag = conn.execute(lag_query(ReplicaEngine.dialect.name)).scalar()
+        replica_health.record(lag)
+    except SQLAlchemyError as e:
+        replica_health.record(None, e)
+
+
+async def check_replica_async():
+    if not replica_health.claim_check():
+        return
+    try:
+        async with AsyncReplicaEngine.connect() as conn:
+            lag = (await conn.execute(lag_query(AsyncReplicaEngine.dialect.name))).scalar()
+        replica_health.record(lag)
+    except SQLAlchemyError as e:
+        replica_health.record(None, e)
+
+
+def get_read_db():
+    # read-only session on the replica, or on the primary when there is no healthy replica
+    bind = Engine
+    if ReplicaEngine is not None:
+        check_replica()
+        if replica_health.healthy:
+            bind = ReplicaEngine
+
+    db = ReadSessionLocal(bind=bind)
+    try:
+        yield db
+    except OperationalError as e:
+        logger.critical(f"Database connection failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database connection error. Please try again later.",
+        )
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    bind = AsyncEngine
+    if AsyncReplicaEngine is not None:
+        await check_replica_async()
+        if replica_health.healthy:
+            bind = AsyncReplicaEngine
+
+    async with AsyncReadSessionLocal(bind=bind) as db:
+        try:
+            yield db
+        except OperationalError as e:
+            logger.critical(f"Database connection failed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database connection error. Please try again later.",
+            )
@@ -0,0 +1,84 @@
+# minimal redis protocol (RESP2) codec and client, no app imports so the local stand-in can use it on its own
+import asyncio
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    # an error reply, or from RedisClient.pipeline anything that went wrong talking to the server
+    pass
+
+
+def encode_command(command) -> bytes:
+    parts = [b"*%d\r\n" % len(command)]
+    for arg in command:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by the server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        return None if size == -1 else (await reader.readexactly(size + 2))[:-2]
+    if kind == b"*":
+        size = int(rest)
+        return None if size == -1 else [await read_reply(reader) for _ in range(size)]
+    raise RespError(f"unexpected reply {line!r}")
+
+
+class RedisClient:
+    # Plain RESP over asyncio streams, so any redis-compatible server works without a client library.
+    # Connections are pooled and only used from the event loop
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = (parsed.path or "/0").lstrip("/") or "0"
+        self.timeout = timeout
+        self.idle = []
+
+    async def connect(self):
+        conn = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db != "0":
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self.execute(conn, setup)
+        return conn
+
+    async def execute(self, conn, commands):
+        reader, writer = conn
+        writer.write(b"".join(encode_command(command) for command in commands))
+        await writer.drain()
+        return [await read_reply(reader) for _ in commands]
+
+    async def pipeline(self, *commands):
+        # raises RespError for a server that is down, slow (TimeoutError), hangs up mid-reply (EOFError) or
+        # answers something that isn't RESP (ValueError), callers only catch that one
+        conn = None
+        try:
+            async with asyncio.timeout(self.timeout):
+                conn = self.idle.pop() if self.idle else await self.connect()
+                replies = await self.execute(conn, commands)
+        except BaseException as e:
+            # the replies left unread would answer the next caller's commands
+            if conn is not None:
+                conn[1].close()
+            if isinstance(e, (OSError, EOFError, ValueError)):
+                raise RespError(f"{type(e).__name__}: {e}") from e
+            raise
+        self.idle.append(conn)
+        return replies
@@ -0,0 +1,86 @@
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core import replica
+from app.core.database import AsyncEngine, Engine
+from app.core.logging import logger
+
+
+def hot_queries():
+    # same statement shapes the routes issue most, executing them once fills each engine's compiled cache
+    from app.auth.models import User
+    from app.cart.models import Cart
+    from app.orders.models import Order
+    from app.products.models import Product
+
+    return [
+        lambda db: db.query(User).filter(User.email == "").first(),  # get_current_user, signin
+        lambda db: db.query(Product).filter(Product.id == 0).first(),  # product detail, add_to_cart
+        lambda db: db.query(Cart).filter(Cart.user_id == 0).all(),  # view_cart
+        lambda db: db.query(Order).filter(Order.user_id == 0).all(),  # get_user_orders
+    ]
+
+
+def async_hot_queries():
+    from app.cart.models import Cart
+    from app.products.models import Product
+
+    return [
+        select(Product).order_by(Product.id, Product.id).offset(0).limit(11),  # list_products first page
+        select(Cart).where(Cart.user_id == 0),  # checkout
+    ]
+
+
+def warm_engine(engine, connections: int):
+    # open `connections` pooled connections up front, then run the hot queries on one of them
+    held = []
+    try:
+        for _ in range(connections):
+            held.append(engine.connect())
+        with Session(bind=held[0] if held else engine) as db:
+            for query in hot_queries():
+                query(db)
+            db.rollback()
+    finally:
+        for connection in held:
+            connection.close()
+
+
+async def warm_async_engine(engine, connections: int):
+    held = []
+    try:
+        for _ in range(connections):
+            held.append(await engine.connect())
+        connection = held[0] if held else await engine.connect()
+        for statement in async_hot_queries():
+            await connection.execute(statement)
+        await connection.rollback()
+        if not held:
+            await connection.close()
+    finally:
+        for connection in held:
+            await connection.close()
+
+
+async def warm_up(settings):
+    engines = [Engine] + ([replica.ReplicaEngine] if replica.ReplicaEngine is not None else [])
+    async_engines = [AsyncEngine] + ([replica.AsyncReplicaEngine] if replica.AsyncReplicaEngine is not None else [])
+    try:
+        for engine in engines:
+            await run_in_threadpool(warm_engine, engine, settings.DB_WARMUP_CONNECTIONS)
+        for engine in async_engines:
+            await warm_async_engine(engine, settings.DB_WARMUP_CONNECTIONS)
+    except SQLAlchemyError as e:
+        # the app still starts, requests will connect on demand
+        logger.warning(
+            f"Database warm-up failed, are the tables created (python -m app.cli create-tables / alembic upgrade head)? {e}"
+        )
+
+
+async def dispose_engines():
+    Engine.dispose()
+    await AsyncEngine.dispose()
+    if replica.ReplicaEngine is not None:
+        replica.ReplicaEngine.dispose()
+        await replica.AsyncReplicaEngine.dispose()
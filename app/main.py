@@ -1,74 +1,150 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Security, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.responses import PlainTextResponse
 
-from .core.database import SessionLocal, Base, Engine
 from app.auth.routes import router as auth_router
 from app.products.routes import router as product_router
 from app.products.public_routes import router as public_product_router
 from app.cart.routes import router as cart_router
 from app.checkout.routes import router as checkout_router
 from app.orders.routes import router as orders_router
-from app.core.logging import logger
+from app.admin.routes import router as admin_router
+from app.auth import hashing, outbox, revocation
+from app.products import search_index
+from app.core.config import Settings, settings as default_settings
+from app.core.logging import logger, setup_logging
+from app.core.metrics import render as render_metrics
+from app.core.middleware import QueryStatsMiddleware, TimingMiddleware
+from app.core.startup import dispose_engines, warm_up
 from app.utils.handlers import (
     ProductNotFound,
     UnauthorizedAction,
     InvalidQueryParam,
+    ServiceOverloaded,
+    RateLimited,
     product_not_found_handler,
     unauthorized_action_handler,
-    invalid_query_param_handler
+    invalid_query_param_handler,
+    service_overloaded_handler,
+    rate_limited_handler,
+    NotModified,
+    not_modified_handler
 )
 
+# Swagger Auth
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/signin")
 
-app = FastAPI(title="ecommerce backend using fastapi")
-logger.info("App restarted")
 
+def create_app(settings: Settings = None) -> FastAPI:
+    """Build the application. `settings` overrides only part of the config, see below.
 
-app.add_exception_handler(ProductNotFound, product_not_found_handler)
-app.add_exception_handler(UnauthorizedAction, unauthorized_action_handler)
-app.add_exception_handler(InvalidQueryParam, invalid_query_param_handler)
+    Nothing here touches the database. The lifespan warms the connection pools,
+    runs the hot queries once, calibrates the bcrypt cost, starts the password
+    hashing workers, the email outbox dispatcher and the revoked token purge,
+    builds the in-process search index when it is enabled,
+    and builds the OpenAPI schema before the first request. Tables are created by
+    `python -m app.cli create-tables` or alembic.
 
+    `settings` is not a full override, it only reaches what is set up here: logging, the N+1 query warnings,
+    the warm-up connection count, the password hashing pool (size, queue and bcrypt
+    cost) and whether the outbox dispatcher runs. Everything else is built from the
+    module level `app.core.config.settings` when its module is first imported: the
+    database and replica engines, the rate limiter, the catalog cache, the token and
+    user caches, the revocation store, the search index and the limits read by the
+    routes. To change those, set the environment (or .env) before importing app.
+    """
+    settings = settings or default_settings
+    setup_logging(settings)
 
-Base.metadata.create_all(bind=Engine)
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await warm_up(settings)
+        hashing.configure(settings)
+        hashing.pool.start()
+        if settings.OUTBOX_DISPATCHER:
+            outbox.dispatcher.start()
+        await revocation.store.start()
+        await search_index.index.start()
+        app.openapi()
+        logger.info("App restarted")
+        yield
+        await search_index.index.stop()
+        await revocation.store.stop()
+        await outbox.dispatcher.stop()
+        hashing.pool.shutdown()
+        await dispose_engines()
 
+    app = FastAPI(title="ecommerce backend using fastapi", lifespan=lifespan)
 
-app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-app.include_router(product_router, prefix="/admin/products", tags=["Admin - Products"])
-app.include_router(public_product_router, prefix="/products", tags=["Public - Products"])
-app.include_router(cart_router, prefix="/cart", tags=["User - Cart"])
-app.include_router(checkout_router, prefix="", tags=["User - Checkout"])
-app.include_router(orders_router, prefix="/orders", tags=["Order History and Details"])
+    app.add_exception_handler(ProductNotFound, product_not_found_handler)
+    app.add_exception_handler(UnauthorizedAction, unauthorized_action_handler)
+    app.add_exception_handler(InvalidQueryParam, invalid_query_param_handler)
+    app.add_exception_handler(ServiceOverloaded, service_overloaded_handler)
+    app.add_exception_handler(RateLimited, rate_limited_handler)
+    app.add_exception_handler(NotModified, not_modified_handler)
 
-# Root route
-@app.get("/")
-async def root():
-    return {"message": "This is the root path to all the api's"}
+    app.add_middleware(
+        QueryStatsMiddleware,
+        warn_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD if settings.DEBUG else None,
+    )
+    # request metrics are labelled by router prefix, most specific first
+    app.add_middleware(
+        TimingMiddleware,
+        prefixes=["/auth", "/admin/products", "/admin", "/products", "/cart", "/orders", "/checkout"],
+    )
 
-# Swagger Auth
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/signin")
+    app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+    app.include_router(product_router, prefix="/admin/products", tags=["Admin - Products"])
+    app.include_router(public_product_router, prefix="/products", tags=["Public - Products"])
+    app.include_router(cart_router, prefix="/cart", tags=["User - Cart"])
+    app.include_router(checkout_router, prefix="", tags=["User - Checkout"])
+    app.include_router(orders_router, prefix="/orders", tags=["Order History and Details"])
+    app.include_router(admin_router, prefix="/admin", tags=["Admin - System"])
 
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    openapi_schema = get_openapi(
-        title="Your API",
-        version="1.0.0",
-        description="API with JWT auth",
-        routes=app.routes,
-    )
-    openapi_schema["components"]["securitySchemes"] = {
-        "BearerAuth": {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT",
+    # Root route
+    @app.get("/")
+    async def root():
+        return {"message": "This is the root path to all the api's"}
+
+    # Prometheus scrape endpoint
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    def custom_openapi():
+        if app.openapi_schema:
+            return app.openapi_schema
+        openapi_schema = get_openapi(
+            title="Your API",
+            version="1.0.0",
+            description="API with JWT auth",
+            routes=app.routes,
+        )
+        openapi_schema["components"]["securitySchemes"] = {
+            "BearerAuth": {
+                "type": "http",
+                "scheme": "bearer",
+                "bearerFormat": "JWT",
+            }
         }
-    }
-    for path in openapi_schema["paths"].values():
-        for operation in path.values():
-            operation["security"] = [{"BearerAuth": []}]
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
-
-app.openapi = custom_openapi
+        for path in openapi_schema["paths"].values():
+            for operation in path.values():
+                operation["security"] = [{"BearerAuth": []}]
+        app.openapi_schema = openapi_schema
+        return app.openapi_schema
+
+    app.openapi = custom_openapi
+    return app
+
+
+def __getattr__(name):
+    # `uvicorn app.main:app` keeps working, the app is only built when first asked for
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,11 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
+from sqlalchemy.orm import Session, selectinload
 from app.auth.models import User
-from app.core.database import get_db
-from app.auth.utils import get_current_user
+from app.core import conditional
+from app.core.replica import get_read_db
 from app.orders import models, schemas
-from app.cart.models import Cart
-from app.products.models import Product
-from app.cart.utils import require_user_role
+from app.cart.utils import require_user_role_readonly
 from app.core.logging import logger
 
 
@@ -16,8 +14,8 @@ router = APIRouter()
 
 @router.get("/", response_model=List[schemas.OrderListResponse])
 def get_user_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_user_role)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_user_role_readonly)
 ):
     logger.info(f"User with email {current_user.email} requesting all the orders")
     orders = db.query(models.Order).filter(models.Order.user_id == current_user.id).all()
@@ -33,12 +31,16 @@ def get_user_orders(
 
 @router.get("/{order_id}", response_model=schemas.OrderDetailResponse)
 def get_order_detail(
+    request: Request,
+    response: Response,
     order_id: int = Path(...,ge=1),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_user_role)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_user_role_readonly)
 ):
     logger.info(f"{current_user.email} checking for the details of the order with order id {order_id}")
-    order = db.query(models.Order).filter(
+    order = db.query(models.Order).options(
+        selectinload(models.Order.items).selectinload(models.OrderItem.product)
+    ).filter(
         models.Order.id == order_id,
         models.Order.user_id == current_user.id
     ).first()
@@ -46,14 +48,25 @@ def get_order_detail(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    names = [item.product.name if item.product else "Unknown" for item in order.items]
+    if order.status == models.OrderStatus.paid:
+        # a paid order never changes, only the product names shown with it can. The tag covers those names,
+        # not the products' versions, which every checkout's stock update bumps. Strong, the same tag is always
+        # the same bytes; no Last-Modified, a renamed product has no date here. private: it's one user's order
+        headers = conditional.validators(
+            f'"{order.id}-{conditional.version_tag(names)}"',
+            cache_control="private, no-cache",
+        )
+        conditional.check(request, headers)
+        response.headers.update(headers)
+
     item_data = []
-    for item in order.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+    for item, name in zip(order.items, names):
         item_data.append({
             "product_id": item.product_id,
             "quantity": item.quantity,
             "price_at_purchase": item.price_at_purchase,
-            "product_name": product.name if product else "Unknown",
+            "product_name": name,
             "subtotal": float(item.price_at_purchase) * item.quantity
         })
     
@@ -0,0 +1,158 @@
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.core.cache import LRUCache
+from app.core.config import Settings, settings
+from app.core.logging import logger
+from app.core import replica
+from app.core.metrics import Counter, collectors, register
+from app.core.resp import RedisClient, RespError
+from app.products.schemas import ProductOut
+
+catalog_lookups = register(Counter(
+    "catalog_cache_lookups_total",
+    "Catalog cache lookups by kind (detail, list) and where they were answered (local, shared, miss)",
+    ("kind", "result"),
+))
+
+VERSION_KEY = "catalog:version"
+
+# the response bodies, serialized once when cached instead of on every request
+product_json = TypeAdapter(ProductOut)
+products_json = TypeAdapter(List[ProductOut])
+
+
+def dump_product(product) -> bytes:
+    return product_json.dump_json(product_json.validate_python(product, from_attributes=True))
+
+
+def dump_products(products) -> bytes:
+    return products_json.dump_json(products_json.validate_python(products, from_attributes=True))
+
+
+def pack(headers: dict, body: bytes) -> bytes:
+    # the response headers (validators, next cursor) are cached on the first line, in front of the body
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def unpack(value: bytes):
+    headers, body = value.split(b"\n", 1)
+    return json.loads(headers), body
+
+
+class CatalogCache:
+    # Read-through cache of serialized product responses: detail by id, listings by their normalized query.
+    # Every key carries the catalog version and admin product writes bump it, so entries from before a
+    # write are never looked up again and just age out. With CATALOG_CACHE_BACKEND=redis the entries and
+    # the version are shared between workers, otherwise another worker's write shows after at most the TTL.
+    # Reads may come from a replica that hasn't replayed the write yet, right after a version change what
+    # they load is served but not cached, or the stale answer would outlive the replica lag by the TTL.
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.local = LRUCache("catalog", settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS)
+        self.shared = None
+        if settings.CATALOG_CACHE_BACKEND == "redis":
+            self.shared = RedisClient(settings.CATALOG_CACHE_REDIS_URL, settings.CATALOG_CACHE_REDIS_TIMEOUT_SECONDS)
+        self.version = 0
+        self.version_checked_at = 0.0
+        self.version_changed_at = float("-inf")
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.CATALOG_CACHE_ENABLED
+
+    async def shared_call(self, *commands):
+        # fail open, the database answers while redis is unreachable (pipeline raises RespError for all of it)
+        try:
+            return await self.shared.pipeline(*commands)
+        except RespError as e:
+            logger.warning("catalog cache backend unavailable: %r", e, extra={"rate_key": "catalog_cache_backend"})
+            return None
+
+    def set_version(self, version: int):
+        if version != self.version:
+            self.version = version
+            self.version_changed_at = time.monotonic()
+
+    async def current_version(self) -> int:
+        if self.shared is not None and time.monotonic() - self.version_checked_at >= self.settings.CATALOG_CACHE_VERSION_CHECK_SECONDS:
+            self.version_checked_at = time.monotonic()
+            replies = await self.shared_call(("GET", VERSION_KEY))
+            if replies is not None:
+                try:
+                    self.set_version(int(replies[0] or 0))
+                except ValueError:
+                    # keep the last good one, entries still expire after the TTL
+                    logger.warning(f"catalog cache version is not a number: {replies[0]!r}", extra={"rate_key": "catalog_cache_backend"})
+        return self.version
+
+    def may_be_stale(self) -> bool:
+        # a replica read shortly after a version change (or while the replica reports lag) may predate the write
+        if not replica.replica_in_use():
+            return False
+        lag = replica.replica_health.lag
+        if lag is not None and lag > 0:
+            return True
+        return time.monotonic() - self.version_changed_at < self.settings.REPLICA_MAX_LAG_SECONDS
+
+    async def get(self, kind: str, key, load) -> bytes:
+        # load() is awaited on a miss and returns the body to cache
+        if not self.enabled:
+            return await load()
+        cache_key = f"catalog:{await self.current_version()}:{kind}:{key}"
+        body = self.local.get(cache_key)
+        if body is not None:
+            catalog_lookups.inc(kind, "local")
+            return body
+        if self.shared is not None:
+            replies = await self.shared_call(("GET", cache_key))
+            if replies is not None and replies[0] is not None:
+                body = replies[0]
+                self.local.set(cache_key, body)
+                catalog_lookups.inc(kind, "shared")
+                return body
+        catalog_lookups.inc(kind, "miss")
+        body = await load()
+        if self.may_be_stale():
+            return body
+        self.local.set(cache_key, body)
+        if self.shared is not None:
+            ttl_ms = str(int(self.settings.CATALOG_CACHE_TTL_SECONDS * 1000))
+            await self.shared_call(("SET", cache_key, body, "PX", ttl_ms))
+        return body
+
+    async def invalidate(self):
+        # after an admin product write: a new version, every cached response is out
+        self.set_version(self.version + 1)
+        self.local.clear()
+        if self.shared is not None:
+            replies = await self.shared_call(("INCR", VERSION_KEY))
+            if replies is not None:
+                self.set_version(replies[0])
+                self.version_checked_at = time.monotonic()
+
+    async def forget_products(self, product_ids):
+        # after a checkout changed their stock, only the detail entries. Listings may show the old stock
+        # until their TTL, add_to_cart and checkout check the database anyway
+        if not self.enabled:
+            return
+        keys = [f"catalog:{await self.current_version()}:detail:{product_id}" for product_id in product_ids]
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            await self.shared_call(("DEL", *keys))
+
+
+cache = CatalogCache(settings)
+
+
+def collect_catalog_cache_metrics():
+    with cache.local.lock:
+        size = sum(len(body) for body, _ in cache.local.entries.values())
+    yield "catalog_cache_bytes", "gauge", "Serialized responses held in the in-process catalog cache", [f"catalog_cache_bytes {size}"]
+
+
+collectors.append(collect_catalog_cache_metrics)
@@ -0,0 +1,61 @@
+from sqlalchemy import Integer, and_, case, cast, func, select, true
+
+from app.products.models import Product
+
+
+def price_bucket(dialect_name: str, bucket_size: float):
+    # index of the bucket_size wide price range a product falls in. A cast to integer rounds on postgres and
+    # truncates on sqlite (which may lack floor), prices are never negative so truncating is flooring
+    if dialect_name == "postgresql":
+        return func.floor(Product.price / bucket_size)
+    return cast(Product.price / bucket_size, Integer)
+
+
+def facets_query(dialect_name: str, category, min_price, max_price, bucket_size: float):
+    # One pass over the products, grouped by (category, price bucket). Each facet ignores its own filter, so
+    # the category counts still offer the other categories and the histogram the other price ranges:
+    # "in_price" counts the rows inside the price filter, the category filter is applied afterwards per group.
+    in_price = true()
+    if min_price is not None:
+        in_price = and_(in_price, Product.price >= min_price)
+    if max_price is not None:
+        in_price = and_(in_price, Product.price <= max_price)
+    bucket = price_bucket(dialect_name, bucket_size).label("bucket")
+    return select(
+        Product.category,
+        bucket,
+        func.count().label("count"),
+        func.sum(case((in_price, 1), else_=0)).label("in_price"),
+        func.min(Product.price).label("min_price"),
+        func.max(Product.price).label("max_price"),
+    ).group_by(Product.category, bucket)
+
+
+def build_facets(rows, category, bucket_size: float) -> dict:
+    categories = {}
+    histogram = {}
+    total = 0
+    low = high = None
+    for row in rows:
+        if row.in_price:
+            categories[row.category] = categories.get(row.category, 0) + row.in_price
+        if category and row.category != category:
+            continue
+        histogram[int(row.bucket)] = histogram.get(int(row.bucket), 0) + row.count
+        total += row.in_price
+        low = row.min_price if low is None else min(low, row.min_price)
+        high = row.max_price if high is None else max(high, row.max_price)
+
+    return {
+        "total": total,
+        "categories": [
+            {"category": name, "count": count}
+            for name, count in sorted(categories.items(), key=lambda item: (-item[1], item[0] or ""))
+        ],
+        "price_histogram": [
+            {"min": round(bucket * bucket_size, 2), "max": round((bucket + 1) * bucket_size, 2), "count": count}
+            for bucket, count in sorted(histogram.items())
+        ],
+        "min_price": low,
+        "max_price": high,
+    }
@@ -0,0 +1,214 @@
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy import Column, Integer, MetaData, Numeric, String, Table, Text, and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from app.core.logging import logger
+from app.products.models import Product
+from app.products.schemas import CreateProduct
+
+# INSERT ... ON CONFLICT (sku) DO UPDATE
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# what a feed row sets, sku first
+COLUMNS = ["sku", "name", "description", "price", "stock", "category", "image_url"]
+UPDATED = COLUMNS[1:]
+# numeric(10, 2)
+MAX_PRICE = 10 ** 8
+
+# per connection COPY target on postgres, emptied by every commit. Own metadata, create_all never sees it
+staging = Table(
+    "product_import", MetaData(),
+    Column("sku", String(64)),
+    Column("name", String(255)),
+    Column("description", Text),
+    Column("price", Numeric(10, 2)),
+    Column("stock", Integer),
+    Column("category", String(100)),
+    Column("image_url", Text),
+    Column("created_by", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DELETE ROWS",
+)
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    invalid: int = 0
+    load_seconds: float = 0  # COPY / inserts and the upserts, on the loader thread
+    load_wait_seconds: float = 0  # reading and validating stalled on the loader
+    elapsed_seconds: float = 0
+    # set when a batch failed to load or the feed couldn't be read on: the import stopped there, the batches
+    # before are committed and nothing from row `stopped_at_row` on was loaded
+    error: Optional[str] = None
+    stopped_at_row: Optional[int] = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def prepare_product(row):
+    # -> (error, sku, products row), exactly one of error / products row is set
+    if isinstance(row, str):
+        return row, None, None
+    try:
+        product = CreateProduct(**row)
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ), row.get("sku"), None
+    if product.sku is None:
+        return "sku: Field required", None, None
+    if product.price >= MAX_PRICE:
+        return f"price: Input should be less than {MAX_PRICE}", product.sku, None
+    return None, product.sku, product.model_dump()
+
+
+def upsert(insert):
+    # a row whose sku exists updates that product, if the importing admin created it and something changed.
+    # Unchanged rows are left alone, a re-imported feed doesn't rewrite (or re-version) the whole catalog
+    excluded = insert.excluded
+    changed = or_(*(getattr(Product, column).is_distinct_from(excluded[column]) for column in UPDATED))
+    return insert.on_conflict_do_update(
+        index_elements=[Product.sku],
+        set_={**{column: excluded[column] for column in UPDATED}, "version": Product.version + 1, "updated_at": func.now()},
+        where=and_(Product.created_by == excluded.created_by, changed),
+    ).returning(Product.sku)
+
+
+def copy_rows(db: Session, values, created_by: int):
+    # postgres + psycopg2: COPY the batch into the staging table, then one INSERT ... SELECT upserts it
+    buffer = io.StringIO()
+    # non-numeric values quoted, so an empty description stays "" instead of reading as NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for value in values:
+        writer.writerow([value[column] for column in COLUMNS] + [created_by])
+    buffer.seek(0)
+    db.execute(CreateTable(staging, if_not_exists=True))
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY product_import ({', '.join(COLUMNS)}, created_by) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+    insert = postgresql.insert(Product).from_select(COLUMNS + ["created_by"], select(staging))
+    return db.execute(upsert(insert)).scalars()
+
+
+def insert_rows(db: Session, values, created_by: int):
+    # everything else: one compiled statement, sent as multi-row VALUES batches (insertmanyvalues)
+    insert = INSERTS[db.get_bind().dialect.name](Product)
+    return db.execute(upsert(insert), [{**value, "created_by": created_by} for value in values]).scalars()
+
+
+def import_products(db: Session, rows, created_by: int, batch_size: int = 5000, on_error=None) -> ImportReport:
+    """Validate rows with CreateProduct and upsert them by sku in batches, each batch its own transaction.
+
+    `rows` is consumed as it is read, at most two batches are held: while one is loaded on a loader thread
+    the next is read and validated. Every row that isn't loaded is passed to `on_error` as
+    {"row", "sku", "error"}, from the calling thread. A database error rolls the failing batch back and
+    ends the import, as does a feed that stops being readable (bad UTF-8, broken CSV); the report says
+    where (error, stopped_at_row) and counts what was committed before.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name not in INSERTS:
+        raise ValueError(f"bulk product import supports {', '.join(INSERTS)}, not {dialect.name}")
+    load = copy_rows if dialect.name == "postgresql" and dialect.driver == "psycopg2" else insert_rows
+    report = ImportReport()
+    seen = set()
+    start = time.perf_counter()
+
+    def report_error(number, sku, error):
+        report.invalid += 1
+        if on_error is not None:
+            on_error({"row": number, "sku": sku, "error": error})
+
+    # copy_rows talks to the psycopg2 cursor directly, its errors aren't wrapped in SQLAlchemy's
+    database_errors = (SQLAlchemyError, dialect.dbapi.Error)
+
+    def load_batch(batch):
+        # on the loader thread, the only one using db
+        load_start = time.perf_counter()
+        try:
+            skus = [value["sku"] for _, value in batch]
+            existing = dict(db.execute(select(Product.sku, Product.created_by).where(Product.sku.in_(skus))).all())
+            written = set(load(db, [value for _, value in batch], created_by))
+            db.commit()
+        except database_errors:
+            db.rollback()
+            raise
+        return existing, written, time.perf_counter() - load_start
+
+    def stop(row_number, error):
+        report.error = error
+        report.stopped_at_row = row_number
+
+    def count_batch(batch, loaded) -> bool:
+        # False when the batch failed to load, the import stops there
+        wait_start = time.perf_counter()
+        try:
+            existing, written, seconds = loaded.result()
+        except database_errors as e:
+            logger.error(f"product import stopped at row {batch[0][0]}: {e}")
+            # the first line, without the statement and the batch's parameters
+            stop(batch[0][0], f"database error, batch rolled back: {str(e).splitlines()[0]}")
+            return False
+        report.load_wait_seconds += time.perf_counter() - wait_start
+        report.load_seconds += seconds
+        for number, value in batch:
+            sku = value["sku"]
+            if sku in written:
+                if sku in existing:
+                    report.updated += 1
+                else:
+                    report.inserted += 1
+            elif existing.get(sku) == created_by:
+                report.unchanged += 1
+            else:
+                report_error(number, sku, "sku belongs to a product of another admin")
+        return True
+
+    def feed():
+        number = 0
+        try:
+            for number, row in rows:
+                yield number, row
+        except (UnicodeDecodeError, csv.Error) as e:
+            # what was read so far is still loaded
+            stop(number + 1, f"feed unreadable after row {number}: {e}")
+
+    with ThreadPoolExecutor(1, thread_name_prefix="product-import") as loader:
+        pending = None
+        batch = []
+        for number, row in feed():
+            error, sku, value = prepare_product(row)
+            if error is None and sku in seen:
+                error = "duplicate sku in file"
+            if error is not None:
+                report_error(number, sku, error)
+                continue
+            seen.add(sku)
+            batch.append((number, value))
+            if len(batch) == batch_size:
+                if pending is not None and not count_batch(*pending):
+                    break
+                pending = (batch, loader.submit(load_batch, batch))
+                batch = []
+        else:
+            if (pending is None or count_batch(*pending)) and batch:
+                count_batch(batch, loader.submit(load_batch, batch))
+
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
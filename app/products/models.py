@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, ForeignKey
+from sqlalchemy import DDL, Column, DateTime, Index, Integer, String, Text, Numeric, ForeignKey, event, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Product(Base):
     __tablename__ = "products"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # keyset pagination of the public listing, one per sort_by (id is the primary key)
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+        # category filter sorted by price (keyset pages too), admin listing of own products
+        Index("ix_products_category_price_id", "category", "price", "id"),
+        Index("ix_products_created_by_id", "created_by", "id"),
+        {'extend_existing': True},
+    )
 
 
     id = Column(Integer, primary_key=True, index=True)
@@ -14,10 +23,29 @@ class Product(Base):
     stock = Column(Integer, nullable=False)
     category = Column(String(100))
     image_url = Column(Text)
+    sku = Column(String(64), unique=True, index=True)
 
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # bumped by every ORM update (admin edits, checkout stock), the ETag/Last-Modified of its responses
+    version = Column(Integer, nullable=False, server_default="1", onupdate=text("version + 1"))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
     creator = relationship("User", back_populates="products")
     cart_items = relationship("Cart", back_populates="product")
 
-    
\ No newline at end of file
+
+# Postgres full-text search, see app.products.search. The generated tsvector column is not mapped so loading
+# products doesn't drag it along, create_all adds it here and the 3f9a6c2e7b14 migration on existing databases.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+event.listen(Product.__table__, "after_create", DDL(
+    f"ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+).execute_if(dialect="postgresql"))
+event.listen(Product.__table__, "after_create", DDL(
+    "CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)"
+).execute_if(dialect="postgresql"))
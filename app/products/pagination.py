@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import tuple_
+
+from app.products.models import Product
+from app.utils.handlers import InvalidQueryParam
+
+# sort_by -> column, every listing is ordered by (column, id) so a cursor position is unambiguous
+SORT_COLUMNS = {"id": Product.id, "price": Product.price, "name": Product.name}
+
+
+def encode_cursor(sort_by: str, product) -> str:
+    # opaque to clients: the sort key and id of the last product on the page
+    value = getattr(product, sort_by)
+    if isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps([sort_by, value, product.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, value, last_id = json.loads(payload)
+        if cursor_sort_by == "price":
+            value = Decimal(value)
+    except (ValueError, TypeError, binascii.Error, InvalidOperation):
+        raise InvalidQueryParam("Invalid cursor")
+    if cursor_sort_by != sort_by:
+        raise InvalidQueryParam(f"This cursor continues a listing sorted by {cursor_sort_by}, not {sort_by}")
+    if not isinstance(last_id, int) or (sort_by == "name" and not isinstance(value, str)) or (sort_by == "id" and value != last_id):
+        raise InvalidQueryParam("Invalid cursor")
+    return value, last_id
+
+
+def after_cursor(query, sort_by: str, value, last_id: int):
+    # rows strictly after the cursor in (sort key, id) order, an index range scan on the (column, id) indexes
+    if sort_by == "id":
+        return query.where(Product.id > last_id)
+    return query.where(tuple_(SORT_COLUMNS[sort_by], Product.id) > tuple_(value, last_id))
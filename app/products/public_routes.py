@@ -1,48 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.products import models, schemas
-from app.core.database import get_db
+from app.products import catalog_cache, facets, models, pagination, schemas, search, search_index
+from app.core.replica import get_async_read_db, get_read_db
 from app.products.schemas import ProductSearchResponse
+from app.core import conditional
 from app.core.logging import logger
 from app.utils.handlers import InvalidQueryParam, ProductNotFound
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.ProductOut])
-def list_products(
+async def list_products(
+    request: Request,
     category: Optional[str] = None,
     min_price: Optional[float] = Query(default=None, ge=0 ,description="Price must be greater than equal to 0"),
     max_price: Optional[float] = Query(default=None, ge=0 , description="Price must be greater than 0"),
     sort_by: Optional[str] = Query(default="id"),
     page: int = Query(default=1, ge=1 ,description="pages should be greater than 1"),
     page_size: int = Query(default=10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor header of the previous page, used instead of page"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    logger.info(f"User searched for products with: category={category}, min_price={min_price}, max_price={max_price}, sort_by={sort_by}, page={page}, page_size={page_size}")
+    logger.info(
+        "User searched for products with: category=%s, min_price=%s, max_price=%s, sort_by=%s, page=%s, page_size=%s, cursor=%s",
+        category, min_price, max_price, sort_by, page, page_size, cursor is not None,
+        extra={"rate_key": "list_products"},
+    )
     
     valid_sort_fields = ["price", "name", "id"]
     if sort_by not in valid_sort_fields:
         raise InvalidQueryParam(f"Invalid sort_by field. Must be one of: {', '.join(valid_sort_fields)}")
+    if cursor is not None:
+        after = pagination.decode_cursor(cursor, sort_by)
 
-    try:
-        query = db.query(models.Product)
+    async def load():
+        query = select(models.Product)
 
         if category:
-            query = query.filter(models.Product.category == category)
+            query = query.where(models.Product.category == category)
         if min_price is not None:
-            query = query.filter(models.Product.price >= min_price)
+            query = query.where(models.Product.price >= min_price)
         if max_price is not None:
-            query = query.filter(models.Product.price <= max_price)
-
-        query = query.order_by(getattr(models.Product, sort_by))
+            query = query.where(models.Product.price <= max_price)
 
-        offset = (page - 1) * page_size
-        products = query.offset(offset).limit(page_size).all()
+        # id breaks ties, so every row has one position and a cursor can resume right after it
+        query = query.order_by(pagination.SORT_COLUMNS[sort_by], models.Product.id)
+        if cursor is not None:
+            # keyset: seek past the last row of the previous page, the cost doesn't grow with depth
+            query = pagination.after_cursor(query, sort_by, *after)
+        else:
+            query = query.offset((page - 1) * page_size)
 
-        logger.info(f"Products fetched successfully with filters.")
-        return products
+        # one extra row tells whether there is a next page
+        result = await db.execute(query.limit(page_size + 1))
+        products = result.scalars().all()
+        headers = {}
+        if len(products) > page_size:
+            products = products[:page_size]
+            headers["X-Next-Cursor"] = pagination.encode_cursor(sort_by, products[-1])
+        # no Last-Modified: a deleted product changes the page without anything on it getting newer
+        headers.update(conditional.validators(
+            f'W/"{conditional.version_tag(headers.get("X-Next-Cursor"), [(p.id, p.version) for p in products])}"'
+        ))
+        # serialized and cached even for a client that turns out to be revalidating, the check comes after
+        return catalog_cache.pack(headers, catalog_cache.dump_products(products))
 
+    # the same listing asked with differently spelled params (min_price=10 and 10.0) shares an entry
+    key = repr((category or None, min_price, max_price, sort_by, page_size, cursor or page))
+    try:
+        headers, body = catalog_cache.unpack(await catalog_cache.cache.get("list", key, load))
+        logger.info("Products fetched successfully with filters.", extra={"rate_key": "list_products"})
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         raise HTTPException(
@@ -50,32 +80,53 @@ def list_products(
             detail="Something went wrong while fetching products."
         )
 
+    # a cached page costs no serialization, only the validators are compared
+    conditional.check(request, headers)
+    return Response(body, media_type="application/json", headers=headers)
+
 
 @router.get("/search", response_model=ProductSearchResponse)
 def search_products(
     keyword: str = Query(..., min_length=1, max_length=100),
-    db: Session = Depends(get_db),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
 ):
-    logger.info(f"Search requested with keyword: {keyword}")
+    logger.info("Search requested with keyword: %s", keyword, extra={"rate_key": "search"})
     keyword = keyword.strip()
    
     try:
-        keyword_pattern = f"%{keyword}%"
-        products = db.query(models.Product).filter(
-            models.Product.name.ilike(keyword_pattern) |
-            models.Product.description.ilike(keyword_pattern) |
-            models.Product.category.ilike(keyword_pattern)
-        ).all()
+        if search_index.index.ready:
+            ids, has_more = search_index.index.search(keyword, (page - 1) * page_size, page_size)
+            found = {}
+            if ids:
+                found = {p.id: p for p in db.execute(select(models.Product).where(models.Product.id.in_(ids))).scalars()}
+            # in rank order, an id another worker deleted since the last rebuild is skipped
+            products = [found[product_id] for product_id in ids if product_id in found]
+            next_page = page + 1 if has_more else None
+        else:
+            query = search.search_query(db.get_bind().dialect.name, keyword)
+            products = []
+            if query is not None:
+                # one extra row tells whether there is a next page without counting every match
+                products = db.execute(query.offset((page - 1) * page_size).limit(page_size + 1)).scalars().all()
+            next_page = page + 1 if len(products) > page_size else None
+            products = products[:page_size]
 
         if not products:
             return {
                 "products": [],
-                "message": "No matching products found. Try describing the product in more detail."
+                "message": "No matching products found. Try describing the product in more detail.",
+                "page": page,
+                "page_size": page_size,
             }
 
         return {
             "products": products,
-            "message": None 
+            "message": None,
+            "page": page,
+            "page_size": page_size,
+            "next_page": next_page,
         }
 
     except Exception as e:
@@ -86,10 +137,43 @@ def search_products(
         )
     
 
+@router.get("/facets", response_model=schemas.ProductFacetsResponse)
+async def product_facets(
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    bucket_size: float = Query(default=50, ge=1, le=1000000, description="Width of a price histogram bucket"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    # category counts and the price histogram for the filters of /products/, one grouped query
+
+    async def load():
+        query = facets.facets_query(db.get_bind().dialect.name, category, min_price, max_price, bucket_size)
+        rows = (await db.execute(query)).all()
+        return schemas.ProductFacetsResponse(**facets.build_facets(rows, category, bucket_size)).model_dump_json().encode()
+
+    key = repr((category or None, min_price, max_price, bucket_size))
+    try:
+        body = await catalog_cache.cache.get("facets", key, load)
+    except Exception as e:
+        logger.error(f"Error building product facets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Something went wrong while counting products."
+        )
+    return Response(body, media_type="application/json")
+
+
 @router.get("/{id}", response_model=schemas.ProductOut)
-def get_product_detail(id: int = Path(..., ge=1), db: Session = Depends(get_db)):
+async def get_product_detail(request: Request, id: int = Path(..., ge=1), db: AsyncSession = Depends(get_async_read_db)):
+
+    async def load():
+        product = await db.get(models.Product, id)
+        if not product:
+            raise ProductNotFound(id)
+        headers = conditional.validators(f'W/"{product.id}-{product.version}"', product.updated_at)
+        return catalog_cache.pack(headers, catalog_cache.dump_product(product))
 
-    product = db.query(models.Product).filter(models.Product.id == id).first()
-    if not product:
-        raise ProductNotFound()
-    return product
+    headers, body = catalog_cache.unpack(await catalog_cache.cache.get("detail", id, load))
+    conditional.check(request, headers)
+    return Response(body, media_type="application/json", headers=headers)
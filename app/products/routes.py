@@ -1,14 +1,46 @@
-from typing import List
-from fastapi import APIRouter, Body, Depends, Path, Query, status
+import codecs
+import json
+import tempfile
+from typing import List, Optional
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.auth.models import User
 from app.auth.utils import get_current_user
-from app.core.database import get_db
-from app.products import schemas, models
-from app.utils.handlers import ProductNotFound, UnauthorizedAction
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.logging import logger
+from app.products import catalog_cache, importer, schemas, models, search_index
+from app.utils import rows
+from app.utils.handlers import InvalidQueryParam, ProductNotFound, UnauthorizedAction
 
 router = APIRouter()
 
+
+class ImportReportResponse(StreamingResponse):
+    # closes the spooled error report however the response ends. A client that disconnects mid-stream
+    # never gets to the background tasks, so this can't be one of them
+    def __init__(self, content, errors, **kwargs):
+        super().__init__(content, **kwargs)
+        self.errors = errors
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.errors.close()
+
+
+def commit_product(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        # sku is unique
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another product already has this sku")
+
 @router.post("", response_model=schemas.ProductOut)
 def create_product(product_data: schemas.CreateProduct,
                    db: Session = Depends(get_db),
@@ -18,11 +50,80 @@ def create_product(product_data: schemas.CreateProduct,
 
     product = models.Product(**product_data.model_dump(), created_by=current_user.id)
     db.add(product)
-    db.commit()
+    commit_product(db)
     db.refresh(product)
+    search_index.index.add(product)
+    # sync route on the threadpool, the cache lives on the event loop
+    anyio.from_thread.run(catalog_cache.cache.invalidate)
     return product
 
 
+@router.post("/import")
+async def import_products(request: Request,
+                          background_tasks: BackgroundTasks,
+                          format: Optional[str] = Query(default=None, pattern="^(csv|ndjson)$", description="default: from the Content-Type"),
+                          current_user: User = Depends(get_current_user)):
+    # The request body is the feed itself (not a multipart upload), loaded batch by batch as it arrives, same
+    # as `python -m app.cli import-products`. Answers NDJSON: the report, then one line per rejected row.
+    if current_user.role != "admin":
+        raise UnauthorizedAction()
+    format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    body = request.stream()
+    # the error report, spilled to disk past 1MB
+    errors = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+
+    async def next_chunk():
+        return await body.__anext__()
+
+    def lines():
+        # runs on the import thread, pulls the body from the event loop a chunk at a time
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        while True:
+            try:
+                chunk = anyio.from_thread.run(next_chunk)
+            except StopAsyncIteration:
+                break
+            *complete, pending = (pending + decoder.decode(chunk)).split("\n")
+            for line in complete:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    def run_import():
+        with SessionLocal() as db:
+            return importer.import_products(
+                db,
+                rows.read_rows(lines(), format, keep_empty=True),
+                created_by=current_user.id,
+                batch_size=settings.PRODUCT_IMPORT_BATCH_SIZE,
+                on_error=lambda error: errors.write(json.dumps(error).encode() + b"\n"),
+            )
+
+    try:
+        # a failed batch or a feed that stops being readable (bad UTF-8) ends the import, the batches before it
+        # are committed: still a report, with report.error saying where it stopped
+        report = await anyio.to_thread.run_sync(run_import)
+        logger.info(f"{current_user.email} imported products: {report.inserted} new, {report.updated} updated, {report.invalid} rows rejected"
+                    + (f", stopped at row {report.stopped_at_row}: {report.error}" if report.error else ""))
+        if report.inserted or report.updated:
+            await catalog_cache.cache.invalidate()
+            if search_index.index.enabled:
+                # a rebuild picks up the whole feed at once, after the response
+                background_tasks.add_task(search_index.index.load)
+    except BaseException:
+        errors.close()
+        raise
+
+    def report_lines():
+        yield json.dumps(report.as_dict()).encode() + b"\n"
+        errors.seek(0)
+        yield from errors
+
+    return ImportReportResponse(report_lines(), errors, media_type="application/x-ndjson")
+
+
 @router.get("", response_model=List[schemas.ProductOut])
 def get_products(start: int = Query(default=None, ge=0),
                  end: int = Query(default=None, ge=0),
@@ -30,10 +131,18 @@ def get_products(start: int = Query(default=None, ge=0),
                  current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise UnauthorizedAction()
-    
-    return db.query(models.Product).filter(
+
+    # start/end are positions, products [start, end)
+    start = start or 0
+    if end is not None and end < start:
+        raise InvalidQueryParam("end must not be less than start")
+
+    query = db.query(models.Product).filter(
         models.Product.created_by == current_user.id
-    ).offset(start).limit(end).all()
+    ).order_by(models.Product.id).offset(start)
+    if end is not None:
+        query = query.limit(end - start)
+    return query.all()
 
 
 @router.get("/{product_id}", response_model=schemas.ProductOut)
@@ -70,11 +179,14 @@ def update_product(product_data: schemas.CreateProduct,
     if not product:
         raise ProductNotFound(product_id)
 
-    for key, value in product_data.model_dump().items():
+    # a PUT without sku keeps the one the product has
+    for key, value in product_data.model_dump(exclude_unset=True).items():
         setattr(product, key, value)
 
-    db.commit()
+    commit_product(db)
     db.refresh(product)
+    search_index.index.add(product)
+    anyio.from_thread.run(catalog_cache.cache.invalidate)
     return product
 
 
@@ -95,4 +207,6 @@ def delete_product(product_id: int = Path(..., gt=0),
 
     db.delete(product)
     db.commit()
+    search_index.index.remove(product_id)
+    anyio.from_thread.run(catalog_cache.cache.invalidate)
     return {"message": "Product deleted successfully"}
@@ -8,6 +8,8 @@ class CreateProduct(BaseModel):
     stock: int = Field(..., ge=0, le=10000, description="Stock must be between 0 and 10000")
     category: str = Field(..., min_length=2, max_length=50)
     image_url: str
+    # the supplier's stock keeping unit, bulk imports update the product with the same sku
+    sku: Optional[str] = Field(default=None, min_length=1, max_length=64)
 
 class ProductOut(CreateProduct):
     id: int
@@ -18,3 +20,26 @@ class ProductOut(CreateProduct):
 class ProductSearchResponse(BaseModel):
     products: List[ProductOut]
     message: Optional[str] = None
+    page: int = 1
+    page_size: int
+    # set while there are more results, pass it back as page
+    next_page: Optional[int] = None
+
+class CategoryCount(BaseModel):
+    category: Optional[str]
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: float
+    count: int
+
+class ProductFacetsResponse(BaseModel):
+    # products matching every filter
+    total: int
+    # matches per category with the price filter applied, the category filter left out
+    categories: List[CategoryCount]
+    # matches per price range with the category filter applied, the price filter left out, as are min/max
+    price_histogram: List[PriceBucket]
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
@@ -0,0 +1,50 @@
+import re
+
+from sqlalchemy import and_, case, func, literal_column, or_, select
+
+from app.products.models import Product
+
+# generated tsvector column on postgres, see models.SEARCH_VECTOR_SQL
+search_vector = literal_column("products.search_vector")
+
+
+def search_terms(keyword: str) -> list:
+    # letters and digits only, so user input never reaches to_tsquery's operator syntax
+    return re.findall(r"[^\W_]+", keyword.lower())
+
+
+def fulltext_query(terms: list):
+    # every term has to match as a word prefix, so "wireless head" finds wireless headphones
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    query = func.to_tsquery("english", tsquery)
+    rank = func.ts_rank(search_vector, query)
+    return select(Product).where(search_vector.op("@@")(query)).order_by(rank.desc(), Product.id)
+
+
+def like_query(terms: list):
+    # sqlite and anything else without the tsvector column: substring match per term, name matches first
+    # in place of a rank. Still a full scan, fine for dev databases only
+    matches = []
+    for term in terms:
+        pattern = f"%{term}%"
+        matches.append(or_(
+            Product.name.ilike(pattern),
+            Product.description.ilike(pattern),
+            Product.category.ilike(pattern),
+        ))
+    first_term = f"%{terms[0]}%"
+    weight = case(
+        (Product.name.ilike(first_term), 0),
+        (Product.category.ilike(first_term), 1),
+        else_=2,
+    )
+    return select(Product).where(and_(*matches)).order_by(weight, Product.id)
+
+
+def search_query(dialect_name: str, keyword: str):
+    terms = search_terms(keyword)
+    if not terms:
+        return None
+    if dialect_name == "postgresql":
+        return fulltext_query(terms)
+    return like_query(terms)
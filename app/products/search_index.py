@@ -0,0 +1,328 @@
+import asyncio
+import bisect
+import heapq
+import math
+import sys
+import threading
+import time
+from array import array
+from collections import Counter as TermCounter
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.cache import LRUCache
+from app.core.config import Settings, settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.core.metrics import Gauge, Histogram, register
+from app.products.models import Product
+from app.products.search import search_terms
+
+index_size = register(Gauge(
+    "search_index_size",
+    "Products and distinct terms in the in-process search index",
+    ("kind",),
+))
+index_build_duration = register(Histogram(
+    "search_index_build_duration_seconds",
+    "Full rebuilds of the in-process search index",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+))
+
+# a name match counts three times, a category match twice, like the weights of the postgres tsvector
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+
+def product_terms(name, description, category) -> TermCounter:
+    terms = TermCounter()
+    for text, weight in ((name, NAME_WEIGHT), (category, CATEGORY_WEIGHT), (description, DESCRIPTION_WEIGHT)):
+        for term in search_terms(text or ""):
+            # one string per distinct term, shared by the postings, the vocabulary and every product's term list
+            terms[sys.intern(term)] += weight
+    return terms
+
+
+class InvertedIndex:
+    # term -> (product ids, weighted term frequencies), two parallel arrays sorted by id: about 6 bytes a posting
+    # where a dict would take over 50. Writers take SearchIndex's lock, searches don't: once the index is shared
+    # add/remove replace the postings and the vocabulary they change instead of editing them in place, so a
+    # search keeps a consistent view of every term it looked up
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []  # sorted, prefix matches are a bisect away
+        self.doc_terms = {}   # product id -> its terms, so a product can be taken out again
+        self.doc_lengths = {}
+        self.total_length = 0
+        # false while a rebuild fills it, nothing else sees it yet and editing in place is much cheaper
+        self.shared = False
+
+    def add(self, product_id: int, terms: TermCounter):
+        self.remove(product_id)
+        # the length goes in before any posting, a search that finds the product can always look it up
+        length = sum(terms.values())
+        self.doc_terms[product_id] = tuple(terms)
+        self.doc_lengths[product_id] = length
+        self.total_length += length
+        new_terms = []
+        for term, frequency in terms.items():
+            frequency = min(frequency, 65535)
+            postings = self.postings.get(term)
+            if postings is None:
+                self.postings[term] = (array("i", [product_id]), array("H", [frequency]))
+                new_terms.append(term)
+                continue
+            ids, frequencies = postings
+            if self.shared:
+                ids, frequencies = ids[:], frequencies[:]
+            if ids[-1] < product_id:
+                # the startup scan goes in id order and new products get the highest id, so nearly always an append
+                ids.append(product_id)
+                frequencies.append(frequency)
+            else:
+                position = bisect.bisect_left(ids, product_id)
+                ids.insert(position, product_id)
+                frequencies.insert(position, frequency)
+            self.postings[term] = (ids, frequencies)
+        if new_terms:
+            vocabulary = self.vocabulary.copy() if self.shared else self.vocabulary
+            for term in new_terms:
+                bisect.insort(vocabulary, term)
+            self.vocabulary = vocabulary
+
+    def remove(self, product_id: int):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        gone = []
+        for term in terms:
+            ids, frequencies = self.postings[term]
+            if len(ids) == 1:
+                del self.postings[term]
+                gone.append(term)
+                continue
+            if self.shared:
+                ids, frequencies = ids[:], frequencies[:]
+            position = bisect.bisect_left(ids, product_id)
+            del ids[position]
+            del frequencies[position]
+            self.postings[term] = (ids, frequencies)
+        if gone:
+            vocabulary = self.vocabulary.copy() if self.shared else self.vocabulary
+            for term in gone:
+                del vocabulary[bisect.bisect_left(vocabulary, term)]
+            self.vocabulary = vocabulary
+        self.total_length -= self.doc_lengths.pop(product_id)
+
+    def expand(self, prefix: str, limit: int) -> list:
+        # the term itself first, then up to limit - 1 longer terms starting with it
+        vocabulary = self.vocabulary
+        start = bisect.bisect_left(vocabulary, prefix)
+        terms = []
+        for term in vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, terms: list, count: int, max_expansions: int) -> list:
+        # every query term has to match (as a prefix), ranked by BM25 with the best expansion per term
+        doc_lengths = self.doc_lengths
+        documents = len(doc_lengths)
+        if not documents:
+            return []
+        average_length = self.total_length / documents
+
+        groups = []
+        for term in terms:
+            group = []
+            for expanded in self.expand(term, max_expansions):
+                postings = self.postings[expanded]
+                matches = len(postings[0])
+                idf = math.log(1 + (documents - matches + 0.5) / (matches + 0.5))
+                group.append((postings, idf))
+            if not group:
+                return []
+            groups.append(group)
+        # candidates come from the rarest term, the others only filter them and add to the score
+        groups.sort(key=lambda group: sum(len(postings[0]) for postings, _ in group))
+
+        norm = K1 * B / average_length
+        base = K1 * (1 - B)
+
+        def term_scores(ids, frequencies, idf, candidates):
+            # BM25 of one term for the products in its postings, only the candidates once there are any
+            boost = idf * (K1 + 1)
+            if candidates is None:
+                return {product_id: boost * frequency / (frequency + base + norm * doc_lengths[product_id])
+                        for product_id, frequency in zip(ids, frequencies)}
+            return {product_id: boost * frequency / (frequency + base + norm * doc_lengths[product_id])
+                    for product_id, frequency in zip(ids, frequencies) if product_id in candidates}
+
+        scores = None
+        for group in groups:
+            best = {}
+            for (ids, frequencies), idf in group:
+                matches = term_scores(ids, frequencies, idf, scores)
+                if not best:
+                    best = matches
+                    continue
+                for product_id, score in matches.items():
+                    if score > best.get(product_id, 0):
+                        best[product_id] = score
+            if scores is None:
+                scores = best
+            else:
+                scores = {product_id: scores[product_id] + score for product_id, score in best.items()}
+        # nlargest is stable, equal scores keep the postings' id order so pages don't shuffle between requests
+        return heapq.nlargest(count, scores, key=scores.get)
+
+
+def record_size(index: InvertedIndex):
+    index_size.set("products", value=len(index.doc_lengths))
+    index_size.set("terms", value=len(index.vocabulary))
+
+
+class SearchIndex:
+    # In-process product search. Built from a streamed scan of products at startup, kept current by the admin
+    # product routes of this process and rebuilt every SEARCH_INDEX_REFRESH_SECONDS to pick up the writes other
+    # workers made. Until the first build finishes, search falls back to the database.
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.index = InvertedIndex()
+        self.index.shared = True
+        self.ready = False
+        # bumped by every change, a result computed before a change is not cached
+        self.generation = 0
+        self.lock = threading.Lock()
+        # writes that land while a rebuild scans the table, replayed onto the new index
+        self.pending = None
+        self.results = LRUCache("search_results", settings.SEARCH_INDEX_CACHE_SIZE, settings.SEARCH_INDEX_CACHE_TTL_SECONDS)
+        self.task = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.SEARCH_INDEX_ENABLED
+
+    def add(self, product):
+        if not self.enabled:
+            return
+        terms = product_terms(product.name, product.description, product.category)
+        with self.lock:
+            self.index.add(product.id, terms)
+            self.generation += 1
+            if self.pending is not None:
+                self.pending.append((product.id, terms))
+            record_size(self.index)
+        self.results.clear()
+
+    def remove(self, product_id: int):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.index.remove(product_id)
+            self.generation += 1
+            if self.pending is not None:
+                self.pending.append((product_id, None))
+            record_size(self.index)
+        self.results.clear()
+
+    def search(self, keyword: str, offset: int, limit: int):
+        # (product ids of the page, whether there is a next one)
+        terms = search_terms(keyword)
+        if not terms:
+            return [], False
+        key = (tuple(terms), offset, limit)
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached
+        # scored outside the lock, on the index as it is now: a rebuild swaps in another one, add/remove copy
+        # what they change
+        with self.lock:
+            generation = self.generation
+            index = self.index
+        try:
+            ids = index.search(terms, offset + limit + 1, self.settings.SEARCH_INDEX_MAX_EXPANSIONS)
+        except KeyError:
+            # a product (or a term's last product) removed while it ran, still in what it had looked up. Rare,
+            # scored again with writers held off
+            with self.lock:
+                generation = self.generation
+                ids = self.index.search(terms, offset + limit + 1, self.settings.SEARCH_INDEX_MAX_EXPANSIONS)
+        page = (ids[offset:offset + limit], len(ids) > offset + limit)
+        with self.lock:
+            if generation == self.generation:
+                self.results.set(key, page)
+        return page
+
+    def build(self, rows) -> InvertedIndex:
+        index = InvertedIndex()
+        for product_id, name, description, category in rows:
+            index.add(product_id, product_terms(name, description, category))
+        return index
+
+    def load(self):
+        start = time.perf_counter()
+        with self.lock:
+            self.pending = []
+        try:
+            with SessionLocal() as db:
+                rows = db.execute(
+                    select(Product.id, Product.name, Product.description, Product.category)
+                    .order_by(Product.id)
+                    .execution_options(yield_per=self.settings.SEARCH_INDEX_SCAN_BATCH_SIZE)
+                )
+                index = self.build(rows)
+            with self.lock:
+                for product_id, terms in self.pending:
+                    if terms is None:
+                        index.remove(product_id)
+                    else:
+                        index.add(product_id, terms)
+                index.shared = True
+                self.index = index
+                self.generation += 1
+                self.ready = True
+        finally:
+            with self.lock:
+                self.pending = None
+        self.results.clear()
+        index_build_duration.observe(time.perf_counter() - start)
+        record_size(index)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.settings.SEARCH_INDEX_REFRESH_SECONDS)
+            try:
+                await asyncio.to_thread(self.load)
+            except SQLAlchemyError as e:
+                logger.warning(f"search index rebuild failed, keeping the previous one: {e}")
+
+    async def start(self):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self.load)
+            logger.info(f"search index built, {len(self.index.doc_lengths)} products")
+        except SQLAlchemyError as e:
+            logger.warning(f"could not build the search index, searching the database instead ({e})")
+        if self.settings.SEARCH_INDEX_REFRESH_SECONDS > 0:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+
+index = SearchIndex(settings)
@@ -1,5 +1,5 @@
 # handlers.py
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi import Request
 
 class ProductNotFound(Exception):
@@ -28,4 +28,38 @@ async def unauthorized_action_handler(request: Request, exc: UnauthorizedAction)
 
 
 async def invalid_query_param_handler(request: Request, exc: InvalidQueryParam):
-    return JSONResponse(status_code=400, content={"detail": exc.message})
\ No newline at end of file
+    return JSONResponse(status_code=400, content={"detail": exc.message})
+
+class ServiceOverloaded(Exception):
+    def __init__(self, retry_after: int, message: str = "Server is busy, please retry shortly"):
+        self.retry_after = retry_after
+        self.message = message
+
+async def service_overloaded_handler(request: Request, exc: ServiceOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.message},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: int, message: str = "Too many requests, please retry later"):
+        self.retry_after = retry_after
+        self.message = message
+
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.message},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+class NotModified(Exception):
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+async def not_modified_handler(request: Request, exc: NotModified):
+    # the validators go back with the 304 so caches can refresh what they hold
+    return Response(status_code=304, headers=exc.headers)
@@ -0,0 +1,33 @@
+import csv
+import json
+
+# CSV / NDJSON feeds for the bulk imports (users, products)
+
+
+def detect_format(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "ndjson"
+
+
+def read_rows(lines, format: str, keep_empty: bool = False):
+    # yields (row number, dict), or (row number, error message) for lines that don't parse. `lines` is any
+    # iterable of text lines, a file or a generator over an upload
+    if format == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            if keep_empty:
+                # cells past the header are dropped, missing ones stay None and fail validation
+                row.pop(None, None)
+                yield number, row
+                continue
+            # empty cells fall back to the schema defaults
+            yield number, {key: value for key, value in row.items() if key and value not in (None, "")}
+        return
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"invalid json: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else "expected a json object"
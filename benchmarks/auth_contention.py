@@ -0,0 +1,120 @@
+"""Catalog latency while a burst of signins runs in the same worker.
+
+Usage:
+    python -m benchmarks.auth_contention --database-url sqlite:///./bench_auth.db
+
+Three phases against the in-process app: catalog traffic alone, catalog plus
+signins with bcrypt on the thread pool (PASSWORD_HASH_WORKERS=0, what the routes
+used to do inline) and catalog plus signins on the hashing process pool. Signins
+shed by the pool come back as 503 and are counted, not retried.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import bench_env
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--database-url", default="sqlite:///./bench_auth.db")
+parser.add_argument("--products", type=int, default=500)
+parser.add_argument("--duration", type=float, default=10.0)
+parser.add_argument("--catalog-concurrency", type=int, default=8)
+parser.add_argument("--signin-concurrency", type=int, default=32)
+parser.add_argument("--workers", type=int, default=2)
+parser.add_argument("--max-queue", type=int, default=16)
+args = parser.parse_args()
+
+bench_env(args.database_url)
+
+PASSWORD = "Bench@1234"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+def seed():
+    from app.auth.models import User
+    from app.auth.passwords import hash_password
+    from app.core.database import Base, Engine, SessionLocal
+    from app.products.models import Product
+
+    Base.metadata.drop_all(bind=Engine)
+    Base.metadata.create_all(bind=Engine)
+    db = SessionLocal()
+    admin = User(name="admin", email="admin@gmail.com", hashed_password=hash_password(PASSWORD), role="admin")
+    db.add(admin)
+    db.flush()
+    db.add_all(
+        Product(name=f"product {i}", description="bench", price=10 + i % 90, stock=10000,
+                category=f"cat{i % 20}", image_url="", created_by=admin.id)
+        for i in range(args.products)
+    )
+    db.commit()
+    db.close()
+
+
+async def phase(client, signins: bool):
+    deadline = time.perf_counter() + args.duration
+    catalog_latencies = []
+    signin_status = {}
+
+    async def catalog():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/products/?page=3")
+            catalog_latencies.append(time.perf_counter() - start)
+
+    async def signin():
+        while time.perf_counter() < deadline:
+            response = await client.post("/auth/signin", json={"email": "admin@gmail.com", "password": PASSWORD})
+            signin_status[response.status_code] = signin_status.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                # a real client would honour Retry-After, don't spin on the rejection
+                await asyncio.sleep(0.05)
+
+    tasks = [catalog() for _ in range(args.catalog_concurrency)]
+    if signins:
+        tasks += [signin() for _ in range(args.signin_concurrency)]
+    await asyncio.gather(*tasks)
+    return catalog_latencies, signin_status
+
+
+async def main():
+    import logging
+
+    import httpx
+
+    from app.auth import hashing
+    from app.core.database import AsyncEngine
+    from app.main import create_app
+
+    seed()
+    app = create_app()
+    logging.getLogger("ecommerce").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    phases = [
+        ("catalog only", None),
+        ("inline bcrypt", hashing.HashingPool(0, 10 ** 6, 1)),
+        ("process pool", hashing.HashingPool(args.workers, args.max_queue, 1)),
+    ]
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'phase':<15}{'catalog/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'signin/s':>10}{'503s':>7}")
+        for name, pool in phases:
+            if pool is not None:
+                pool.start()
+                hashing.pool = pool
+            latencies, status = await phase(client, signins=pool is not None)
+            if pool is not None:
+                pool.shutdown()
+            print(f"{name:<15}{len(latencies) / args.duration:>10.1f}{percentile(latencies, 0.5):>9.1f}"
+                  f"{percentile(latencies, 0.95):>9.1f}{percentile(latencies, 0.99):>9.1f}"
+                  f"{status.get(200, 0) / args.duration:>10.1f}{status.get(503, 0):>7}")
+    await AsyncEngine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
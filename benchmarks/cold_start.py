@@ -0,0 +1,72 @@
+"""Cold-start time: process spawn to the first served request.
+
+Usage:
+    python -m benchmarks.cold_start --database-url sqlite:///./bench_cold.db --runs 5
+
+Starts `uvicorn app.main:create_app --factory` in a fresh process, polls until
+GET /products/ answers, and reports that time. The time to import app.main on
+its own is measured the same way, in a fresh interpreter each run.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import bench_env
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time():
+    code = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=os.environ)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def first_request_time(timeout=60):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory", "--port", str(port), "--log-level", "warning"],
+        env=os.environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/products/", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError("server did not answer in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_cold.db")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_env(args.database_url)
+    subprocess.run([sys.executable, "-m", "app.cli", "create-tables"], check=True, env=os.environ, stdout=subprocess.DEVNULL)
+
+    imports = [import_time() for _ in range(args.runs)]
+    starts = [first_request_time() for _ in range(args.runs)]
+    print(f"import app.main:        median {statistics.median(imports) * 1000:8.1f} ms   min {min(imports) * 1000:8.1f} ms")
+    print(f"spawn -> first request: median {statistics.median(starts) * 1000:8.1f} ms   min {min(starts) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
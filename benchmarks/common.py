@@ -0,0 +1,19 @@
+import os
+
+# settings the app needs at import time, benchmarks never read a real .env secret
+BENCH_ENV = {
+    "SECRET_KEY": "bench",
+    "REFRESH_SECRET_KEY": "bench-refresh",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    # every simulated client shares one address, the auth rate limits would cap the run
+    "RATE_LIMIT_ENABLED": "false",
+}
+
+
+def bench_env(database_url: str):
+    # call before importing anything from app
+    os.environ["DATABASE_URL"] = database_url
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
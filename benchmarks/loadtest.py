@@ -0,0 +1,198 @@
+"""End-to-end load test with scripted user journeys.
+
+Usage:
+    python -m benchmarks.seed --database-url sqlite:///./bench_load.db --reset
+    python -m benchmarks.loadtest --database-url sqlite:///./bench_load.db --duration 30 --users 50 \
+        --output load-$(git rev-parse --short HEAD).json
+    python -m benchmarks.loadtest ... --compare load-<old>.json
+
+Runs in-process against the ASGI app by default, or against a running server
+with --base-url http://127.0.0.1:8000 (the server must use the seeded database).
+Each step of each journey is reported separately with p50/p95/p99 and RPS.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import bench_env
+from benchmarks.seed import CATEGORIES, SEED_PASSWORD, WORDS, seed_email
+
+# journey name -> relative weight
+JOURNEYS = {
+    "browse": 40,
+    "search": 25,
+    "cart_checkout": 15,
+    "orders": 15,
+    "signup_signin": 5,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, step, client, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[step].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[step] += 1
+        return response
+
+    def report(self, elapsed):
+        report = {}
+        for step in sorted(self.latencies):
+            values = sorted(self.latencies[step])
+            report[step] = {
+                "requests": len(values),
+                "errors": self.errors[step],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return report
+
+
+async def signin(recorder, client, email):
+    response = await recorder.call("signin", client, "POST", "/auth/signin",
+                                   json={"email": email, "password": SEED_PASSWORD})
+    if response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def browse(recorder, client, rng, headers):
+    params = {"category": rng.choice(CATEGORIES), "sort_by": rng.choice(["id", "price", "name"]),
+              "page": rng.randint(1, 20), "page_size": 20}
+    if rng.random() < 0.5:
+        params["min_price"] = rng.randint(1, 500)
+        params["max_price"] = params["min_price"] + rng.randint(50, 1000)
+    await recorder.call("browse", client, "GET", "/products/", params=params)
+
+
+async def search(recorder, client, rng, headers):
+    await recorder.call("search", client, "GET", "/products/search", params={"keyword": rng.choice(WORDS)})
+
+
+async def cart_checkout(recorder, client, rng, headers, products):
+    for product_id in rng.sample(range(1, products + 1), 2):
+        await recorder.call("add_to_cart", client, "POST", "/cart", headers=headers,
+                            json={"product_id": product_id, "quantity": 1})
+    await recorder.call("view_cart", client, "GET", "/cart", headers=headers)
+    await recorder.call("checkout", client, "POST", "/checkout", headers=headers)
+
+
+async def orders(recorder, client, rng, headers):
+    response = await recorder.call("orders", client, "GET", "/orders/", headers=headers)
+    if response.status_code == 200 and response.json():
+        order_id = rng.choice(response.json())["order_id"]
+        await recorder.call("order_detail", client, "GET", f"/orders/{order_id}", headers=headers)
+
+
+async def signup_signin(recorder, client, rng, run_id, counter):
+    email = f"load{run_id}x{next(counter)}@gmail.com"
+    await recorder.call("signup", client, "POST", "/auth/signup",
+                        json={"name": "load user", "email": email, "password": SEED_PASSWORD})
+    await signin(recorder, client, email)
+
+
+async def virtual_user(vu, args, client, recorder, deadline, counter):
+    rng = random.Random(args.seed + vu)
+    names = list(JOURNEYS)
+    weights = [JOURNEYS[name] for name in names]
+    # each virtual user is one seeded shopper, signed in once up front
+    headers = await signin(recorder, client, seed_email(vu % args.seeded_users))
+    while time.perf_counter() < deadline:
+        journey = rng.choices(names, weights)[0]
+        if journey == "browse":
+            await browse(recorder, client, rng, headers)
+        elif journey == "search":
+            await search(recorder, client, rng, headers)
+        elif journey == "cart_checkout" and headers:
+            await cart_checkout(recorder, client, rng, headers, args.products)
+        elif journey == "orders" and headers:
+            await orders(recorder, client, rng, headers)
+        elif journey == "signup_signin":
+            await signup_signin(recorder, client, rng, args.run_id, counter)
+
+
+def print_report(report, baseline=None):
+    print(f"{'step':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, row in report.items():
+        line = f"{step:<16}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        old = (baseline or {}).get(step)
+        if old:
+            line += f"   p95 {row['p95_ms'] - old['p95_ms']:+.2f} ms, rps {row['rps'] - old['rps']:+.1f}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_load.db")
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--seeded-users", type=int, default=10000, help="--users value given to the seeder")
+    parser.add_argument("--products", type=int, default=50000, help="--products value given to the seeder")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="JSON report of an earlier run to diff against")
+    args = parser.parse_args()
+    args.run_id = int(time.time())
+
+    # the in-process app runs its lifespan (pool warm-up, hashing workers), as under uvicorn
+    lifespan = contextlib.nullcontext()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        bench_env(args.database_url)
+        import logging
+        from app.main import app
+        logging.getLogger("ecommerce").setLevel(logging.WARNING)
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    recorder = Recorder()
+    counter = iter(range(sys.maxsize))
+    async with lifespan, client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(virtual_user(vu, args, client, recorder, deadline, counter) for vu in range(args.users)))
+        elapsed = time.perf_counter() - start
+
+    if not args.base_url:
+        # aiosqlite connections run on their own threads and keep the process alive until disposed
+        from app.core.database import AsyncEngine
+        await AsyncEngine.dispose()
+
+    report = recorder.report(elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["steps"]
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"duration": round(elapsed, 2), "users": args.users, "steps": report}, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Per-request logging overhead of the old synchronous handlers vs the queue pipeline.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 20000
+
+A "request" is the logging a list_products call does: DB session open/close
+plus the route's own INFO lines. Only the time spent in the calling thread is
+counted, that is what sits on the request path. The queue is drained afterwards
+and reported separately.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.common import bench_env
+
+bench_env("sqlite:///./bench_logging.db")
+
+from app.core.logging import LOG_FORMAT, queue_pipeline
+
+
+def fake_request_before(logger, i):
+    logger.info("Connected to the database")
+    logger.info(f"User searched for products with: category=cat{i % 20}, min_price=None, max_price=None, sort_by=id, page={i}, page_size=10")
+    logger.info(f"Products fetched successfully with filters.")
+    logger.info("Database connection closed")
+
+
+def fake_request_after(logger, i):
+    logger.info("Connected to the database", extra={"rate_key": "db_session"})
+    logger.info(
+        "User searched for products with: category=%s, min_price=%s, max_price=%s, sort_by=%s, page=%s, page_size=%s",
+        f"cat{i % 20}", None, None, "id", i, 10,
+        extra={"rate_key": "list_products"},
+    )
+    logger.info("Products fetched successfully with filters.", extra={"rate_key": "list_products"})
+    logger.info("Database connection closed", extra={"rate_key": "db_session"})
+
+
+def outputs(directory, name):
+    devnull = open(os.devnull, "w")
+    handlers = [logging.FileHandler(os.path.join(directory, name)), logging.StreamHandler(devnull)]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handlers
+
+
+def measure(logger, request, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        request(logger, i)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rate-limit", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        before = logging.getLogger("bench.before")
+        before.propagate = False
+        before.setLevel(logging.INFO)
+        for handler in outputs(directory, "before.log"):
+            before.addHandler(handler)
+
+        after = logging.getLogger("bench.after")
+        after.propagate = False
+        after.setLevel(logging.INFO)
+        queue_handler, listener = queue_pipeline(outputs(directory, "after.log"), args.rate_limit)
+        after.addHandler(queue_handler)
+        listener.start()
+
+        before_us = measure(before, fake_request_before, args.requests)
+        after_us = measure(after, fake_request_after, args.requests)
+
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain_ms = (time.perf_counter() - drain_start) * 1000
+
+        print(f"{'pipeline':<32}{'us/request':>12}")
+        print(f"{'sync file + stream (before)':<32}{before_us:>12.2f}")
+        print(f"{'queue + rate limit (after)':<32}{after_us:>12.2f}")
+        print(f"background drain after run: {drain_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Microbenchmarks for the per-request CPU work, checked against stored baselines.
+
+Usage:
+    python -m benchmarks.micro                  # compare with baselines.json, exit 1 on a regression
+    python -m benchmarks.micro --update         # re-record baselines.json
+    python -m benchmarks.micro --filter token   # only cases whose name contains "token"
+
+Timings are the best of several repeats, a repeat of a sub-microsecond case runs
+for at least --min-time so scheduling noise evens out. They are compared as a
+ratio to a fixed pure-Python calibration loop timed alongside each case, so a
+baseline recorded on one machine is still meaningful on a faster or slower one.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import timeit
+
+from benchmarks.common import bench_env
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+def calibration():
+    total = 0
+    for i in range(10000):
+        total += i * i % 7
+    return total
+
+
+def best_times(fn, repeat, min_time):
+    # case and calibration are timed alternately so both see the same machine load
+    timer = timeit.Timer(fn)
+    calibration_timer = timeit.Timer(calibration)
+    number, elapsed = timer.autorange()
+    if elapsed / number < 1e-6:
+        number = max(number, math.ceil(min_time * number / elapsed))
+    calibration_number, _ = calibration_timer.autorange()
+    best, best_calibration = float("inf"), float("inf")
+    for _ in range(repeat):
+        best_calibration = min(best_calibration, calibration_timer.timeit(calibration_number) / calibration_number)
+        best = min(best, timer.timeit(number) / number)
+    return best, best_calibration
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true", help="record the results as the new baselines")
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per repeat of a sub-microsecond case")
+    parser.add_argument("--threshold", type=float, default=1.3, help="allowed slowdown ratio before failing")
+    args = parser.parse_args()
+
+    bench_env("sqlite:///:memory:")
+    from benchmarks.micro.cases import CASES, setup_cases
+    setup_cases()
+
+    calibration_s = float("inf")
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<26}{'us/call':>12}{'relative':>10}{'baseline':>10}{'change':>9}")
+    for name, fn in CASES.items():
+        if args.filter not in name:
+            continue
+        seconds, case_calibration_s = best_times(fn, args.repeat, args.min_time)
+        calibration_s = min(calibration_s, case_calibration_s)
+        relative = seconds / case_calibration_s
+        results[name] = {"us": round(seconds * 1e6, 3), "relative": float(f"{relative:.6g}")}
+
+        baseline = baselines.get("cases", {}).get(name)
+        if baseline:
+            change = relative / baseline["relative"]
+            flag = "  REGRESSION" if change > args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<26}{seconds * 1e6:>12.2f}{relative:>10.4g}{baseline['relative']:>10.4g}{change:>8.2f}x{flag}")
+        else:
+            print(f"{name:<26}{seconds * 1e6:>12.2f}{relative:>10.4g}{'-':>10}{'-':>9}")
+
+    if args.update:
+        cases = {**baselines.get("cases", {}), **results}
+        with open(BASELINES, "w") as f:
+            json.dump({"calibration_us": round(calibration_s * 1e6, 3), "cases": cases}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baselines written to {BASELINES}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
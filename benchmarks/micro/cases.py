@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+
+# name -> zero-argument callable, registered by @case
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def setup_cases():
+    # imports are deferred so bench_env() runs before the app settings are read
+    from app.auth import jwt_handler
+    from app.auth.schemas import validate_email_domain, validate_password
+    from app.auth.passwords import hash_password, verify_password
+    from app.main import app
+    from app.orders.schemas import OrderDetailResponse
+    from app.products.schemas import ProductOut
+
+    password_hash = hash_password("Bench@1234")
+    token = jwt_handler.create_access_token({"sub": "bench@gmail.com", "role": "user"})
+
+    products = [
+        SimpleNamespace(id=i, name=f"product {i}", description="a fairly ordinary product description " * 4,
+                        price=19.99 + i, stock=100, category="electronics", image_url=f"https://img.example.com/{i}.jpg",
+                        sku=f"SKU-{i:08d}")
+        for i in range(1000)
+    ]
+    products_adapter = TypeAdapter(List[ProductOut])
+
+    order = {
+        "order_id": 1,
+        "created_at": datetime(2025, 6, 1, tzinfo=timezone.utc),
+        "total_amount": 12345.0,
+        "status": "paid",
+        "items": [
+            {"product_id": i + 1, "quantity": 2, "price_at_purchase": 10.5,
+             "product_name": f"product {i}", "subtotal": 21.0}
+            for i in range(500)
+        ],
+    }
+    order_adapter = TypeAdapter(OrderDetailResponse)
+
+    case("hash_password")(lambda: hash_password("Bench@1234"))
+    case("verify_password")(lambda: verify_password("Bench@1234", password_hash))
+    case("create_access_token")(lambda: jwt_handler.create_access_token({"sub": "bench@gmail.com", "role": "user"}))
+    # signature check and parsing, as for a token not seen before; a repeated token is a cache hit
+    verifier = jwt_handler.TokenVerifier(jwt_handler.SECRET_KEY, jwt_handler.ALGORITHM)
+    case("decode_token")(lambda: verifier.verify(token))
+    case("decode_token_cached")(lambda: jwt_handler.decode_token(token))
+    case("validate_password")(lambda: validate_password("Str0ng!Password"))
+    case("validate_email_domain")(lambda: validate_email_domain("someone@gmail.com"))
+
+    # the same validate + dump FastAPI does for a response_model
+    @case("product_out_list_1000")
+    def product_out_list():
+        return products_adapter.dump_json(products_adapter.validate_python(products, from_attributes=True))
+
+    @case("order_detail_500_items")
+    def order_detail():
+        return order_adapter.dump_json(order_adapter.validate_python(order, from_attributes=True))
+
+    @case("custom_openapi")
+    def build_openapi():
+        app.openapi_schema = None
+        return app.openapi()
@@ -0,0 +1,63 @@
+"""Per-request cost of TimingMiddleware.
+
+Usage:
+    python -m benchmarks.middleware_overhead --requests 200000
+
+Calls a bare ASGI app directly, with and without the middleware, so the
+difference is the middleware alone. Exits non-zero above --budget-us.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.core.middleware import TimingMiddleware
+
+PREFIXES = ["/auth", "/admin/products", "/admin", "/products", "/cart", "/orders", "/checkout"]
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def measure(app, requests):
+    paths = ["/products/", "/products/42", "/cart", "/orders/7", "/checkout", "/"]
+    scopes = [{"type": "http", "method": "GET", "path": path} for path in paths]
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % len(scopes)], receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    wrapped = TimingMiddleware(endpoint, PREFIXES)
+    # warm up both paths before timing
+    await measure(endpoint, 1000)
+    await measure(wrapped, 1000)
+
+    bare_us = await measure(endpoint, args.requests)
+    wrapped_us = await measure(wrapped, args.requests)
+    overhead_us = wrapped_us - bare_us
+
+    print(f"bare app:        {bare_us:8.2f} us/request")
+    print(f"with middleware: {wrapped_us:8.2f} us/request")
+    print(f"overhead:        {overhead_us:8.2f} us/request (budget {args.budget_us:.0f} us)")
+    return 0 if overhead_us <= args.budget_us else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
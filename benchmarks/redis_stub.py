@@ -0,0 +1,146 @@
+"""Local Redis-protocol stand-in, enough for the shared rate limiter and catalog cache backends.
+
+Usage:
+    python -m benchmarks.redis_stub --port 6390
+
+then run the app with RATE_LIMIT_BACKEND=redis RATE_LIMIT_REDIS_URL=redis://localhost:6390/0.
+In-process use works like benchmarks.smtp_sink:
+
+    stub = RedisStub(port=6390)
+    stub.start()        # serves from a background thread
+    ...
+    stub.data           # key -> bytes
+    stub.stop()
+
+Supports PING, AUTH, SELECT, GET, SET (with EX/PX), INCR, DEL, EXPIRE and PEXPIRE, all on
+one keyspace, with lazy expiry.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from app.core.resp import RespError, read_reply
+
+
+class RedisStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        self.host = host
+        self.port = port
+        self.data = {}
+        self.expires = {}
+        self.commands = 0
+        self.loop = None
+        self.thread = None
+
+    def alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def run(self, name, args):
+        if name in ("PING",):
+            return "+PONG"
+        if name in ("AUTH", "SELECT"):
+            return "+OK"
+        if name == "GET":
+            return self.data[args[0]] if self.alive(args[0]) else None
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            if len(args) == 4 and args[2].upper() in (b"EX", b"PX"):
+                seconds = int(args[3]) / (1000 if args[2].upper() == b"PX" else 1)
+                self.expires[args[0]] = time.monotonic() + seconds
+            return "+OK"
+        if name == "INCR":
+            value = int(self.data[args[0]]) + 1 if self.alive(args[0]) else 1
+            self.data[args[0]] = str(value).encode()
+            return value
+        if name == "DEL":
+            removed = sum(1 for key in args if self.alive(key))
+            for key in args:
+                self.data.pop(key, None)
+                self.expires.pop(key, None)
+            return removed
+        if name in ("EXPIRE", "PEXPIRE"):
+            if not self.alive(args[0]):
+                return 0
+            seconds = int(args[1]) / (1000 if name == "PEXPIRE" else 1)
+            self.expires[args[0]] = time.monotonic() + seconds
+            return 1
+        raise RespError(f"ERR unknown command '{name}'")
+
+    @staticmethod
+    def encode(reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return reply.encode() + b"\r\n"
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                self.commands += 1
+                try:
+                    reply = self.encode(self.run(command[0].decode().upper(), command[1:]))
+                except RespError as e:
+                    reply = f"-{e}\r\n".encode()
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # clients keep pooled connections open, stop() cancels them
+            pass
+        writer.close()
+
+    async def serve(self, started=None):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        if started is not None:
+            started()
+        async with server:
+            await server.serve_forever()
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.serve(started=ready.set))
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="redis-stub", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def stop(self):
+        def close():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+
+        self.loop.call_soon_threadsafe(close)
+        self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"redis stub listening on {args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(RedisStub(args.host, args.port).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Build time, memory and query latency of the in-process search index.
+
+Usage:
+    python -m benchmarks.search_index --products 100000,500000,1000000
+
+For each size, indexes synthetic products (benchmarks.seed vocabulary plus a
+unique model number per name, so the vocabulary grows with the catalog) fed
+straight from a generator, the same path as the startup scan minus the
+database. Memory is what tracemalloc sees the index hold after a second,
+traced build. Latency is per query shape, with the result cache cleared
+and then with it warm. "admin add" is one product added to the live index,
+which copies the postings of every term it has (searches read without the lock).
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from benchmarks.common import bench_env
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--products", default="100000,500000,1000000")
+parser.add_argument("--queries", type=int, default=50, help="per query shape")
+args = parser.parse_args()
+
+bench_env("sqlite://")
+
+from app.core.config import settings
+from app.products.search_index import SearchIndex
+from benchmarks.seed import CATEGORIES, WORDS
+
+
+def products(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (
+            i + 1,
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            " ".join(rng.choice(WORDS) for _ in range(12)),
+            rng.choice(CATEGORIES),
+        )
+
+
+def queries(count, size, seed=7):
+    rng = random.Random(seed)
+    shapes = {
+        "broad": lambda: rng.choice(WORDS),                          # one word, matches ~40% of the catalog
+        "two words": lambda: f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+        "prefix": lambda: rng.choice(WORDS)[:3],                     # while typing
+        "category": lambda: rng.choice(CATEGORIES),                  # ~2%
+        "model number": lambda: str(rng.randrange(size)),            # a single product
+    }
+    return [(shape, make()) for shape, make in shapes.items() for _ in range(count)]
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    settings.SEARCH_INDEX_ENABLED = True
+    for size in (int(n) for n in args.products.split(",")):
+        index = SearchIndex(settings)
+        gc.collect()
+        start = time.perf_counter()
+        index.index = index.build(products(size))
+        build_seconds = time.perf_counter() - start
+
+        index.index = None
+        gc.collect()
+        tracemalloc.start()
+        index.index = index.build(products(size))
+        megabytes = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+
+        print(f"{size} products: built in {build_seconds:.1f}s, {megabytes:.0f} MB "
+              f"({megabytes / size * 100000:.1f} MB per 100k), {len(index.index.vocabulary)} terms")
+        print(f"  {'query':<14}{'p50 ms':>9}{'p99 ms':>9}{'cached p50 ms':>15}")
+        timings = {}
+        for shape, keyword in queries(args.queries, size):
+            index.results.clear()
+            start = time.perf_counter()
+            index.search(keyword, 0, 20)
+            uncached = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            index.search(keyword, 0, 20)
+            cached = (time.perf_counter() - start) * 1000
+            timings.setdefault(shape, ([], []))
+            timings[shape][0].append(uncached)
+            timings[shape][1].append(cached)
+        for shape, (uncached, cached) in timings.items():
+            print(f"  {shape:<14}{statistics.median(uncached):>9.3f}{percentile(uncached, 0.99):>9.2f}"
+                  f"{statistics.median(cached):>15.3f}")
+
+        index.index.shared = True
+        adds = []
+        for product_id, name, description, category in products(20, seed=size):
+            start = time.perf_counter()
+            index.add(SimpleNamespace(id=size + product_id, name=name, description=description, category=category))
+            adds.append((time.perf_counter() - start) * 1000)
+        print(f"  admin add p50 {statistics.median(adds):.2f} ms, max {max(adds):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Bulk-load synthetic users, products, carts and orders.
+
+Usage:
+    python -m benchmarks.seed --database-url sqlite:///./bench_load.db --reset \
+        --users 10000 --products 50000 --carts 2000 --orders 20000
+
+Seeded users are seed<i>@gmail.com with SEED_PASSWORD, all sharing one bcrypt
+hash so seeding does not spend minutes hashing. --reset drops and recreates
+every table first, never point it at a database you care about.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import bench_env
+
+SEED_PASSWORD = "Seed@1234"
+SEED_ADMIN_EMAIL = "seed-admin@gmail.com"
+CATEGORIES = [f"category{i}" for i in range(50)]
+WORDS = [
+    "phone", "laptop", "camera", "headphones", "speaker", "watch", "tablet", "monitor",
+    "keyboard", "mouse", "charger", "cable", "backpack", "lamp", "chair", "desk",
+    "bottle", "shoes", "jacket", "wireless", "portable", "smart", "pro", "mini",
+]
+
+
+def seed_email(i: int) -> str:
+    return f"seed{i}@gmail.com"
+
+
+def chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed(engine, users, products, carts, orders, batch_size=5000, reset=False, rng=None):
+    from sqlalchemy import select
+    from app.auth.models import User
+    from app.auth.passwords import hash_password
+    from app.cart.models import Cart
+    from app.core.database import Base
+    from app.orders.models import Order, OrderItem, OrderStatus
+    from app.products.models import Product
+
+    rng = rng or random.Random(42)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    def insert(conn, table, rows):
+        for chunk in chunks(rows, batch_size):
+            conn.execute(table.insert(), chunk)
+
+    password_hash = hash_password(SEED_PASSWORD)
+    timings = {}
+
+    with engine.begin() as conn:
+        start = time.perf_counter()
+        insert(conn, User.__table__, [{"name": "seed admin", "email": SEED_ADMIN_EMAIL,
+                                       "hashed_password": password_hash, "role": "admin"}])
+        insert(conn, User.__table__, [
+            {"name": f"seed user {i}", "email": seed_email(i), "hashed_password": password_hash, "role": "user"}
+            for i in range(users)
+        ])
+        admin_id = conn.execute(select(User.id).where(User.email == SEED_ADMIN_EMAIL)).scalar_one()
+        user_ids = conn.execute(select(User.id).where(User.email.like("seed%@gmail.com"), User.role == "user")).scalars().all()
+        timings["users"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        insert(conn, Product.__table__, [
+            {
+                "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                "description": " ".join(rng.choice(WORDS) for _ in range(12)),
+                "price": round(rng.uniform(1, 2000), 2),
+                "stock": 10000,
+                "category": rng.choice(CATEGORIES),
+                "image_url": f"https://img.example.com/{i}.jpg",
+                "created_by": admin_id,
+            }
+            for i in range(products)
+        ])
+        product_rows = conn.execute(select(Product.id, Product.price)).all()
+        timings["products"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cart_rows = []
+        for user_id in rng.sample(user_ids, min(carts, len(user_ids))):
+            for product_id, _ in rng.sample(product_rows, 3):
+                cart_rows.append({"user_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)})
+        insert(conn, Cart.__table__, cart_rows)
+        timings["carts"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        order_lines = []
+        order_rows = []
+        for _ in range(orders):
+            lines = [(product_id, price, rng.randint(1, 3)) for product_id, price in rng.sample(product_rows, rng.randint(1, 4))]
+            order_lines.append(lines)
+            order_rows.append({
+                "user_id": rng.choice(user_ids),
+                "total_amount": sum(price * quantity for _, price, quantity in lines),
+                "status": OrderStatus.paid.name,
+            })
+        insert(conn, Order.__table__, order_rows)
+        # orders were inserted in this transaction in list order, so the newest ids line up with order_lines
+        order_ids = conn.execute(select(Order.id).order_by(Order.id.desc()).limit(orders)).scalars().all()[::-1]
+        insert(conn, OrderItem.__table__, [
+            {"order_id": order_id, "product_id": product_id, "quantity": quantity, "price_at_purchase": price}
+            for order_id, lines in zip(order_ids, order_lines)
+            for product_id, price, quantity in lines
+        ])
+        timings["orders"] = time.perf_counter() - start
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_load.db")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--carts", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+
+    bench_env(args.database_url)
+    from app.core.database import Engine
+
+    timings = seed(Engine, args.users, args.products, args.carts, args.orders,
+                   batch_size=args.batch_size, reset=args.reset)
+    for table, seconds in timings.items():
+        print(f"{table:<10}{seconds:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Local SMTP stand-in that accepts every message, for trying the email outbox without a real server.
+
+Usage:
+    python -m benchmarks.smtp_sink --port 1025
+
+then run the app with SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false.
+Each received message is printed. In-process use mirrors aiosmtpd's Controller:
+
+    sink = SMTPSink(port=1025)
+    sink.start()        # serves from a background thread
+    ...
+    sink.messages       # email.message.EmailMessage objects received so far
+    sink.stop()
+
+Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP,
+QUIT), no TLS or auth.
+"""
+import argparse
+import asyncio
+import threading
+from email import message_from_bytes, policy
+
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, echo: bool = False):
+        self.host = host
+        self.port = port
+        self.echo = echo
+        self.messages = []
+        self.connections = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+
+        async def reply(line):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 smtp-sink ready")
+        while line := await reader.readline():
+            command = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if command == "EHLO":
+                await reply("250-smtp-sink\r\n250 8BITMIME")
+            elif command in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                message = message_from_bytes(b"".join(lines), policy=policy.default)
+                self.messages.append(message)
+                if self.echo:
+                    print(f"--- to {message['To']}: {message['Subject']}\n{message.get_content().strip()}", flush=True)
+                await reply("250 OK queued")
+            elif command == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+        writer.close()
+
+    async def serve(self, started=None):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        if started is not None:
+            started()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.serve(started=ready.set))
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def stop(self):
+        def close():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+
+        self.loop.call_soon_threadsafe(close)
+        self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    print(f"smtp sink listening on {args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(SMTPSink(args.host, args.port, echo=True).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
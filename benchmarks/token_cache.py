@@ -0,0 +1,71 @@
+"""Per-request auth overhead with and without the verified-token cache.
+
+Usage:
+    python -m benchmarks.token_cache --tokens 10000 --requests 200000
+
+Calls get_current_user directly with a warm principal cache, so the numbers are
+token verification plus the principal lookup and nothing else. Requests pick a
+random token out of --tokens distinct active ones. The uncached run uses a
+TokenVerifier without a cache, i.e. a full PyJWT decode per request.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import bench_env
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--tokens", type=int, default=10000)
+parser.add_argument("--users", type=int, default=1000)
+parser.add_argument("--requests", type=int, default=200000)
+args = parser.parse_args()
+
+bench_env("sqlite://")
+
+from app.auth import jwt_handler, utils
+from app.core.cache import LRUCache
+
+
+def measure(tokens, requests):
+    rng = random.Random(1)
+    order = [rng.choice(tokens) for _ in range(requests)]
+    start = time.perf_counter()
+    for token in order:
+        utils.get_current_user(token, db=None)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    # the principal cache is warm, a miss there would need the db
+    for i in range(args.users):
+        email = f"bench{i}@gmail.com"
+        utils.user_cache.set(email, utils.Principal(id=i + 1, email=email, role="user"), ttl=3600)
+    tokens = [
+        jwt_handler.create_access_token(
+            {"sub": f"bench{i % args.users}@gmail.com", "role": "user", "uid": i % args.users + 1, "n": i}
+        )
+        for i in range(args.tokens)
+    ]
+
+    cached = jwt_handler.access_tokens
+    uncached = jwt_handler.TokenVerifier(jwt_handler.SECRET_KEY, jwt_handler.ALGORITHM)
+    cache = LRUCache("bench_tokens", maxsize=2 * args.tokens, ttl=300)
+
+    utils.access_tokens = uncached
+    uncached_us = measure(tokens, args.requests)
+
+    utils.access_tokens = cached
+    cached.cache = cache
+    for token in tokens:
+        cached.verify(token)
+    cache.hits = cache.misses = 0
+    cached_us = measure(tokens, args.requests)
+
+    print(f"{args.tokens} active tokens, {args.requests} requests")
+    print(f"uncached: {uncached_us:8.2f} us/request")
+    print(f"cached:   {cached_us:8.2f} us/request  (hit rate {cache.hits / max(1, cache.hits + cache.misses):.1%}, "
+          f"{len(cache.entries)} entries)")
+
+
+if __name__ == "__main__":
+    main()
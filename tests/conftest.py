@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import pytest
+
+# settings are read when app is first imported, so the environment is set up before any test module imports it.
+# Every test run gets its own primary and replica sqlite files
+DATA_DIR = tempfile.mkdtemp(prefix="ecommerce-tests-")
+
+TEST_ENV = {
+    "SECRET_KEY": "test",
+    "REFRESH_SECRET_KEY": "test-refresh",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "DATABASE_URL": f"sqlite:///{DATA_DIR}/primary.db",
+    "REPLICA_DATABASE_URL": f"sqlite:///{DATA_DIR}/replica.db",
+    # tests drive the replica checks themselves
+    "REPLICA_HEALTH_CHECK_INTERVAL": "3600",
+    "CATALOG_CACHE_ENABLED": "false",
+    # tests/test_ratelimit.py builds its own limiters, the app's would count every test's requests
+    "RATE_LIMIT_ENABLED": "false",
+    "OUTBOX_DISPATCHER": "false",
+    "LOG_FILE": f"{DATA_DIR}/ecommerce.log",
+}
+os.environ.update(TEST_ENV)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    # the app on empty tables, without its lifespan: bcrypt runs inline at the cheapest cost, no replica
+    import httpx
+    import app.cli  # noqa: F401  registers every table
+    from app.auth import hashing, passwords
+    from app.auth.utils import user_cache
+    from app.core import replica
+    from app.core.database import AsyncEngine, Base, Engine
+    from app.main import create_app
+
+    # reads go to the primary too, tests/test_replica.py covers the routing
+    monkeypatch.setattr(replica, "ReplicaEngine", None)
+    monkeypatch.setattr(replica, "AsyncReplicaEngine", None)
+    Base.metadata.drop_all(bind=Engine)
+    Base.metadata.create_all(bind=Engine)
+    user_cache.clear()
+    monkeypatch.setattr(hashing.pool, "workers", 0)
+    passwords.configure(4)
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await AsyncEngine.dispose()
+
+
+@pytest.fixture(scope="session")
+def redis_stub():
+    from benchmarks.redis_stub import RedisStub
+    from tests.helpers import free_port
+
+    stub = RedisStub(port=free_port())
+    stub.start()
+    yield stub
+    stub.stop()
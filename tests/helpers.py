@@ -0,0 +1,40 @@
+import asyncio
+import logging
+import socket
+from contextlib import contextmanager
+
+from app.core.logging import RateLimitFilter, logger
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def misbehaving_server(reply):
+    # answers every connection with `reply` (None: never answers) and hangs up
+    async def handle(reader, writer):
+        await reader.read(1024)
+        if reply is None:
+            await asyncio.sleep(10)
+        else:
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+@contextmanager
+def rate_limited_records(per_second=10):
+    # the app's records as the log pipeline's rate limit lets them through
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    handler.addFilter(RateLimitFilter(per_second))
+    logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        logger.removeHandler(handler)
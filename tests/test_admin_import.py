@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.admin import routes as admin_routes
+from app.auth import hashing
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.core.config import settings
+from app.core.database import Engine, SessionLocal
+
+FEED = (
+    "name,email,password\n"
+    "first,first@gmail.com,Str0ng!Password\n"
+    "second,second@gmail.com,weak\n"
+)
+
+
+@pytest.fixture
+def admin_headers(client, monkeypatch):
+    with SessionLocal() as db:
+        admin = User(name="admin", email="admin@gmail.com", hashed_password="-", role="admin")
+        db.add(admin)
+        db.commit()
+        token = create_access_token({"sub": admin.email, "role": "admin", "uid": admin.id})
+    # the cost the lifespan would have calibrated
+    monkeypatch.setattr(hashing.pool, "rounds", 4)
+    monkeypatch.setattr(settings, "IMPORT_HASH_WORKERS", 1)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload(client, headers, feed=FEED):
+    return client.post("/admin/users/import", headers=headers, files={"file": ("users.csv", feed, "text/csv")})
+
+
+@pytest.mark.anyio
+async def test_import_users(client, admin_headers):
+    response = await upload(client, admin_headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["invalid"]) == (1, 1)
+    assert report["errors"][0]["email"] == "second@gmail.com"
+    with SessionLocal() as db:
+        assert db.query(User).filter(User.email == "first@gmail.com").one().hashed_password.startswith("$2b$04$")
+    # the lock is released for the next import
+    assert not admin_routes.user_import_lock.locked()
+
+
+@pytest.mark.anyio
+async def test_one_import_at_a_time(client, admin_headers):
+    with admin_routes.user_import_lock:
+        response = await upload(client, admin_headers)
+    assert response.status_code == 409
+    with SessionLocal() as db:
+        assert db.query(User).count() == 1
+
+
+@pytest.mark.anyio
+async def test_failed_batch_stops_the_import(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 1)
+    feed = "name,email,password\n" + "".join(f"user{i},user{i}@gmail.com,Str0ng!Password\n" for i in range(3))
+
+    def fail_second_user(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO users") and "user1@gmail.com" in repr(parameters):
+            raise OperationalError(statement, parameters, Exception("disk I/O error"))
+
+    event.listen(Engine, "before_cursor_execute", fail_second_user)
+    try:
+        response = await upload(client, admin_headers, feed)
+    finally:
+        event.remove(Engine, "before_cursor_execute", fail_second_user)
+    assert response.status_code == 200
+    report = response.json()
+    # the first batch stays, the second is rolled back and the third never inserted
+    assert (report["inserted"], report["stopped_at_row"]) == (1, 2)
+    assert "disk I/O error" in report["error"]
+    with SessionLocal() as db:
+        assert sorted(email for email, in db.query(User.email)) == ["admin@gmail.com", "user0@gmail.com"]
+    assert not admin_routes.user_import_lock.locked()
+
+
+@pytest.mark.anyio
+async def test_listed_errors_are_capped(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(admin_routes, "MAX_REPORTED_ERRORS", 2)
+    feed = "name,email,password\n" + "".join(f"user{i},user{i}@gmail.com,weak\n" for i in range(5))
+    report = (await upload(client, admin_headers, feed)).json()
+    assert report["invalid"] == 5
+    assert [error["row"] for error in report["errors"]] == [1, 2]
+    assert report["errors_omitted"] == 3
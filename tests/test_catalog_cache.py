@@ -0,0 +1,140 @@
+import pytest
+
+from app.core import replica
+from app.core.config import settings
+from app.products.catalog_cache import VERSION_KEY, CatalogCache
+from tests.helpers import free_port, misbehaving_server, rate_limited_records
+
+
+def make_cache(**options):
+    return CatalogCache(settings.model_copy(update={"CATALOG_CACHE_ENABLED": True, **options}))
+
+
+def redis_options(port):
+    return {
+        "CATALOG_CACHE_BACKEND": "redis",
+        "CATALOG_CACHE_REDIS_URL": f"redis://127.0.0.1:{port}/0",
+        "CATALOG_CACHE_REDIS_TIMEOUT_SECONDS": 0.5,
+        # every get re-reads the shared version
+        "CATALOG_CACHE_VERSION_CHECK_SECONDS": 0,
+    }
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return f"body {self.calls}".encode()
+
+
+@pytest.fixture(autouse=True)
+def no_replica(monkeypatch):
+    monkeypatch.setattr(replica, "replica_in_use", lambda: False)
+
+
+@pytest.mark.anyio
+async def test_cached_until_invalidated():
+    cache, load = make_cache(), Loader()
+    assert await cache.get("detail", 1, load) == b"body 1"
+    assert await cache.get("detail", 1, load) == b"body 1"
+    await cache.invalidate()
+    assert await cache.get("detail", 1, load) == b"body 2"
+    assert load.calls == 2
+
+
+@pytest.mark.anyio
+async def test_workers_share_entries_and_version(redis_stub):
+    redis_stub.data.clear()
+    first, second = make_cache(**redis_options(redis_stub.port)), make_cache(**redis_options(redis_stub.port))
+    load = Loader()
+    assert await first.get("detail", 1, load) == b"body 1"
+    assert await second.get("detail", 1, load) == b"body 1"
+    await second.invalidate()
+    assert await first.get("detail", 1, load) == b"body 2"
+    assert load.calls == 2
+
+
+@pytest.mark.anyio
+async def test_garbled_version_keeps_the_last_one(redis_stub):
+    redis_stub.data.clear()
+    cache, load = make_cache(**redis_options(redis_stub.port)), Loader()
+    await cache.invalidate()
+    version = cache.version
+    redis_stub.data[VERSION_KEY.encode()] = b"garbage"
+    assert await cache.get("detail", 1, load) == b"body 1"
+    assert cache.version == version
+    assert await cache.get("detail", 1, load) == b"body 1"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("reply", [b"", b"$abc\r\n", b"hello\r\n", None], ids=["closed", "bad-length", "garbage", "timeout"])
+async def test_broken_backend_loads_from_the_database(reply):
+    server = await misbehaving_server(reply)
+    options = {**redis_options(server.sockets[0].getsockname()[1]), "CATALOG_CACHE_REDIS_TIMEOUT_SECONDS": 0.2}
+    cache, load = make_cache(**options), Loader()
+    try:
+        assert await cache.get("detail", 1, load) == b"body 1"
+        await cache.invalidate()
+        await cache.forget_products([1])
+        # still answered, from the in-process entries
+        assert await cache.get("list", "q", load) == b"body 2"
+        assert await cache.get("list", "q", load) == b"body 2"
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.anyio
+async def test_replica_reads_after_a_write_are_not_cached(monkeypatch):
+    monkeypatch.setattr(replica, "replica_in_use", lambda: True)
+    monkeypatch.setattr(replica.replica_health, "lag", 0)
+    cache, load = make_cache(REPLICA_MAX_LAG_SECONDS=5), Loader()
+    await cache.invalidate()
+    # the replica may not have the write yet
+    assert await cache.get("detail", 1, load) == b"body 1"
+    assert await cache.get("detail", 1, load) == b"body 2"
+
+    # once it had REPLICA_MAX_LAG_SECONDS to catch up (or it is unhealthy and reads go to the primary)
+    cache.version_changed_at -= 5
+    assert await cache.get("detail", 1, load) == b"body 3"
+    assert await cache.get("detail", 1, load) == b"body 3"
+
+
+@pytest.mark.anyio
+async def test_nothing_is_cached_while_the_replica_lags(monkeypatch):
+    monkeypatch.setattr(replica, "replica_in_use", lambda: True)
+    monkeypatch.setattr(replica.replica_health, "lag", 0.5)
+    cache, load = make_cache(), Loader()
+    assert await cache.get("detail", 1, load) == b"body 1"
+    assert await cache.get("detail", 1, load) == b"body 2"
+    monkeypatch.setattr(replica.replica_health, "lag", 0)
+    assert await cache.get("detail", 1, load) == b"body 3"
+    assert await cache.get("detail", 1, load) == b"body 3"
+
+
+@pytest.mark.anyio
+async def test_another_workers_write_opens_the_window(redis_stub, monkeypatch):
+    redis_stub.data.clear()
+    monkeypatch.setattr(replica, "replica_in_use", lambda: True)
+    monkeypatch.setattr(replica.replica_health, "lag", 0)
+    writer, reader = make_cache(**redis_options(redis_stub.port)), make_cache(**redis_options(redis_stub.port))
+    load = Loader()
+    await reader.get("detail", 1, load)
+    reader.version_changed_at -= 60
+    await writer.invalidate()
+    # the reader learns of the new version from redis, its replica read isn't cached, locally or shared
+    assert await reader.get("detail", 1, load) == b"body 2"
+    assert await writer.get("detail", 1, load) == b"body 3"
+
+
+@pytest.mark.anyio
+async def test_outage_logs_are_bounded():
+    cache, load = make_cache(**redis_options(free_port())), Loader()
+    with rate_limited_records(per_second=10) as records:
+        for product_id in range(200):
+            assert await cache.get("detail", product_id, load) == f"body {product_id + 1}".encode()
+    # one second's worth, two if the loop straddled a second
+    assert 0 < len(records) <= 20
+    assert all("catalog cache backend unavailable" in record.getMessage() for record in records)
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import delete
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.cart.models import Cart
+from app.core.database import SessionLocal
+from app.orders.models import Order
+from app.products.models import Product
+
+
+@pytest.fixture
+def buyer(client):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="buyer", email="buyer@gmail.com", hashed_password="-", role="user"))
+        db.add(Product(id=1, name="lamp", description="", price=10, stock=5, category="home", image_url="", created_by=1))
+        db.add(Product(id=2, name="desk", description="", price=90, stock=5, category="home", image_url="", created_by=1))
+        db.add_all([Cart(user_id=1, product_id=1, quantity=2), Cart(user_id=1, product_id=2, quantity=1)])
+        db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'buyer@gmail.com', 'role': 'user', 'uid': 1})}"}
+
+
+def stock():
+    with SessionLocal() as db:
+        return dict(db.query(Product.id, Product.stock).order_by(Product.id).all())
+
+
+@pytest.mark.anyio
+async def test_checkout(client, buyer):
+    response = await client.post("/checkout", headers=buyer)
+    assert response.status_code == 200
+    assert float(response.json()["total_amount"]) == 110
+    assert stock() == {1: 3, 2: 4}
+    with SessionLocal() as db:
+        assert db.query(Cart).count() == 0
+
+
+@pytest.mark.anyio
+async def test_deleted_product_is_a_conflict(client, buyer):
+    # sqlite doesn't enforce the cart's foreign key, a deleted product leaves its cart rows behind
+    with SessionLocal() as db:
+        db.execute(delete(Product).where(Product.id == 2))
+        db.commit()
+    response = await client.post("/checkout", headers=buyer)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Products no longer available: 2"
+    # nothing is ordered, taken from stock or dropped from the cart
+    assert stock() == {1: 5}
+    with SessionLocal() as db:
+        assert db.query(Order).count() == 0
+        assert db.query(Cart).count() == 2
@@ -0,0 +1,80 @@
+import pytest
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.orders.models import Order, OrderItem, OrderStatus
+from app.products import catalog_cache
+from app.products.models import Product
+
+
+@pytest.fixture
+def catalog(client, monkeypatch):
+    monkeypatch.setattr(settings, "CATALOG_CACHE_ENABLED", True)
+    catalog_cache.cache.local.clear()
+    with SessionLocal() as db:
+        db.add(User(id=1, name="buyer", email="buyer@gmail.com", hashed_password="-", role="user"))
+        db.add(Product(id=1, name="lamp", description="", price=10, stock=5, category="home", image_url="", created_by=1))
+        db.add(Product(id=2, name="desk", description="", price=90, stock=5, category="home", image_url="", created_by=1))
+        db.commit()
+
+
+def lookups(kind, result):
+    return catalog_cache.catalog_lookups.values.get((kind, result), 0)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path, kind", [("/products/1", "detail"), ("/products/?category=home", "list")])
+async def test_revalidation_warms_the_cache(client, catalog, path, kind):
+    etag = (await client.get(path)).headers["etag"]
+    catalog_cache.cache.local.clear()
+
+    misses = lookups(kind, "miss")
+    revalidated = await client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    # the body was cached on the way, the next plain request is a hit
+    assert lookups(kind, "miss") == misses + 1
+    hits = lookups(kind, "local")
+    assert (await client.get(path)).status_code == 200
+    assert lookups(kind, "local") == hits + 1
+    assert (await client.get(path, headers={"If-None-Match": etag})).status_code == 304
+    assert lookups(kind, "miss") == misses + 1
+
+
+@pytest.fixture
+def paid_order(catalog):
+    with SessionLocal() as db:
+        order = Order(id=1, user_id=1, total_amount=100, status=OrderStatus.paid)
+        order.items = [
+            OrderItem(product_id=1, quantity=1, price_at_purchase=10),
+            OrderItem(product_id=2, quantity=1, price_at_purchase=90),
+        ]
+        db.add(order)
+        db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'buyer@gmail.com', 'role': 'user', 'uid': 1})}"}
+
+
+@pytest.mark.anyio
+async def test_order_etag_follows_rendered_names(client, paid_order):
+    first = await client.get("/orders/1", headers=paid_order)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/")
+    assert "last-modified" not in first.headers
+
+    # other checkouts change stock (and the product version), the order renders the same
+    with SessionLocal() as db:
+        db.get(Product, 1).stock -= 1
+        db.commit()
+    assert (await client.get("/orders/1", headers={**paid_order, "If-None-Match": etag})).status_code == 304
+
+    with SessionLocal() as db:
+        db.get(Product, 2).name = "standing desk"
+        db.commit()
+    renamed = await client.get("/orders/1", headers={**paid_order, "If-None-Match": etag})
+    assert renamed.status_code == 200
+    assert renamed.headers["etag"] != etag
+    assert [item["product_name"] for item in renamed.json()["items"]] == ["lamp", "standing desk"]
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+from app.auth.models import User
+from app.core.database import AsyncEngine, SessionLocal
+from app.products.models import Product
+
+# (category, price): edges of 50 wide buckets on both sides
+CATALOG = [
+    ("home", 0), ("home", 49.99), ("home", 50), ("home", 99.99),
+    ("garden", 100), ("garden", 150), ("garden", 50),
+    ("toys", 75),
+]
+
+
+@pytest.fixture
+def catalog(client):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="admin", email="admin@gmail.com", hashed_password="-", role="admin"))
+        for product_id, (category, price) in enumerate(CATALOG, start=1):
+            db.add(Product(id=product_id, name=f"product {product_id}", description="", price=price, stock=1,
+                           category=category, image_url="", created_by=1))
+        db.commit()
+
+
+@pytest.fixture
+def statements():
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(AsyncEngine.sync_engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(AsyncEngine.sync_engine, "before_cursor_execute", record)
+
+
+def histogram(facets):
+    return [(bucket["min"], bucket["max"], bucket["count"]) for bucket in facets["price_histogram"]]
+
+
+@pytest.mark.anyio
+async def test_one_grouped_query_and_bucket_edges(client, catalog, statements):
+    response = await client.get("/products/facets", params={"bucket_size": 50})
+    assert response.status_code == 200
+    facets = response.json()
+    product_queries = [statement for statement in statements if "FROM products" in statement]
+    assert len(product_queries) == 1
+    assert "GROUP BY products.category" in product_queries[0]
+
+    # a price on an edge opens the next bucket
+    assert histogram(facets) == [(0, 50, 2), (50, 100, 4), (100, 150, 1), (150, 200, 1)]
+    assert facets["categories"] == [
+        {"category": "home", "count": 4}, {"category": "garden", "count": 3}, {"category": "toys", "count": 1},
+    ]
+    assert (facets["total"], facets["min_price"], facets["max_price"]) == (8, 0, 150)
+
+
+@pytest.mark.anyio
+async def test_each_facet_ignores_its_own_filter(client, catalog):
+    response = await client.get("/products/facets", params={
+        "category": "home", "min_price": 50, "max_price": 100, "bucket_size": 50,
+    })
+    facets = response.json()
+    # categories: within the price filter, every category still offered (ties by name)
+    assert facets["categories"] == [
+        {"category": "garden", "count": 2}, {"category": "home", "count": 2}, {"category": "toys", "count": 1},
+    ]
+    # histogram: the category filter only, every price range still offered
+    assert histogram(facets) == [(0, 50, 2), (50, 100, 2)]
+    # the products /products/ would list for the same filters
+    assert facets["total"] == 2
+
+
+@pytest.mark.anyio
+async def test_bucket_size_changes_the_edges(client, catalog):
+    facets = (await client.get("/products/facets", params={"bucket_size": 100})).json()
+    assert histogram(facets) == [(0, 100, 6), (100, 200, 2)]
@@ -0,0 +1,85 @@
+import io
+import json
+import logging
+import threading
+
+from app.core.logging import LOG_FORMAT, JsonFormatter, RateLimitFilter, queue_pipeline
+
+
+def run_pipeline(formatter, log, rate_limit=0):
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(formatter)
+    queue_handler, listener = queue_pipeline([output], rate_limit)
+    logger = logging.getLogger(f"tests.logging.{id(stream)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        log(logger)
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+    return stream.getvalue()
+
+
+def fail(logger):
+    try:
+        {}["missing"]
+    except KeyError:
+        logger.exception("lookup of %s failed", "missing")
+
+
+def test_json_traceback_lands_in_exc_info():
+    entry = json.loads(run_pipeline(JsonFormatter(), fail))
+    assert entry["message"] == "lookup of missing failed"
+    assert entry["exc_info"].startswith("Traceback (most recent call last)")
+    assert "KeyError: 'missing'" in entry["exc_info"]
+
+
+def test_text_format_keeps_the_traceback():
+    output = run_pipeline(logging.Formatter(LOG_FORMAT), fail)
+    assert "ERROR - lookup of missing failed\nTraceback (most recent call last)" in output
+    assert output.rstrip().endswith("KeyError: 'missing'")
+
+
+def test_rate_limit_holds_across_threads(monkeypatch):
+    monkeypatch.setattr("app.core.logging.time.monotonic", lambda: 100.0)
+    limit = RateLimitFilter(per_second=10)
+    passed = []
+    start = threading.Barrier(8)
+
+    def log():
+        start.wait()
+        for _ in range(500):
+            record = logging.LogRecord("tests", logging.INFO, __file__, 0, "hit", None, None)
+            record.rate_key = "hot"
+            if limit.filter(record):
+                passed.append(record)
+
+    threads = [threading.Thread(target=log) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(passed) == 10
+    assert limit.windows["hot"] == [100, 4000, 3990]
+
+
+def test_rate_limit_applies_to_tagged_warnings(monkeypatch):
+    monkeypatch.setattr("app.core.logging.time.monotonic", lambda: 100.0)
+    limit = RateLimitFilter(per_second=10)
+
+    def passed(level, tagged):
+        count = 0
+        for _ in range(1000):
+            record = logging.LogRecord("tests", level, __file__, 0, "backend down", None, None)
+            if tagged:
+                record.rate_key = f"backend-{level}"
+            count += limit.filter(record)
+        return count
+
+    assert passed(logging.WARNING, tagged=True) == 10
+    assert passed(logging.ERROR, tagged=True) == 10
+    assert passed(logging.WARNING, tagged=False) == 1000
@@ -0,0 +1,40 @@
+import threading
+
+from app.core.metrics import Counter, Histogram
+
+
+def scrape_while_writing(metric, write):
+    # new label sets keep appearing while samples() iterates
+    errors = []
+    thread = threading.Thread(target=lambda: [write(str(i)) for i in range(5000)])
+    thread.start()
+    while thread.is_alive():
+        try:
+            list(metric.samples())
+        except RuntimeError as e:
+            errors.append(e)
+    thread.join()
+    return errors
+
+
+def test_counter_scrape_during_writes():
+    counter = Counter("test_total", "test", ("key",))
+    assert scrape_while_writing(counter, counter.inc) == []
+
+
+def test_histogram_scrape_during_writes():
+    histogram = Histogram("test_seconds", "test", ("key",))
+    assert scrape_while_writing(histogram, lambda key: histogram.observe(0.01, key)) == []
+
+
+def test_histogram_series_is_consistent():
+    histogram = Histogram("test_seconds", "test", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    assert list(histogram.samples()) == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3",
+    ]
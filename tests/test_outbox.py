@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.auth.models import EmailStatus, OutboxEmail
+from app.auth.outbox import OutboxDispatcher, enqueue_email
+from app.core.config import settings
+from app.core.conditional import utc
+from app.core.database import SessionLocal
+from benchmarks.smtp_sink import SMTPSink
+from tests.helpers import free_port
+
+
+@pytest.fixture
+def sink():
+    sink = SMTPSink(port=free_port())
+    sink.start()
+    yield sink
+    sink.stop()
+
+
+@pytest.fixture
+def make_dispatcher(client):
+    # dispatch_batch() driven by hand, without the polling task
+    dispatchers = []
+
+    def make(port, **options):
+        dispatcher = OutboxDispatcher(settings.model_copy(update={
+            "SMTP_HOST": "127.0.0.1", "SMTP_PORT": port, "SMTP_STARTTLS": False, "SMTP_TIMEOUT_SECONDS": 1,
+            "SMTP_POOL_SIZE": 1, "OUTBOX_BACKOFF_SECONDS": 30, "OUTBOX_MAX_ATTEMPTS": 3, **options,
+        }))
+        dispatcher.executor = ThreadPoolExecutor(1)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.executor.shutdown()
+        dispatcher.smtp.close()
+
+
+def enqueue(count=1):
+    with SessionLocal() as db:
+        for i in range(count):
+            enqueue_email(db, f"user{i}@gmail.com", "Reset Your Password", f"link {i}")
+
+
+def outbox():
+    with SessionLocal() as db:
+        return db.query(OutboxEmail).order_by(OutboxEmail.id).all()
+
+
+def make_due():
+    with SessionLocal() as db:
+        for row in db.query(OutboxEmail):
+            row.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+
+
+@pytest.mark.anyio
+async def test_enqueued_mail_is_sent(sink, make_dispatcher):
+    dispatcher = make_dispatcher(sink.port)
+    enqueue(2)
+    assert dispatcher.dispatch_batch() == 2
+    assert sorted(message["To"] for message in sink.messages) == ["user0@gmail.com", "user1@gmail.com"]
+    assert sink.messages[0]["Subject"] == "Reset Your Password"
+    assert [(row.status, row.attempts) for row in outbox()] == [(EmailStatus.sent, 1)] * 2
+    # nothing left to claim
+    assert dispatcher.dispatch_batch() == 0
+
+
+@pytest.mark.anyio
+async def test_failed_sends_back_off_then_give_up(make_dispatcher):
+    dispatcher = make_dispatcher(free_port())  # nothing listens there
+    enqueue()
+    for attempt, backoff in ((1, 30), (2, 60)):
+        before = datetime.now(timezone.utc)
+        assert dispatcher.dispatch_batch() == 1
+        row, = outbox()
+        assert (row.status, row.attempts) == (EmailStatus.pending, attempt)
+        assert row.last_error
+        assert before + timedelta(seconds=backoff) <= utc(row.next_attempt_at) <= before + timedelta(seconds=backoff + 5)
+        # not due before its backoff is over
+        assert dispatcher.dispatch_batch() == 0
+        make_due()
+
+    assert dispatcher.dispatch_batch() == 1
+    row, = outbox()
+    assert (row.status, row.attempts) == (EmailStatus.failed, 3)
+    make_due()
+    assert dispatcher.dispatch_batch() == 0
+
+
+@pytest.mark.anyio
+async def test_connections_are_reused(sink, make_dispatcher):
+    dispatcher = make_dispatcher(sink.port)
+    for _ in range(3):
+        enqueue()
+        assert dispatcher.dispatch_batch() == 1
+    assert len(sink.messages) == 3
+    assert sink.connections == 1
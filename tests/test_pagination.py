@@ -0,0 +1,84 @@
+import base64
+import json
+
+import pytest
+
+from app.auth.models import User
+from app.core.database import SessionLocal
+from app.products.models import Product
+
+# few distinct prices and names, so most pages end inside a run of equal sort keys
+PRICES = [5, 10, 10, 10, 20, 20, 5, 10, 30, 10, 10, 20, 5]
+
+
+@pytest.fixture
+def catalog(client):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="admin", email="admin@gmail.com", hashed_password="-", role="admin"))
+        for product_id, price in enumerate(PRICES, start=1):
+            db.add(Product(id=product_id, name=f"product {product_id % 3}", description="", price=price, stock=1,
+                           category="cups", image_url="", created_by=1))
+        db.commit()
+
+
+def cursor_of(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+async def walk(client, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = await client.get("/products/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [product["id"] for product in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sort_by", ["id", "price", "name"])
+@pytest.mark.parametrize("page_size", [1, 2, 4, 5])
+async def test_cursor_walk_has_no_gaps_or_duplicates(client, catalog, sort_by, page_size):
+    with SessionLocal() as db:
+        column = getattr(Product, sort_by)
+        expected = [product_id for product_id, in db.query(Product.id).order_by(column, Product.id)]
+    ids, pages = await walk(client, sort_by=sort_by, page_size=page_size)
+    assert ids == expected
+    assert pages == -(-len(PRICES) // page_size)
+
+
+@pytest.mark.anyio
+async def test_cursor_walk_with_filters(client, catalog):
+    ids, _ = await walk(client, sort_by="price", page_size=2, min_price=10, max_price=20)
+    assert ids == [2, 3, 4, 8, 10, 11, 5, 6, 12]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "e30",  # {}
+    cursor_of(["price", "5"]),
+    cursor_of(["price", "five", 3]),
+    cursor_of(["price", {"a": 1}, 3]),
+    cursor_of(["price", "5", "3"]),
+    cursor_of(["price", "5", 3, 4]),
+    cursor_of(None),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+], ids=["garbage", "object", "short", "bad-price", "price-object", "string-id", "long", "null", "not-utf8"])
+async def test_invalid_cursor_is_a_bad_request(client, catalog, cursor):
+    response = await client.get("/products/", params={"sort_by": "price", "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.anyio
+async def test_cursor_of_another_sort_or_mismatched_id(client, catalog):
+    first = await client.get("/products/", params={"sort_by": "price", "page_size": 2})
+    response = await client.get("/products/", params={"sort_by": "name", "cursor": first.headers["X-Next-Cursor"]})
+    assert response.status_code == 400
+    assert "sorted by price" in response.json()["detail"]
+    for sort_by, payload in (("id", ["id", 4, 5]), ("name", ["name", 7, 5])):
+        response = await client.get("/products/", params={"sort_by": sort_by, "cursor": cursor_of(payload)})
+        assert response.status_code == 400
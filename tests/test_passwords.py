@@ -0,0 +1,49 @@
+import pytest
+from passlib.context import CryptContext
+
+from app.auth import passwords
+from app.auth.models import User
+from app.core.database import SessionLocal
+
+PASSWORD = "Str0ng!Password"
+
+
+def hashed_at(rounds):
+    return CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds).hash(PASSWORD)
+
+
+@pytest.fixture
+def cost():
+    yield passwords.configure
+    # the cost every other test runs at
+    passwords.configure(4)
+
+
+def test_calibrate_stays_within_bounds():
+    assert passwords.calibrate(0, 4, 6) == 4
+    assert passwords.calibrate(10 ** 9, 4, 6) == 6
+    assert 4 <= passwords.calibrate(50, 4, 6) <= 6
+
+
+def test_needs_update_only_below_the_cost(cost):
+    cost(5)
+    assert passwords.hash_password(PASSWORD).startswith("$2b$05$")
+    assert passwords.needs_update(hashed_at(4))
+    assert not passwords.needs_update(hashed_at(5))
+    # another worker calibrated higher: not downgraded
+    assert not passwords.needs_update(hashed_at(6))
+
+
+@pytest.mark.anyio
+async def test_signin_upgrades_cheaper_hashes_only(client, cost):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="cheap", email="cheap@gmail.com", hashed_password=hashed_at(4), role="user"))
+        db.add(User(id=2, name="costly", email="costly@gmail.com", hashed_password=hashed_at(6), role="user"))
+        db.commit()
+    cost(5)
+    for email in ("cheap@gmail.com", "costly@gmail.com"):
+        response = await client.post("/auth/signin", json={"email": email, "password": PASSWORD})
+        assert response.status_code == 200
+    with SessionLocal() as db:
+        assert db.get(User, 1).hashed_password.startswith("$2b$05$")
+        assert db.get(User, 2).hashed_password.startswith("$2b$06$")
@@ -0,0 +1,134 @@
+import json
+import tempfile
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from starlette.requests import ClientDisconnect
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import create_app
+from app.products import importer
+from app.products import routes as product_routes
+from app.products.models import Product
+
+HEADER = "sku,name,description,price,stock,category,image_url\n"
+
+
+def feed(count):
+    return HEADER + "".join(f"SKU-{i},product {i},,{i + 1}.50,3,toys,\n" for i in range(count))
+
+
+@pytest.fixture
+def admin_headers(client):
+    with SessionLocal() as db:
+        admin = User(name="admin", email="admin@gmail.com", hashed_password="-", role="admin")
+        db.add(admin)
+        db.commit()
+        token = create_access_token({"sub": admin.email, "role": "admin", "uid": admin.id})
+    return {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+
+
+@pytest.fixture
+def spooled(monkeypatch):
+    # every error report the route opens
+    opened = []
+    spooled_file = tempfile.SpooledTemporaryFile
+
+    def open_report(*args, **kwargs):
+        opened.append(spooled_file(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(product_routes.tempfile, "SpooledTemporaryFile", open_report)
+    return opened
+
+
+def report_of(response):
+    report, *errors = [json.loads(line) for line in response.text.splitlines()]
+    return report, errors
+
+
+def skus():
+    with SessionLocal() as db:
+        return sorted(sku for sku, in db.query(Product.sku))
+
+
+@pytest.mark.anyio
+async def test_import_products(client, admin_headers, spooled):
+    response = await client.post("/admin/products/import", headers=admin_headers,
+                                 content=feed(3) + "SKU-x,broken,,not a price,1,toys,\n")
+    assert response.status_code == 200
+    report, errors = report_of(response)
+    assert (report["inserted"], report["invalid"], report["error"]) == (3, 1, None)
+    assert errors[0]["sku"] == "SKU-x"
+    assert spooled[0].closed
+
+
+@pytest.mark.anyio
+async def test_failed_batch_stops_the_import(client, admin_headers, spooled, monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_IMPORT_BATCH_SIZE", 2)
+    insert_rows = importer.insert_rows
+    calls = []
+
+    def failing_second_batch(db, values, created_by):
+        calls.append(values)
+        if len(calls) == 2:
+            raise OperationalError("INSERT INTO products ...", {}, Exception("database is locked"))
+        return insert_rows(db, values, created_by)
+
+    monkeypatch.setattr(importer, "insert_rows", failing_second_batch)
+    response = await client.post("/admin/products/import", headers=admin_headers, content=feed(6))
+    assert response.status_code == 200
+    report, errors = report_of(response)
+    # the first batch is committed, the second rolled back and nothing after it is loaded
+    assert report["inserted"] == 2
+    assert report["stopped_at_row"] == 3
+    assert "database is locked" in report["error"]
+    assert "INSERT" not in report["error"]
+    assert len(calls) == 2
+    assert skus() == ["SKU-0", "SKU-1"]
+    assert spooled[0].closed
+
+
+@pytest.mark.anyio
+async def test_unreadable_feed_keeps_what_was_loaded(client, admin_headers, spooled, monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_IMPORT_BATCH_SIZE", 2)
+
+    async def body():
+        yield feed(3).encode()
+        yield b"SKU-3,caf\xe9,,1,1,toys,\n"
+
+    response = await client.post("/admin/products/import", headers=admin_headers, content=body())
+    assert response.status_code == 200
+    report, _ = report_of(response)
+    assert report["inserted"] == 3
+    assert report["stopped_at_row"] == 4
+    assert "unreadable" in report["error"]
+    assert skus() == ["SKU-0", "SKU-1", "SKU-2"]
+
+
+@pytest.mark.anyio
+async def test_disconnect_closes_the_error_report(client, admin_headers, spooled):
+    # a client that goes away mid-stream: the server's send fails and background tasks never run
+    messages = [{"type": "http.request", "body": (feed(1) + "SKU-x,broken,,nope,1,toys,\n").encode(), "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            raise OSError("connection reset")
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/admin/products/import", "raw_path": b"/admin/products/import",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        "headers": [(b"host", b"test")] + [(name.lower().encode(), value.encode()) for name, value in admin_headers.items()],
+    }
+    with pytest.raises(ClientDisconnect):
+        await create_app()(scope, receive, send)
+    assert len(spooled) == 1
+    assert spooled[0].closed
+    assert skus() == ["SKU-0"]
@@ -0,0 +1,58 @@
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import create_app
+from app.orders.models import Order, OrderItem, OrderStatus
+from app.products.models import Product
+
+
+@pytest.fixture
+async def debug_client(client):
+    # the app with the N+1 warnings on, plus a route that loads products one by one
+    app = create_app(settings.model_copy(update={"DEBUG": True, "SQL_N_PLUS_ONE_THRESHOLD": 3}))
+
+    @app.get("/one-by-one")
+    def one_by_one():
+        with SessionLocal() as db:
+            return [db.execute(select(Product.name).where(Product.id == product_id)).scalar() for product_id in range(1, 6)]
+
+    with SessionLocal() as db:
+        db.add(User(id=1, name="someone", email="someone@gmail.com", hashed_password="-", role="user"))
+        for product_id in range(1, 6):
+            db.add(Product(id=product_id, name=f"product {product_id}", description="", price=1, stock=1,
+                           category="cups", image_url="", created_by=1))
+        db.add(Order(id=1, user_id=1, total_amount=5, status=OrderStatus.paid))
+        for product_id in range(1, 6):
+            db.add(OrderItem(order_id=1, product_id=product_id, quantity=1, price_at_purchase=1))
+        db.commit()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as debug_client:
+        yield debug_client
+
+
+def n_plus_one_warnings(caplog):
+    return [record.getMessage() for record in caplog.records if record.getMessage().startswith("Possible N+1")]
+
+
+@pytest.mark.anyio
+async def test_repeated_statement_is_flagged(debug_client, caplog):
+    response = await debug_client.get("/one-by-one")
+    assert response.status_code == 200
+    assert 'desc="5 queries"' in response.headers["server-timing"]
+    warnings = n_plus_one_warnings(caplog)
+    assert len(warnings) == 1
+    assert "ran 5 times in GET /one-by-one" in warnings[0]
+
+
+@pytest.mark.anyio
+async def test_eager_loaded_order_is_not_flagged(debug_client, caplog):
+    token = create_access_token({"sub": "someone@gmail.com", "role": "user", "uid": 1})
+    response = await debug_client.get("/orders/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 5
+    assert n_plus_one_warnings(caplog) == []
@@ -0,0 +1,119 @@
+import pytest
+
+from app.core import ratelimit
+from app.core.ratelimit import MemoryBackend, RateLimiter, RedisBackend
+from app.utils.handlers import RateLimited
+from tests.helpers import free_port, misbehaving_server, rate_limited_records
+
+# start of a minute window, the previous window is empty unless a test fills it
+NOW = 1_700_000_040.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryBackend(max_keys=100)
+    stub = request.getfixturevalue("redis_stub")
+    stub.data.clear()
+    stub.expires.clear()
+    return RedisBackend(f"redis://127.0.0.1:{stub.port}/0", timeout=1)
+
+
+async def allowed(limiter, value="1.2.3.4"):
+    try:
+        await limiter.check("signin", "ip", value)
+    except RateLimited:
+        return False
+    return True
+
+
+@pytest.mark.anyio
+async def test_limit_within_a_window(backend, clock):
+    limiter = RateLimiter(backend, {"signin:ip": "3/minute"})
+    assert [await allowed(limiter) for _ in range(5)] == [True, True, True, False, False]
+    # keys are counted apart
+    assert await allowed(limiter, "5.6.7.8")
+    with pytest.raises(RateLimited) as rejected:
+        await limiter.check("signin", "ip", "1.2.3.4")
+    assert rejected.value.retry_after == 60
+
+
+@pytest.mark.anyio
+async def test_previous_window_counts_by_overlap(backend, clock):
+    limiter = RateLimiter(backend, {"signin:ip": "4/minute"})
+    for _ in range(4):
+        assert await allowed(limiter)
+    # three quarters into the next window a quarter of the previous 4 still counts
+    clock[0] = NOW + 60 + 45
+    assert [await allowed(limiter) for _ in range(4)] == [True, True, True, False]
+    # the window after that starts clean enough
+    clock[0] = NOW + 180
+    assert await allowed(limiter)
+
+
+@pytest.mark.anyio
+async def test_unlimited_routes_and_missing_values(backend, clock):
+    limiter = RateLimiter(backend, {"signin:ip": "1/minute"})
+    for _ in range(3):
+        await limiter.check("signup", "ip", "1.2.3.4")
+        await limiter.check("signin", "ip", None)
+
+
+@pytest.mark.anyio
+async def test_garbled_counter_fails_open(redis_stub, clock):
+    backend = RedisBackend(f"redis://127.0.0.1:{redis_stub.port}/0", timeout=1)
+    limiter = RateLimiter(backend, {"signin:ip": "1/minute"})
+    redis_stub.data[f"ratelimit:signin:ip:1.2.3.4:{int(NOW // 60) - 1}".encode()] = b"not a number"
+    assert await allowed(limiter)
+    assert await allowed(limiter)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("reply", [
+    b"",  # hangs up before answering
+    b":1\r\n:1\r\n$5\r\nab",  # hangs up mid-reply
+    b"hello\r\n",  # not RESP
+    b"$abc\r\n",  # bad length
+    b"-ERR wrong kind of server\r\n",
+    None,  # too slow
+], ids=["closed", "truncated", "garbage", "bad-length", "error-reply", "timeout"])
+async def test_broken_backend_fails_open(reply, clock):
+    server = await misbehaving_server(reply)
+    port = server.sockets[0].getsockname()[1]
+    backend = RedisBackend(f"redis://127.0.0.1:{port}/0", timeout=0.2)
+    limiter = RateLimiter(backend, {"signin:ip": "1/minute"})
+    try:
+        assert await allowed(limiter)
+        assert await allowed(limiter)
+        # a connection left out of step with its replies is never reused
+        assert backend.idle == []
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.anyio
+async def test_unreachable_backend_fails_open(clock):
+    backend = RedisBackend(f"redis://127.0.0.1:{free_port()}/0", timeout=0.2)
+    limiter = RateLimiter(backend, {"signin:ip": "1/minute"})
+    assert await allowed(limiter)
+    assert await allowed(limiter)
+
+
+@pytest.mark.anyio
+async def test_outage_logs_are_bounded(clock):
+    backend = RedisBackend(f"redis://127.0.0.1:{free_port()}/0", timeout=0.2)
+    limiter = RateLimiter(backend, {"signin:ip": "1/minute"})
+    with rate_limited_records(per_second=10) as records:
+        for _ in range(200):
+            assert await allowed(limiter)
+    # one second's worth, two if the loop straddled a second
+    assert 0 < len(records) <= 20
+    assert all("rate limit backend unavailable" in record.getMessage() for record in records)
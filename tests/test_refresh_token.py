@@ -0,0 +1,157 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+from app.auth import passwords, revocation
+from app.auth.jwt_handler import REFRESH_SECRET_KEY, create_refresh_token
+from app.auth.models import User
+from app.auth.utils import generate_reset_token, invalidate_user
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+PASSWORD = "Str0ng!Password"
+
+
+@pytest.fixture
+def user(client):
+    with SessionLocal() as db:
+        user = User(name="someone", email="someone@gmail.com", hashed_password=passwords.hash_password(PASSWORD), role="user")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+async def signin(client):
+    response = await client.post("/auth/signin", json={"email": "someone@gmail.com", "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def refresh(client, token):
+    return await client.post("/auth/refresh-token", json={"refresh_token": token})
+
+
+def claims(token):
+    return jwt.decode(token, REFRESH_SECRET_KEY, algorithms=["HS256"])
+
+
+def next_second():
+    # end_sessions() works at whole seconds, like iat
+    time.sleep(1.01 - time.time() % 1)
+
+
+@pytest.mark.anyio
+async def test_rotation_keeps_the_family_and_the_session_expiry(client, user):
+    first = (await signin(client))["refresh_token"]
+    next_second()
+    response = await refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+
+    assert claims(second)["fid"] == claims(first)["fid"]
+    assert claims(second)["exp"] == claims(first)["exp"]
+    assert claims(second)["iat"] > claims(first)["iat"]
+    assert claims(second)["jti"] != claims(first)["jti"]
+    assert (await refresh(client, second)).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_reuse_revokes_the_whole_family(client, user):
+    first = (await signin(client))["refresh_token"]
+    second = (await refresh(client, first)).json()["refresh_token"]
+
+    replayed = await refresh(client, first)
+    assert replayed.status_code == 401
+    assert replayed.json()["detail"] == "Refresh token already used"
+    # the newest token of the session is dead too, whoever holds it
+    assert (await refresh(client, second)).status_code == 401
+
+    # other sessions of the same user are not
+    other = (await signin(client))["refresh_token"]
+    assert (await refresh(client, other)).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_family_revoked_by_another_store(client):
+    # two workers, each with its own filter, loaded before the revocation
+    first, second = revocation.RevocationStore(settings), revocation.RevocationStore(settings)
+    first.load()
+    second.load()
+    with SessionLocal() as db:
+        first.revoke(db, "f" * 32, datetime.now(timezone.utc) + timedelta(days=1))
+        assert "f" * 32 not in second.bloom
+        assert second.is_family_revoked(db, "f" * 32)
+        assert not second.is_family_revoked(db, "e" * 32)
+
+
+@pytest.mark.anyio
+async def test_reuse_in_one_worker_ends_the_session_in_another(client, user, monkeypatch):
+    other_worker = revocation.RevocationStore(settings)
+    other_worker.load()
+    first = (await signin(client))["refresh_token"]
+    second = (await refresh(client, first)).json()["refresh_token"]
+    assert (await refresh(client, first)).status_code == 401
+
+    # the stolen newest token, replayed to a worker that hasn't reloaded since
+    monkeypatch.setattr(revocation, "store", other_worker)
+    replayed = await refresh(client, second)
+    assert replayed.status_code == 401
+    assert replayed.json()["detail"] == "Session ended, please sign in again"
+
+
+@pytest.mark.anyio
+async def test_role_comes_from_the_user_not_the_token(client, user):
+    tokens = await signin(client)
+    with SessionLocal() as db:
+        db.get(User, user).role = "admin"
+        db.commit()
+    invalidate_user("someone@gmail.com")
+
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    access = jwt.decode(response.json()["access_token"], options={"verify_signature": False})
+    assert access["role"] == "admin"
+
+
+@pytest.mark.anyio
+async def test_password_reset_ends_sessions(client, user):
+    tokens = await signin(client)
+    next_second()
+    response = await client.post(
+        "/auth/reset-password", json={"token": generate_reset_token("someone@gmail.com"), "new_password": "N3w!Password"}
+    )
+    assert response.status_code == 200
+
+    ended = await refresh(client, tokens["refresh_token"])
+    assert ended.status_code == 401
+    assert ended.json()["detail"] == "Session ended, please sign in again"
+    assert (await client.get("/cart", headers={"Authorization": f"Bearer {tokens['access_token']}"})).status_code == 401
+
+    # a signin in the same second as the reset is a new session
+    fresh = await client.post("/auth/signin", json={"email": "someone@gmail.com", "password": "N3w!Password"})
+    assert (await refresh(client, fresh.json()["refresh_token"])).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_token_of_a_deleted_user_is_refused(client, user):
+    tokens = await signin(client)
+    with SessionLocal() as db:
+        db.delete(db.get(User, user))
+        db.commit()
+        # same email, another user
+        db.add(User(id=user + 1, name="someone else", email="someone@gmail.com", hashed_password="-", role="admin"))
+        db.commit()
+    invalidate_user("someone@gmail.com")
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+
+
+@pytest.mark.anyio
+async def test_tokens_without_a_family_sign_in_again(client, user):
+    legacy = jwt.encode(
+        {"sub": "someone@gmail.com", "uid": user, "role": "user", "jti": "a" * 32, "exp": int(time.time()) + 60},
+        REFRESH_SECRET_KEY, algorithm="HS256",
+    )
+    assert (await refresh(client, legacy)).status_code == 401
+    assert (await refresh(client, create_refresh_token({"sub": "someone@gmail.com", "uid": user}))).status_code == 200
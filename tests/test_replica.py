@@ -0,0 +1,147 @@
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import InvalidRequestError
+
+import app.cli  # noqa: F401  registers every table
+from app.core import replica
+from app.core.database import AsyncEngine, Base, Engine, SessionLocal
+from app.auth.models import User
+from app.products.models import Product
+
+
+@pytest.fixture(scope="module", autouse=True)
+def databases():
+    # same id on both sides with a different name, so a read tells which database answered it
+    for engine, name in ((Engine, "primary"), (replica.ReplicaEngine, "replica")):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal(bind=engine) as db:
+            db.add(User(id=1, name="admin", email="admin@gmail.com", hashed_password="-", role="admin"))
+            db.add(Product(id=1, name=name, description="", price=1, stock=1, category="c", created_by=1))
+            db.commit()
+    yield
+    replica.ReplicaEngine.dispose()
+    Engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def healthy_replica(monkeypatch):
+    # a replica checked just now and found in sync, tests change that state or force a new check
+    monkeypatch.setattr(replica.replica_health, "checked_at", time.monotonic())
+    monkeypatch.setattr(replica.replica_health, "healthy", True)
+    monkeypatch.setattr(replica.replica_health, "lag", None)
+
+
+@pytest.fixture
+async def async_engines():
+    # pooled aiosqlite connections belong to the event loop of the test that opened them
+    yield
+    await AsyncEngine.dispose()
+    await replica.AsyncReplicaEngine.dispose()
+
+
+def read_name():
+    dependency = replica.get_read_db()
+    db = next(dependency)
+    try:
+        return db.get(Product, 1).name
+    finally:
+        dependency.close()
+
+
+async def read_name_async():
+    dependency = replica.get_async_read_db()
+    db = await anext(dependency)
+    try:
+        return (await db.get(Product, 1)).name
+    finally:
+        await dependency.aclose()
+
+
+def force_check(monkeypatch, query):
+    monkeypatch.setattr(replica.replica_health, "checked_at", 0.0)
+    monkeypatch.setattr(replica, "lag_query", lambda dialect_name: text(query))
+
+
+def test_reads_go_to_the_healthy_replica():
+    assert read_name() == "replica"
+
+
+@pytest.mark.anyio
+async def test_async_reads_go_to_the_healthy_replica(async_engines):
+    assert await read_name_async() == "replica"
+
+
+def test_unhealthy_replica_falls_back_to_the_primary():
+    replica.replica_health.record(None, RuntimeError("connection refused"))
+    assert not replica.replica_health.healthy
+    assert read_name() == "primary"
+
+
+def test_lagging_replica_falls_back_to_the_primary():
+    replica.replica_health.record(replica.replica_health.max_lag + 1)
+    assert read_name() == "primary"
+
+
+def test_replica_within_max_lag_is_used():
+    replica.replica_health.record(replica.replica_health.max_lag)
+    assert read_name() == "replica"
+
+
+def test_check_records_lag(monkeypatch):
+    force_check(monkeypatch, f"SELECT {replica.replica_health.max_lag + 1}")
+    assert read_name() == "primary"
+    assert replica.replica_health.lag == replica.replica_health.max_lag + 1
+
+    # the next interval finds it caught up
+    force_check(monkeypatch, "SELECT 0")
+    assert read_name() == "replica"
+    assert replica.replica_health.healthy
+
+
+def test_failing_check_falls_back_to_the_primary(monkeypatch):
+    force_check(monkeypatch, "SELECT lag FROM no_such_table")
+    assert read_name() == "primary"
+    assert not replica.replica_health.healthy
+
+
+@pytest.mark.anyio
+async def test_async_check_falls_back_to_the_primary(monkeypatch, async_engines):
+    force_check(monkeypatch, f"SELECT {replica.replica_health.max_lag + 1}")
+    assert await read_name_async() == "primary"
+
+
+def test_check_runs_once_per_interval(monkeypatch):
+    force_check(monkeypatch, "SELECT lag FROM no_such_table")
+    read_name()
+    # within the interval the last result stands, even though the replica would now pass
+    monkeypatch.setattr(replica, "lag_query", lambda dialect_name: text("SELECT 0"))
+    assert read_name() == "primary"
+
+
+def test_read_session_refuses_to_flush():
+    dependency = replica.get_read_db()
+    db = next(dependency)
+    try:
+        db.add(Product(name="written", description="", price=1, stock=1, category="c", created_by=1))
+        with pytest.raises(InvalidRequestError, match="Read-only session"):
+            db.flush()
+        db.rollback()
+    finally:
+        dependency.close()
+    with SessionLocal(bind=replica.ReplicaEngine) as db:
+        assert db.query(Product).count() == 1
+
+
+@pytest.mark.anyio
+async def test_async_read_session_refuses_to_flush(async_engines):
+    dependency = replica.get_async_read_db()
+    db = await anext(dependency)
+    try:
+        db.add(Product(name="written", description="", price=1, stock=1, category="c", created_by=1))
+        with pytest.raises(InvalidRequestError, match="Read-only session"):
+            await db.commit()
+    finally:
+        await dependency.aclose()
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.cli  # noqa: F401  registers every table
+from app.auth.models import User
+from app.core.database import SessionLocal
+from app.products.models import Product
+from app.products.search import search_query, search_terms
+
+
+def test_search_terms():
+    assert search_terms("Wireless  Head-phones!") == ["wireless", "head", "phones"]
+    # letters and digits in any script, never tsquery syntax
+    assert search_terms("café 4K") == ["café", "4k"]
+    assert search_terms("a & b | !c:* (d)") == ["a", "b", "c", "d"]
+    assert search_terms("under_score") == ["under", "score"]
+    assert search_terms(" -*- ") == []
+    assert search_query("sqlite", "!!") is None
+
+
+def test_postgres_prefix_query():
+    compiled = search_query("postgresql", "wireless head").compile(dialect=postgresql.dialect())
+    assert "products.search_vector @@ to_tsquery(" in str(compiled)
+    assert "ts_rank" in str(compiled)
+    assert "wireless:* & head:*" in compiled.params.values()
+
+
+@pytest.fixture
+def products(client):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="admin", email="admin@gmail.com", hashed_password="-", role="admin"))
+        for product_id, name, description, category in (
+            (1, "Desk lamp", "warm light", "home"),
+            (2, "Reading light", "clamps onto a desk", "home"),
+            (3, "Lamp oil", "for the garden lamp", "garden"),
+            (4, "Wireless headphones", "", "audio"),
+        ):
+            db.add(Product(id=product_id, name=name, description=description, price=10, stock=1,
+                           category=category, image_url="", created_by=1))
+        db.commit()
+
+
+async def search(client, keyword, **params):
+    response = await client.get("/products/search", params={"keyword": keyword, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.anyio
+async def test_like_fallback(client, products):
+    # every term as a substring, case insensitive
+    assert [p["id"] for p in (await search(client, "DESK"))["products"]] == [1, 2]
+    assert [p["id"] for p in (await search(client, "desk light"))["products"]] == [1, 2]
+    assert [p["id"] for p in (await search(client, "head wire"))["products"]] == [4]
+    # name matches of the first term before the others
+    assert [p["id"] for p in (await search(client, "lamp"))["products"]] == [1, 3, 2]
+    empty = await search(client, "sofa")
+    assert empty["products"] == [] and empty["message"]
+
+
+@pytest.mark.anyio
+async def test_like_fallback_pages(client, products):
+    first = await search(client, "lamp", page_size=2)
+    assert [p["id"] for p in first["products"]] == [1, 3]
+    assert first["next_page"] == 2
+    second = await search(client, "lamp", page=2, page_size=2)
+    assert [p["id"] for p in second["products"]] == [2]
+    assert second["next_page"] is None
@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.auth.models import User
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.products.models import Product
+from app.products.search_index import InvertedIndex, SearchIndex, product_terms
+
+
+def make_index():
+    return SearchIndex(settings.model_copy(update={"SEARCH_INDEX_ENABLED": True}))
+
+
+def product(product_id, name, description="", category="misc"):
+    return SimpleNamespace(id=product_id, name=name, description=description, category=category)
+
+
+def ids(index, keyword, offset=0, limit=20):
+    return index.search(keyword, offset, limit)[0]
+
+
+def test_add_remove_and_ranking():
+    index = make_index()
+    index.add(product(1, "desk lamp", "bright", "home"))
+    index.add(product(2, "reading light", "a lamp for the desk", "home"))
+    index.add(product(3, "lampshade", "linen", "home"))
+    index.add(product(4, "garden hose", "", "garden"))
+
+    # prefixes match longer terms, a name match outranks a description match
+    found = ids(index, "lamp")
+    assert sorted(found) == [1, 2, 3]
+    assert found.index(1) < found.index(2)
+    # every term has to match, each as a prefix
+    assert ids(index, "desk lam") == [1, 2]
+    assert ids(index, "gard") == [4]
+    assert ids(index, "lamp garden") == []
+
+    index.remove(1)
+    assert sorted(ids(index, "lamp")) == [2, 3]
+    # updating a product replaces its terms
+    index.add(product(3, "floor light", "", "home"))
+    assert ids(index, "lamp") == [2]
+    index.remove(4)
+    assert "garden" not in index.index.vocabulary
+    assert ids(index, "gard") == []
+
+
+def test_pages():
+    index = make_index()
+    for product_id in range(1, 6):
+        index.add(product(product_id, "mug"))
+    assert index.search("mug", 0, 2) == ([1, 2], True)
+    assert index.search("mug", 4, 2) == ([5], False)
+
+
+def test_writes_copy_what_a_running_search_reads():
+    index = make_index()
+    index.add(product(1, "mug"))
+    index.add(product(2, "mug"))
+    ids_before, frequencies_before = index.index.postings["mug"]
+    vocabulary_before = index.index.vocabulary
+    index.add(product(3, "mug"))
+    index.add(product(4, "cup"))
+    index.remove(1)
+    assert list(ids_before) == [1, 2]
+    assert len(frequencies_before) == 2
+    assert vocabulary_before == ["misc", "mug"]
+    assert list(index.index.postings["mug"][0]) == [2, 3]
+
+
+def test_build_edits_in_place():
+    # nothing searches an index while it is built
+    built = InvertedIndex()
+    built.add(1, product_terms("mug", "", ""))
+    postings, vocabulary = built.postings["mug"], built.vocabulary
+    built.add(2, product_terms("mug", "", ""))
+    assert built.postings["mug"][0] is postings[0]
+    assert built.vocabulary is vocabulary
+
+
+def test_search_after_a_concurrent_remove(monkeypatch):
+    # a search that still holds postings of a product removed since is scored again under the lock
+    index = make_index()
+    index.add(product(1, "mug"))
+    index.add(product(2, "mug"))
+    search = index.index.search
+    raced = []
+
+    def removed_meanwhile(*args):
+        if not raced:
+            raced.append(True)
+            raise KeyError(1)
+        return search(*args)
+
+    monkeypatch.setattr(index.index, "search", removed_meanwhile)
+    assert ids(index, "mug") == [1, 2]
+    assert raced
+
+
+@pytest.mark.anyio
+async def test_load_replays_writes_made_during_the_scan(client, monkeypatch):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="admin", email="admin@gmail.com", hashed_password="-", role="admin"))
+        for product_id, name in ((1, "mug"), (2, "kettle")):
+            db.add(Product(id=product_id, name=name, description="", price=1, stock=1, category="kitchen", created_by=1))
+        db.commit()
+    index = make_index()
+    build = index.build
+
+    def build_while_admins_write(rows):
+        built = build(rows)
+        # landed after the scan read the table
+        index.add(product(3, "mug rack"))
+        index.remove(2)
+        return built
+
+    monkeypatch.setattr(index, "build", build_while_admins_write)
+    index.load()
+    assert index.ready and index.pending is None
+    assert ids(index, "mug") == [1, 3]
+    assert ids(index, "kettle") == []
+    assert index.index.shared
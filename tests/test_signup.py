@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.auth import hashing, passwords
+from app.auth import routes as auth_routes
+
+
+def signup(client, email):
+    return client.post("/auth/signup", json={"name": "someone", "email": email, "password": "Str0ng!Password"})
+
+
+@pytest.mark.anyio
+async def test_concurrent_signups_for_one_email(client, monkeypatch):
+    # both requests pass the "already registered" lookup before either commits
+    both_hashing = asyncio.Barrier(2)
+
+    async def hash_password(password):
+        await both_hashing.wait()
+        return "not a real hash"
+
+    monkeypatch.setattr(auth_routes, "hash_password", hash_password)
+    responses = await asyncio.gather(signup(client, "race@gmail.com"), signup(client, "race@gmail.com"))
+    assert sorted(response.status_code for response in responses) == [200, 400]
+    rejected = next(response for response in responses if response.status_code == 400)
+    assert rejected.json() == {"detail": "Email already registered."}
+
+    # the session that lost the race was rolled back, the next signup still goes through
+    monkeypatch.setattr(auth_routes, "hash_password", lambda password: asyncio.sleep(0, "not a real hash"))
+    assert (await signup(client, "next@gmail.com")).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_hashing_pool_must_be_started():
+    pool = hashing.HashingPool(1, 1, 1)
+    with pytest.raises(RuntimeError, match="not started"):
+        await pool.run("hash", passwords.hash_password, "Str0ng!Password")
+    assert pool.pending == 0
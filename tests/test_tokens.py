@@ -0,0 +1,41 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.auth.jwt_handler import ALGORITHM, SECRET_KEY, access_tokens, decode_token
+
+
+def token(expires_in):
+    # exp on a whole second, like the tokens create_access_token signs
+    return jwt.encode({"sub": "someone@gmail.com", "exp": int(time.time()) + expires_in}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+@pytest.fixture
+def verifier(monkeypatch):
+    # the cache's own ttl outlives the token, exp has to be what ends the entry
+    monkeypatch.setattr(access_tokens.cache, "ttl", 3600)
+    access_tokens.cache.clear()
+    return access_tokens
+
+
+def test_cached_token_still_expires(verifier):
+    expiring = token(1)
+    claims = verifier.verify(expiring)
+    hits = verifier.cache.hits
+    assert verifier.verify(expiring) is claims
+    assert verifier.cache.hits == hits + 1
+    time.sleep(claims["exp"] - time.time() + 0.05)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(expiring)
+    with pytest.raises(HTTPException) as refused:
+        decode_token(expiring)
+    assert (refused.value.status_code, refused.value.detail) == (401, "Token expired")
+
+
+def test_expired_token_is_not_cached(verifier):
+    with pytest.raises(HTTPException) as refused:
+        decode_token(token(-5))
+    assert refused.value.detail == "Token expired"
+    assert not verifier.cache.entries
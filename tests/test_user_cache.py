@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import cli
+from app.auth.jwt_handler import create_access_token
+from app.auth.models import User
+from app.auth.utils import get_current_user, invalidate_user, load_principal, user_cache
+from app.core.database import SessionLocal
+
+
+@pytest.fixture
+def user(client):
+    with SessionLocal() as db:
+        db.add(User(id=1, name="someone", email="someone@gmail.com", hashed_password="-", role="user"))
+        db.commit()
+    return create_access_token({"sub": "someone@gmail.com", "role": "user", "uid": 1})
+
+
+def set_role(role):
+    cli.set_role(argparse.Namespace(email="someone@gmail.com", role=role))
+
+
+def current_user(token):
+    with SessionLocal() as db:
+        return get_current_user(token, db)
+
+
+def next_second():
+    # tokens_valid_after has whole second resolution, like iat
+    time.sleep(1.01 - time.time() % 1)
+
+
+@pytest.mark.anyio
+async def test_cached_principal_is_a_hit(user):
+    with SessionLocal() as db:
+        first = load_principal(db, "someone@gmail.com")
+        hits = user_cache.hits
+        assert load_principal(db, "someone@gmail.com") is first
+        assert user_cache.hits == hits + 1
+        assert load_principal(db, "nobody@gmail.com") is None
+    assert (first.id, first.role, first.tokens_valid_after) == (1, "user", None)
+
+
+@pytest.mark.anyio
+async def test_change_shows_after_the_ttl(user, monkeypatch):
+    monkeypatch.setattr(user_cache, "ttl", 0.5)
+    next_second()
+    assert current_user(user).role == "user"
+    # another process (the CLI) changes the role and ends the sessions, this worker's entry still answers
+    set_role("admin")
+    assert current_user(user).role == "user"
+    time.sleep(0.6)
+    with pytest.raises(HTTPException) as refused:
+        current_user(user)
+    assert refused.value.status_code == 401
+    # a token issued since carries the new role
+    fresh = create_access_token({"sub": "someone@gmail.com", "role": "admin", "uid": 1})
+    assert current_user(fresh).role == "admin"
+
+
+@pytest.mark.anyio
+async def test_invalidation_applies_at_once(user):
+    assert current_user(user).tokens_valid_after is None
+    next_second()
+    set_role("admin")
+    invalidate_user("someone@gmail.com")
+    with pytest.raises(HTTPException):
+        current_user(user)
+    with SessionLocal() as db:
+        principal = load_principal(db, "someone@gmail.com")
+    assert principal.role == "admin"
+    assert principal.tokens_valid_after is not None